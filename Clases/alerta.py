@@ -1,5 +1,6 @@
 class Alerta:
-    def __init__(self, id, tankId, deviceId, code, value, message, date, synced=False):
+    def __init__(self, id, tankId, deviceId, code, value, message, date, synced=False,
+                 first_date=None, last_date=None, count=None, min_value=None, max_value=None):
         self.id = id
         self.tankId = tankId
         self.deviceId = deviceId
@@ -8,6 +9,13 @@ class Alerta:
         self.message = message
         self.date = date
         self.synced = synced
+        # Solo en alertas agrupadas por el supresor: ventana, cantidad y rango de valores
+        if count is not None:
+            self.first_date = first_date
+            self.last_date = last_date
+            self.count = count
+            self.min_value = min_value
+            self.max_value = max_value
         
     def diccionario(self):
         return self.__dict__
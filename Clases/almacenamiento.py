@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+
+# Formato de los archivos de lecturas/alertas:
+#   "ndjson" -> un registro JSON por línea; cada lectura solo se agrega al final (O(1))
+#   "json"   -> arreglo JSON indentado (formato original, reescribe el archivo completo)
+MODO_ALMACENAMIENTO = os.getenv("MODO_ALMACENAMIENTO", "ndjson")
+
+# Archivos que ya se revisaron (migrados a NDJSON y con la última línea cerrada)
+_archivos_preparados = set()
+_lock_preparacion = threading.Lock()
+
+# Un lock por archivo: serializa los agregados con las reescrituras (leer-filtrar-reemplazar)
+_locks_archivos = {}
+_lock_locks = threading.Lock()
+
+
+def _primer_caracter(archivo):
+    """Devuelve el primer carácter no vacío del archivo (o '' si está vacío)"""
+    with open(archivo, "r", encoding="utf-8") as f:
+        while True:
+            bloque = f.read(64)
+            if not bloque:
+                return ""
+            bloque = bloque.lstrip()
+            if bloque:
+                return bloque[0]
+
+
+def bloqueo_archivo(archivo):
+    """Lock del archivo dentro del proceso (reentrante).
+
+    agregar_registros/agregar_lineas lo toman para escribir; quien relee y
+    reescribe un archivo que recibe agregados debe tenerlo durante todo el
+    ciclo para no perder lo que llegue en el medio.
+    """
+    clave = os.path.abspath(archivo)
+    lock = _locks_archivos.get(clave)
+    if lock is None:
+        with _lock_locks:
+            lock = _locks_archivos.setdefault(clave, threading.RLock())
+    return lock
+
+
+def leer_registros(archivo):
+    """Lee todos los registros de un archivo, sea arreglo JSON o NDJSON.
+
+    Lanza FileNotFoundError si el archivo no existe, igual que json.load.
+    """
+    with open(archivo, "r", encoding="utf-8") as f:
+        contenido = f.read().strip()
+
+    if not contenido:
+        return []
+    if contenido[0] == "[":
+        return json.loads(contenido)
+
+    registros = []
+    for numero, linea in enumerate(contenido.splitlines(), start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            registros.append(json.loads(linea))
+        except json.JSONDecodeError:
+            # Una línea incompleta (p. ej. corte de energía) no invalida el resto
+            print(f"⚠️ Línea {numero} inválida en {archivo}, se omite")
+    return registros
+
+
+def escribir_registros(archivo, registros):
+    """Reescribe el archivo completo de forma atómica en el formato configurado"""
+    temporal = f"{archivo}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        if MODO_ALMACENAMIENTO == "json":
+            json.dump(registros, f, indent=4, ensure_ascii=False)
+        else:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    os.replace(temporal, archivo)
+
+
+def vaciar_registros(archivo):
+    """Deja el archivo sin registros"""
+    escribir_registros(archivo, [])
+
+
+def _preparar_para_agregar(archivo):
+    """Convierte un arreglo JSON heredado a NDJSON y cierra una última línea cortada.
+
+    Solo se ejecuta la primera vez que se agrega a cada archivo en el proceso.
+    """
+    with _lock_preparacion:
+        if archivo in _archivos_preparados:
+            return
+        if os.path.exists(archivo) and os.path.getsize(archivo) > 0:
+            if _primer_caracter(archivo) == "[":
+                registros = leer_registros(archivo)
+                escribir_registros(archivo, registros)
+                print(f"🔁 {archivo} migrado a formato NDJSON ({len(registros)} registros)")
+            else:
+                with open(archivo, "rb+") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+        _archivos_preparados.add(archivo)
+
+
+def agregar_registros(archivo, registros, sincronizar=False):
+    """Agrega registros al final del archivo sin releer ni reescribir lo existente.
+
+    Args:
+        archivo: Ruta del archivo de datos
+        registros: Lista de diccionarios a guardar
+        sincronizar: Si es True, fuerza fsync al terminar de escribir
+    """
+    if not registros:
+        return
+
+    if MODO_ALMACENAMIENTO == "json":
+        with bloqueo_archivo(archivo):
+            try:
+                datos = leer_registros(archivo)
+            except FileNotFoundError:
+                datos = []
+            datos.extend(registros)
+            escribir_registros(archivo, datos)
+        return
+
+    agregar_lineas(archivo, [serializar_linea(r) for r in registros], sincronizar)
+
+
+def serializar_linea(registro):
+    """Registro -> línea NDJSON en bytes"""
+    return (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def agregar_lineas(archivo, lineas, sincronizar=False):
+    """Agrega líneas NDJSON ya serializadas y devuelve el offset donde empezó a escribir.
+
+    Se escribe en modo binario para que los offsets en bytes sean exactos
+    (sin traducción de fin de línea en Windows).
+    """
+    _preparar_para_agregar(archivo)
+    with bloqueo_archivo(archivo), open(archivo, "ab") as f:
+        f.seek(0, os.SEEK_END)
+        inicio = f.tell()
+        f.write(b"".join(lineas))
+        if sincronizar:
+            f.flush()
+            os.fsync(f.fileno())
+    return inicio
+
+
+def leer_registros_rango(archivo, inicio=0, fin=None):
+    """Lee los registros NDJSON entre dos offsets en bytes (fin=None hasta el final)"""
+    with open(archivo, "rb") as f:
+        f.seek(inicio)
+        datos = f.read() if fin is None else f.read(max(0, fin - inicio))
+    registros = []
+    for linea in datos.splitlines():
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            registros.append(json.loads(linea))
+        except json.JSONDecodeError:
+            print(f"⚠️ Línea inválida en {archivo} (offset {inicio}), se omite")
+    return registros
+
+
+def agregar_en(destino, registros, sincronizar=False):
+    """Agrega registros a una ruta de archivo o a un destino con método agregar()"""
+    if isinstance(destino, str):
+        agregar_registros(destino, registros, sincronizar=sincronizar)
+    else:
+        destino.agregar(registros, sincronizar=sincronizar)
+
+
+def sincronizar_en(destino):
+    """fsync de una ruta de archivo o de un destino con método sincronizar()"""
+    if isinstance(destino, str):
+        sincronizar_archivo(destino)
+    else:
+        destino.sincronizar()
+
+
+def sincronizar_archivo(archivo):
+    """Fuerza a disco (fsync) lo que ya se escribió en el archivo"""
+    if not os.path.exists(archivo):
+        return
+    # Se abre en modo "a" porque en Windows fsync requiere un descriptor con escritura
+    with open(archivo, "a", encoding="utf-8") as f:
+        os.fsync(f.fileno())
@@ -0,0 +1,174 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from .almacenamiento import leer_registros, escribir_registros, bloqueo_archivo
+from .historial_segmentado import HistorialSegmentado, obtener_historial
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ARCHIVO_ONLINE = "Jsons_DATA/data_sensores_online.json"
+
+# Backend de almacenamiento local: "json" (archivos, compatibilidad) o "sqlite"
+TIPO_ALMACENAMIENTO = os.getenv("ALMACENAMIENTO", "json")
+# Formato del historial del backend json: "segmentos" (NDJSON por hora) o "binario" (registros fijos + mmap)
+FORMATO_HISTORIAL = os.getenv("FORMATO_HISTORIAL", "segmentos")
+
+
+class AlmacenamientoLocal(ABC):
+    """Interfaz común de los backends de almacenamiento local.
+
+    Cada backend expone dos destinos de escritura, 'online' (cola de
+    lecturas pendientes de subir) e 'historial' (registro permanente), que
+    pueden pasarse a persistir_lectura o encolarse en un EscritorLotes, y
+    las consultas que necesita la sincronización. Un backend al que le falte
+    alguna ya falla al crearlo (TypeError), no a mitad de una sincronización.
+    """
+
+    online = None
+    historial = None
+
+    @abstractmethod
+    def no_sincronizados(self, limite=None):
+        """Lecturas de la cola online que aún no se subieron"""
+
+    @abstractmethod
+    def marcar_sincronizados(self, ids):
+        """Marca como subidas las lecturas online con esos IDs"""
+
+    @abstractmethod
+    def contar(self):
+        """Conteo de la cola online: total, sincronizados y pendientes"""
+
+    @abstractmethod
+    def leer_historial(self, code=None, desde=None, hasta=None):
+        """Lecturas del historial de un sensor (o de todos) entre dos fechas ISO"""
+
+    @abstractmethod
+    def contar_por_sensor(self, desde=None, hasta=None):
+        """Cantidad de lecturas del historial por código de sensor"""
+
+    def columnas_historial(self, code=None, desde=None, hasta=None):
+        """Historial del rango como columnas NumPy (ver consultas.columnas_desde_listas)"""
+        from .consultas import columnas_desde_registros
+        return columnas_desde_registros(self.leer_historial(code, desde, hasta))
+
+    @abstractmethod
+    def eliminar_antiguos(self, dias_mantener=7):
+        """Aplica la retención del historial"""
+
+    def cerrar(self):
+        pass
+
+
+class AlmacenamientoJson(AlmacenamientoLocal):
+    """Backend de compatibilidad: archivo online NDJSON/JSON + historial segmentado o binario."""
+
+    def __init__(self, archivo_online=ARCHIVO_ONLINE, historial=None):
+        self.online = archivo_online
+        if historial is None:
+            if FORMATO_HISTORIAL == "binario":
+                from .historial_binario import HistorialBinario
+                historial = HistorialBinario()
+            else:
+                historial = obtener_historial()
+        self.historial = historial
+
+    def _leer_online(self):
+        try:
+            return leer_registros(self.online)
+        except FileNotFoundError:
+            return []
+
+    def no_sincronizados(self, limite=None):
+        datos = [d for d in self._leer_online() if not d.get("synced", False)]
+        return datos[:limite] if limite else datos
+
+    def marcar_sincronizados(self, ids):
+        # Lo que ya se subió sale de la cola; se conserva lo que llegó durante la subida.
+        # Con el lock del archivo el escritor no puede agregar entre la lectura y el reemplazo
+        ids = set(ids)
+        with bloqueo_archivo(self.online):
+            restantes = [d for d in self._leer_online() if d.get("id") not in ids]
+            escribir_registros(self.online, restantes)
+        return len(ids)
+
+    def contar(self):
+        datos = self._leer_online()
+        sincronizados = sum(1 for d in datos if d.get("synced", False))
+        return {"total": len(datos), "sincronizados": sincronizados,
+                "no_sincronizados": len(datos) - sincronizados}
+
+    def leer_historial(self, code=None, desde=None, hasta=None):
+        if isinstance(self.historial, HistorialSegmentado):
+            return self.historial.leer(desde, hasta, code=code)
+        if hasattr(self.historial, "leer"):
+            datos = self.historial.leer(desde, hasta)
+        else:
+            datos = [d for d in leer_registros(self.historial)
+                     if (not desde or d.get("date", "") >= desde) and (not hasta or d.get("date", "") <= hasta)]
+        if code:
+            datos = [d for d in datos if d.get("code") == code]
+        return datos
+
+    def columnas_historial(self, code=None, desde=None, hasta=None):
+        if not hasattr(self.historial, "rango"):
+            return super().columnas_historial(code, desde, hasta)
+        # Historial binario: las columnas salen del mmap sin pasar por diccionarios
+        from .consultas import columnas_vacias, epoch_a_hora_local
+        from .registro_config import obtener_mapa_tanques
+        datos = self.historial.rango(desde, hasta, code)
+        if len(datos) == 0:
+            return columnas_vacias()
+        codigos = self.historial.codigos
+        mapa = obtener_mapa_tanques()
+        tanques = np.array([mapa.get(c, -1) for c in codigos], dtype=np.int64)
+        # El binario guarda epoch real; las columnas usan la hora local sin zona como el JSON
+        return {"codigos": codigos, "code": datos["code"].astype(np.int32), "tankId": tanques[datos["code"]],
+                "value": datos["value"], "ts": epoch_a_hora_local(datos["ts"])}
+
+    def contar_por_sensor(self, desde=None, hasta=None):
+        conteo = {}
+        for dato in self.leer_historial(desde=desde, hasta=hasta):
+            conteo[dato.get("code")] = conteo.get(dato.get("code"), 0) + 1
+        return conteo
+
+    def eliminar_antiguos(self, dias_mantener=7):
+        if isinstance(self.historial, HistorialSegmentado):
+            return self.historial.eliminar_expirados(dias_mantener)
+        if hasattr(self.historial, "eliminar_antiguos"):
+            return self.historial.eliminar_antiguos(dias_mantener)
+        limite = (datetime.now() - timedelta(days=dias_mantener)).isoformat()
+        datos = leer_registros(self.historial)
+        conservados = [d for d in datos if d.get("date", "") > limite]
+        escribir_registros(self.historial, conservados)
+        return len(datos) - len(conservados)
+
+
+def crear_almacenamiento(tipo=None, **kwargs):
+    """Crea el backend indicado ("json" o "sqlite")"""
+    tipo = tipo or TIPO_ALMACENAMIENTO
+    if tipo == "json":
+        return AlmacenamientoJson(**kwargs)
+    if tipo == "sqlite":
+        from .almacenamiento_sqlite import AlmacenamientoSqlite
+        return AlmacenamientoSqlite(**kwargs)
+    raise ValueError(f"Tipo de almacenamiento desconocido: {tipo} (usar 'json' o 'sqlite')")
+
+
+_almacenamiento = None
+_lock_almacenamiento = threading.Lock()
+
+
+def obtener_almacenamiento():
+    """Backend compartido por la ingesta y la sincronización (según ALMACENAMIENTO)"""
+    global _almacenamiento
+    if _almacenamiento is None:
+        with _lock_almacenamiento:
+            if _almacenamiento is None:
+                _almacenamiento = crear_almacenamiento()
+                print(f"🗄️ Almacenamiento local: {TIPO_ALMACENAMIENTO}")
+    return _almacenamiento
@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from .almacenamiento_local import AlmacenamientoLocal
+
+RUTA_BD = "Jsons_DATA/sensores.db"
+
+# Columnas de cada tabla, en el mismo formato que los registros JSON
+COLUMNAS_ONLINE = ("id", "id_tank", "sensor", "deviceId", "code", "value", "unit", "date", "synced")
+COLUMNAS_HISTORIAL = ("id", "tankId", "name", "deviceId", "code", "value", "unit", "date")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS online (
+    id INTEGER PRIMARY KEY,
+    id_tank INTEGER,
+    sensor TEXT,
+    deviceId INTEGER,
+    code TEXT,
+    value REAL,
+    unit TEXT,
+    date TEXT,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_online_pendientes ON online(synced, id);
+
+CREATE TABLE IF NOT EXISTS historial (
+    id INTEGER PRIMARY KEY,
+    tankId INTEGER,
+    name TEXT,
+    deviceId INTEGER,
+    code TEXT,
+    value REAL,
+    unit TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_historial_code_date ON historial(code, date);
+CREATE INDEX IF NOT EXISTS idx_historial_date ON historial(date);
+"""
+
+
+class TablaSqlite:
+    """Destino de escritura sobre una tabla (compatible con EscritorLotes)."""
+
+    def __init__(self, almacenamiento, tabla, columnas):
+        self.almacenamiento = almacenamiento
+        self.tabla = tabla
+        self.columnas = columnas
+        # Clave para el generador de IDs (archivo de marca '<bd>.<tabla>.id')
+        self.clave_ids = f"{almacenamiento.ruta}.{tabla}"
+        marcadores = ", ".join("?" for _ in columnas)
+        self._insert = f"INSERT OR REPLACE INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})"
+
+    def agregar(self, registros, sincronizar=False):
+        """Inserta el lote completo en una sola transacción"""
+        filas = [tuple(r.get(c) for c in self.columnas) for r in registros]
+        self.almacenamiento._ejecutar_lote(self._insert, filas)
+
+    def sincronizar(self):
+        self.almacenamiento.sincronizar()
+
+    def ultimo_id(self):
+        fila = self.almacenamiento._consultar(f"SELECT MAX(id) FROM {self.tabla}")
+        return fila[0][0] or 0
+
+
+class AlmacenamientoSqlite(AlmacenamientoLocal):
+    """Backend SQLite en modo WAL con índices para la sincronización y consultas.
+
+    - online: cola de sincronización, índice (synced, id) para buscar pendientes
+    - historial: registro permanente, índices (code, date) y (date) para rangos
+    """
+
+    def __init__(self, ruta=RUTA_BD):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(_ESQUEMA)
+        self.online = TablaSqlite(self, "online", COLUMNAS_ONLINE)
+        self.historial = TablaSqlite(self, "historial", COLUMNAS_HISTORIAL)
+
+    def _ejecutar_lote(self, sql, filas):
+        with self._lock:
+            cursor = self.conexion.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(sql, filas)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def _consultar(self, sql, parametros=()):
+        with self._lock:
+            return self.conexion.execute(sql, parametros).fetchall()
+
+    @staticmethod
+    def _a_dicts(columnas, filas):
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+    def no_sincronizados(self, limite=None):
+        sql = f"SELECT {', '.join(COLUMNAS_ONLINE)} FROM online WHERE synced = 0 ORDER BY id"
+        if limite:
+            sql += f" LIMIT {int(limite)}"
+        datos = self._a_dicts(COLUMNAS_ONLINE, self._consultar(sql))
+        for dato in datos:
+            dato["synced"] = False
+        return datos
+
+    def marcar_sincronizados(self, ids):
+        ids = list(ids)
+        self._ejecutar_lote("UPDATE online SET synced = 1 WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+    def contar(self):
+        filas = self._consultar("SELECT synced, COUNT(*) FROM online GROUP BY synced")
+        conteo = {bool(synced): cantidad for synced, cantidad in filas}
+        sincronizados = conteo.get(True, 0)
+        pendientes = conteo.get(False, 0)
+        return {"total": sincronizados + pendientes, "sincronizados": sincronizados,
+                "no_sincronizados": pendientes}
+
+    def _filtro_historial(self, code=None, desde=None, hasta=None):
+        condiciones, parametros = [], []
+        if code:
+            condiciones.append("code = ?")
+            parametros.append(code)
+        if desde:
+            condiciones.append("date >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("date <= ?")
+            parametros.append(hasta)
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return where, parametros
+
+    def leer_historial(self, code=None, desde=None, hasta=None):
+        where, parametros = self._filtro_historial(code, desde, hasta)
+        sql = f"SELECT {', '.join(COLUMNAS_HISTORIAL)} FROM historial{where} ORDER BY date"
+        return self._a_dicts(COLUMNAS_HISTORIAL, self._consultar(sql, parametros))
+
+    def columnas_historial(self, code=None, desde=None, hasta=None):
+        from .consultas import columnas_desde_listas
+        where, parametros = self._filtro_historial(code, desde, hasta)
+        condicion = f"{where} AND value IS NOT NULL" if where else " WHERE value IS NOT NULL"
+        filas = self._consultar(f"SELECT code, tankId, value, date FROM historial{condicion}", parametros)
+        if not filas:
+            return columnas_desde_listas([], [], [], [])
+        codes, tanques, valores, fechas = zip(*filas)
+        return columnas_desde_listas(list(codes), tanques, valores, list(fechas))
+
+    def contar_por_sensor(self, desde=None, hasta=None):
+        where, parametros = self._filtro_historial(None, desde, hasta)
+        filas = self._consultar(f"SELECT code, COUNT(*) FROM historial{where} GROUP BY code", parametros)
+        return dict(filas)
+
+    def eliminar_antiguos(self, dias_mantener=7):
+        limite = (datetime.now() - timedelta(days=dias_mantener)).isoformat()
+        with self._lock:
+            eliminados = self.conexion.execute("DELETE FROM historial WHERE date < ?", (limite,)).rowcount
+            # Las lecturas online ya subidas tampoco hacen falta pasado el límite
+            self.conexion.execute("DELETE FROM online WHERE synced = 1 AND date < ?", (limite,))
+        print(f"🧹 Limpiados {eliminados} datos antiguos (>{dias_mantener} días)")
+        return eliminados
+
+    def sincronizar(self):
+        """Vuelca el WAL a la base principal sin bloquear a los lectores"""
+        with self._lock:
+            self.conexion.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def cerrar(self):
+        with self._lock:
+            self.conexion.close()
@@ -1,7 +1,22 @@
+import atexit
 import json
 import serial
 import time
 from datetime import datetime
+from .almacenamiento import leer_registros, agregar_en
+from .generador_ids import obtener_generador
+from .registro_config import obtener_mapa_dispositivos, obtener_mapa_tanques
+from .historial_segmentado import HistorialSegmentado
+from .almacenamiento_local import obtener_almacenamiento
+from .buffer_reciente import obtener_cache_reciente
+from .rollups import obtener_rollups
+from .lector_serial import LectorSerial
+from .parser_lecturas import ParserLecturas, Sensor, motivo_invalida
+from .motor_alertas import NOMBRES_SENSORES, obtener_motor_alertas
+from .supresor_alertas import obtener_supresor_alertas
+from .detector_anomalias import obtener_detector_anomalias
+from .registro_alertas import obtener_registro_alertas
+from .publicador_alertas import publicar_alerta
 try:
     from .http_sender import HTTPSender
     HTTP_ENABLED = True
@@ -55,15 +70,7 @@ def generar_mensaje_alerta(sensor_code, valor, rango):
     valor_max = rango.get("max")
     
     # Mapear códigos de sensor a nombres legibles
-    nombres_sensores = {
-        "tmp": "Temperatura",
-        "phh": "pH", 
-        "niv": "Nivel de agua",
-        "tbz": "Turbidez",
-        "tds": "TDS"
-    }
-    
-    nombre_legible = nombres_sensores.get(sensor_name, sensor_name)
+    nombre_legible = NOMBRES_SENSORES.get(sensor_name, sensor_name)
     
     # Determinar si está por encima o por debajo del rango
     if valor_min is not None and valor < valor_min:
@@ -75,9 +82,13 @@ def generar_mensaje_alerta(sensor_code, valor, rango):
 
 # Guardar dato de alerta
 def guardar_alerta(sensor_code, valor, mensaje="Valor fuera de rango", 
-                   archivo_alerta="Jsons_DATA/data_sesnsoresalerta_online.json"):
-    """Guarda un dato de alerta usando la estructura de la clase alerta"""
-    mapa = cargar_mapa_dispositivos()
+                   archivo_alerta="Jsons_DATA/data_sesnsoresalerta_online.json", resumen=None):
+    """Guarda un dato de alerta usando la estructura de la clase alerta
+
+    'resumen' agrega los campos de una alerta agrupada por el supresor
+    (first_date, last_date, count, min_value, max_value).
+    """
+    mapa = obtener_mapa_dispositivos()
     
     if sensor_code not in mapa:
         print(f"❌ Sensor desconocido para alerta: {sensor_code}")
@@ -89,17 +100,14 @@ def guardar_alerta(sensor_code, valor, mensaje="Valor fuera de rango",
         print("❌ Valor no numérico para alerta.")
         return
     
-    # Cargar alertas existentes
-    datos_alertas = cargar_datos_existentes(archivo_alerta)
-    
-    # Generar ID para la alerta
-    id_alerta = obtener_siguiente_id(datos_alertas)
+    # Generar ID para la alerta (contador en memoria, sin recorrer el archivo)
+    id_alerta = obtener_generador(archivo_alerta).siguiente()
     fecha = datetime.now().isoformat()
     
     # Crear alerta siguiendo la estructura de la clase alerta
     nueva_alerta = {
         "id": id_alerta,
-        "tankId": mapa[sensor_code],
+        "tankId": obtener_mapa_tanques().get(sensor_code, mapa[sensor_code]),
         "deviceId": mapa[sensor_code],
         "code": sensor_code,
         "value": valor,
@@ -107,291 +115,272 @@ def guardar_alerta(sensor_code, valor, mensaje="Valor fuera de rango",
         "date": fecha,
         "synced": False
     }
+    if resumen:
+        nueva_alerta.update(resumen)
     
-    # Guardar en archivo de alertas
-    datos_alertas.append(nueva_alerta)
-    with open(archivo_alerta, "w", encoding="utf-8") as f:
-        json.dump(datos_alertas, f, indent=4, ensure_ascii=False)
+    # Registro de alertas en memoria: se escribe en lotes y la sincronización rota el archivo
+    obtener_registro_alertas(archivo_alerta).anotar(nueva_alerta)
+    # Fan-out inmediato por MQTT (outbox en memoria: no espera al broker)
+    publicar_alerta(nueva_alerta)
     
     print(f"🚨 ALERTA GUARDADA: {sensor_code} = {valor} - {mensaje}")
-    print(f"📊 Total alertas: {len(datos_alertas)}")
     
     return nueva_alerta
 
 # Cargar datos existentes del archivo de salida
 def cargar_datos_existentes(archivo_salida):
     try:
-        with open(archivo_salida, "r", encoding="utf-8") as f:
-            contenido = f.read().strip()
-            if contenido:
-                return json.loads(contenido)
-            else:
-                return []
+        return leer_registros(archivo_salida)
     except FileNotFoundError:
         return []
     except Exception as e:
         print(f"⚠️ Error al cargar datos existentes: {e}")
         return []
 
-# Obtener el siguiente ID disponible
+# Obtener el siguiente ID disponible recorriendo los datos (ver generador_ids para la versión O(1))
 def obtener_siguiente_id(datos_existentes):
     if not datos_existentes:
         return 1
     return max(dato.get("id", 0) for dato in datos_existentes) + 1
 
+# Escribir un registro directo a disco o encolarlo en el escritor por lotes
+def _guardar(destino, registro, escritor=None, llegada=None):
+    if escritor is not None:
+        escritor.encolar(destino, registro, llegada)
+    else:
+        agregar_en(destino, [registro])
+
+# Generador de IDs para un archivo plano, el historial segmentado o una tabla SQLite
+def _generador_para(destino):
+    if isinstance(destino, HistorialSegmentado):
+        return obtener_generador(destino.directorio, archivo_cola=destino.ultimo_segmento)
+    if hasattr(destino, "clave_ids"):
+        return obtener_generador(destino.clave_ids, ultimo_id=destino.ultimo_id)
+    return obtener_generador(destino)
+
+# Construir y guardar una lectura en los archivos online e historial
+def persistir_lectura(sensor_code, valor, mapa,
+                      archivo_salida=None,
+                      archivo_historial=None,
+                      escritor=None, almacenamiento=None, sensor=None, llegada=None):
+    """Agrega la lectura al final de ambos archivos y devuelve (online, historial)
+
+    Si se pasa un EscritorLotes, los registros se encolan y se escriben en lote;
+    'llegada' (time.monotonic() de la lectura) es desde donde mide su latencia.
+    Los destinos que no se indiquen salen del backend de almacenamiento
+    (por defecto archivos JSON con historial segmentado, o SQLite).
+    Con un Sensor ya resuelto por ParserLecturas no se vuelve a buscar en el mapa.
+    """
+    if sensor is None:
+        sensor = Sensor(sensor_code, mapa[sensor_code], sensor_code.split("/")[0])
+    if archivo_salida is None or archivo_historial is None:
+        almacenamiento = almacenamiento or obtener_almacenamiento()
+        archivo_salida = archivo_salida if archivo_salida is not None else almacenamiento.online
+        archivo_historial = archivo_historial if archivo_historial is not None else almacenamiento.historial
+    ahora = datetime.now()
+    fecha = ahora.isoformat()
+    # Mismo tanque que las alertas del sensor (devices.json), no el id del dispositivo
+    tanque = obtener_mapa_tanques().get(sensor.code, sensor.device_id)
+    id_online = _generador_para(archivo_salida).siguiente()
+    id_historial = _generador_para(archivo_historial).siguiente()
+
+    # Datos para archivo ONLINE (temporal, para sync)
+    nuevo_dato_online = {
+        "id": id_online,
+        "id_tank": tanque,
+        "sensor": sensor.nombre,
+        "deviceId": sensor.device_id,
+        "code": sensor.code,
+        "value": valor,
+        "unit": "N/A",
+        "date": fecha,
+        "synced": False
+    }
+
+    # Datos para archivo LOCAL (historial permanente, SIN synced)
+    nuevo_dato_historial = {
+        "id": id_historial,
+        "tankId": tanque,
+        "name": sensor.nombre,
+        "deviceId": sensor.device_id,
+        "code": sensor.code,
+        "value": valor,
+        "unit": "N/A",
+        "date": fecha
+    }
+
+    # Solo se agrega una línea a cada archivo, sin reescribir lo existente
+    _guardar(archivo_salida, nuevo_dato_online, escritor, llegada)
+    _guardar(archivo_historial, nuevo_dato_historial, escritor, llegada)
+
+    # Cache en memoria de lecturas recientes por sensor (dashboards / alertas)
+    obtener_cache_reciente().agregar(sensor.code, ahora.timestamp(), valor)
+    # Resúmenes por minuto y por hora para consultas de tendencia
+    obtener_rollups().agregar(sensor.code, fecha, valor)
+
+    print(f"✅ Guardado en online: {nuevo_dato_online}")
+    print(f"✅ Guardado en historial: {nuevo_dato_historial}")
+    return nuevo_dato_online, nuevo_dato_historial
+
+# Procesar un lote de líneas "sensor:valor" (bytes) recibido del Arduino
+def _procesar_lote(lineas, parser, archivo_salida=None, archivo_historial=None, sensor_filter=None):
+    """Parsea el lote en una pasada y persiste las lecturas válidas; devuelve cuántas se guardaron"""
+    lecturas, invalidas = parser.parsear_bloque(lineas)
+
+    for linea in invalidas:
+        print(f"📨 Recibido: {linea.decode('utf-8', errors='ignore').strip()}")
+        print(motivo_invalida(linea, parser.mapa))
+
+    guardadas = 0
+    for sensor, valor in lecturas:
+        print(f"📨 Recibido: {sensor.code}:{valor}")
+
+        # Si hay filtro de sensor, solo procesar ese sensor específico
+        if sensor_filter and sensor.code != sensor_filter:
+            continue
+
+        persistir_lectura(sensor.code, valor, parser.mapa, archivo_salida, archivo_historial, sensor=sensor)
+        guardadas += 1
+    return guardadas
+
 # Función para leer una sola vez los datos del Arduino
-def leer_serial_una_vez(puerto='COM6', baudios=9600, archivo_salida="Jsons_DATA/data_sensores_online.json", archivo_historial="Jsons_DATA/data_sensores_local.json", timeout_lectura=10, sensor_filter=None):
+def leer_serial_una_vez(puerto='COM6', baudios=9600, archivo_salida=None, archivo_historial=None, timeout_lectura=10, sensor_filter=None):
     mapa = cargar_mapa_dispositivos()  # Mapa: { "temp/1": 1, "hmd/1": 2, ... }
-    
+    parser = ParserLecturas(mapa)
+    lector = LectorSerial(puerto, baudios, timeout=1)
+
     try:
-        arduino = serial.Serial(puerto, baudios, timeout=2)
+        lector.abrir()
         time.sleep(2)
         print("📡 Conectado al puerto serial. Leyendo datos...")
-        
-        tiempo_inicio = time.time()
+
         datos_leidos = 0
-        
-        # Leer por un tiempo limitado o hasta obtener algunos datos
-        while time.time() - tiempo_inicio < timeout_lectura:
-            if arduino.in_waiting > 0:
-                linea = arduino.readline().decode('utf-8').strip()
-                print(f"📨 Recibido: {linea}")
-                
-                if ':' in linea:
-                    sensor_code, valor = linea.split(":")
-                    
-                    # Si hay filtro de sensor, solo procesar ese sensor específico
-                    if sensor_filter and sensor_code != sensor_filter:
-                        continue
-                    
-                    if sensor_code in mapa:
-                        try:
-                            valor = float(valor)
-                        except ValueError:
-                            print("❌ Valor no numérico.")
-                            continue
-                        
-                        fecha = datetime.now().isoformat()
-                        datos_online = cargar_datos_existentes(archivo_salida)
-                        datos_historial = cargar_datos_existentes(archivo_historial)
-                        
-                        # ID para archivo online (basado en los datos online)
-                        id_online = obtener_siguiente_id(datos_online)
-                        # ID para archivo historial (basado en el historial completo)
-                        id_historial = obtener_siguiente_id(datos_historial)
-                        
-                        # Datos para archivo ONLINE (temporal, para sync)
-                        nuevo_dato_online = {
-                            "id": id_online,
-                            "id_tank": mapa[sensor_code],
-                            "sensor": sensor_code.split("/")[0],
-                            "deviceId": mapa[sensor_code],
-                            "code": sensor_code,
-                            "value": valor,
-                            "unit": "N/A",
-                            "date": fecha,
-                            "synced": False
-                        }
-                        
-                        # Datos para archivo LOCAL (historial permanente, SIN synced)
-                        nuevo_dato_historial = {
-                            "id": id_historial,
-                            "tankId": mapa[sensor_code],
-                            "name": sensor_code.split("/")[0],
-                            "deviceId": mapa[sensor_code],
-                            "code": sensor_code,
-                            "value": valor,
-                            "unit": "N/A",
-                            "date": fecha
-                        }
-                        
-                        # Guardar en archivo online (para sincronización inmediata)
-                        datos_online.append(nuevo_dato_online)
-                        with open(archivo_salida, "w", encoding="utf-8") as f:
-                            json.dump(datos_online, f, indent=4, ensure_ascii=False)
-                        
-                        # Guardar en archivo historial (registro general)
-                        datos_historial.append(nuevo_dato_historial)
-                        with open(archivo_historial, "w", encoding="utf-8") as f:
-                            json.dump(datos_historial, f, indent=4, ensure_ascii=False)
-                        
-                        print(f"✅ Guardado en online: {nuevo_dato_online}")
-                        print(f"✅ Guardado en historial: {nuevo_dato_historial}")
-                        print(f"📊 Total datos online: {len(datos_online)} | Historial: {len(datos_historial)}")
-                        datos_leidos += 1
-                        
-                    else:
-                        print(f"❌ Sensor desconocido: {sensor_code}")
-                else:
-                    print("❌ Formato inválido. Se esperaba 'sensor:valor'")
-            
-            time.sleep(0.1)  # Pequeña pausa para no sobrecargar el CPU
-        
+
+        # Espera bloqueada en el puerto hasta que lleguen datos (sin sondeo), por un tiempo limitado
+        for lote in lector.lotes(duracion=timeout_lectura, decodificar=False):
+            datos_leidos += _procesar_lote(lote, parser, archivo_salida, archivo_historial, sensor_filter)
+
         print(f"📋 Sesión de lectura completada. Datos leídos: {datos_leidos}")
-        
+
     except serial.SerialException as e:
         print(f"🛑 Error de conexión serial: {e}")
     except Exception as e:
         print(f"❌ Error inesperado: {e}")
     finally:
-        if 'arduino' in locals():
-            arduino.close()
+        if lector.serial is not None:
+            lector.cerrar()
             print("🔌 Conexión serial cerrada")
 
 # Función principal para leer datos del Arduino y guardarlos en JSON local (versión continua)
-def leer_serial_y_guardar(puerto='COM6', baudios=9600, archivo_salida="Jsons_DATA/data_sensores_online.json", archivo_historial="Jsons_DATA/data_sensores_local.json"):
+def leer_serial_y_guardar(puerto='COM6', baudios=9600, archivo_salida=None, archivo_historial=None):
     mapa = cargar_mapa_dispositivos()  # Mapa: { "temp/1": 1, "hmd/1": 2, ... }
+    parser = ParserLecturas(mapa)
+    lector = LectorSerial(puerto, baudios, timeout=2)
 
     try:
-        arduino = serial.Serial(puerto, baudios, timeout=2)
+        lector.abrir()
         time.sleep(2)
         print("📡 Conectado al puerto serial. Esperando datos...")
 
-        while True:
-            if arduino.in_waiting > 0:
-                linea = arduino.readline().decode('utf-8').strip()
-                print(f"📨 Recibido: {linea}")
-
-                if ':' in linea:
-                    sensor_code, valor = linea.split(":")
-
-                    if sensor_code in mapa:
-                        try:
-                            valor = float(valor)
-                        except ValueError:
-                            print("❌ Valor no numérico.")
-                            continue
-
-                        fecha = datetime.now().isoformat()
-                        datos_online = cargar_datos_existentes(archivo_salida)
-                        datos_historial = cargar_datos_existentes(archivo_historial)
-                        
-                        # ID para archivo online
-                        id_online = obtener_siguiente_id(datos_online)
-                        # ID para archivo historial
-                        id_historial = obtener_siguiente_id(datos_historial)
-
-                        nuevo_dato_online = {
-                            "id": id_online,
-                            "id_tank": mapa[sensor_code],
-                            "sensor": sensor_code.split("/")[0],
-                            "deviceId": mapa[sensor_code],
-                            "code": sensor_code,
-                            "value": valor,
-                            "unit": "N/A",
-                            "date": fecha,
-                            "synced": False
-                        }
-                        
-                        nuevo_dato_historial = {
-                            "id": id_historial,
-                            "id_tank": mapa[sensor_code],
-                            "sensor": sensor_code.split("/")[0],
-                            "deviceId": mapa[sensor_code],
-                            "code": sensor_code,
-                            "value": valor,
-                            "unit": "N/A",
-                            "date": fecha,
-                            "synced": False
-                        }
-
-                        # Guardar en archivo online
-                        datos_online.append(nuevo_dato_online)
-                        with open(archivo_salida, "w", encoding="utf-8") as f:
-                            json.dump(datos_online, f, indent=4, ensure_ascii=False)
-                            
-                        # Guardar en archivo historial
-                        datos_historial.append(nuevo_dato_historial)
-                        with open(archivo_historial, "w", encoding="utf-8") as f:
-                            json.dump(datos_historial, f, indent=4, ensure_ascii=False)
-
-                        print(f"✅ Guardado en online: {nuevo_dato_online}")
-                        print(f"✅ Guardado en historial: {nuevo_dato_historial}")
-                        print(f"📊 Total datos online: {len(datos_online)} | Historial: {len(datos_historial)}")
-
-                    else:
-                        print(f"❌ Sensor desconocido: {sensor_code}")
-                else:
-                    print("❌ Formato inválido. Se esperaba 'sensor:valor'")
+        # Cada lote trae todas las líneas que había en el buffer del puerto
+        for lote in lector.lotes(decodificar=False):
+            _procesar_lote(lote, parser, archivo_salida, archivo_historial)
 
     except serial.SerialException as e:
         print(f"🛑 Error de conexión serial: {e}")
     except KeyboardInterrupt:
         print("\n🛑 Detenido por el usuario.")
     finally:
-        if 'arduino' in locals():
-            arduino.close()
+        if lector.serial is not None:
+            lector.cerrar()
             print("🔌 Conexión serial cerrada")
 
 def guardar_dato(sensor_code, valor, 
-                 archivo_salida="Jsons_DATA/data_sensores_online.json", 
-                 archivo_historial="Jsons_DATA/data_sensores_local.json"):
-    mapa = cargar_mapa_dispositivos()
+                 archivo_salida=None, 
+                 archivo_historial=None,
+                 escritor=None, almacenamiento=None, sensor=None, alertas=True, llegada=None):
+    """Valida, persiste y revisa alertas de una lectura.
+
+    Si viene un Sensor ya resuelto por ParserLecturas (y el valor ya es float)
+    no se vuelve a validar contra el mapa. Con alertas=False solo se persiste
+    (SensorScheduler revisa las alertas antes de muestrear, con revisar_alertas).
+    """
+    # Mapas cacheados: solo se releen si devices.json / alertasMapa.json cambian en disco
+    mapa = obtener_mapa_dispositivos()
 
-    if sensor_code in mapa:
+    if sensor is None:
+        if sensor_code not in mapa:
+            print(f"❌ Sensor desconocido: {sensor_code}")
+            return
         try:
             valor = float(valor)
         except ValueError:
             print("❌ Valor no numérico.")
             return
-        
-        fecha = datetime.now().isoformat()
-        datos_online = cargar_datos_existentes(archivo_salida)
-        datos_historial = cargar_datos_existentes(archivo_historial)
-
-        id_online = obtener_siguiente_id(datos_online)
-        id_historial = obtener_siguiente_id(datos_historial)
-
-        nuevo_dato_online = {
-            "id": id_online,
-            "id_tank": mapa[sensor_code],
-            "sensor": sensor_code.split("/")[0],
-            "deviceId": mapa[sensor_code],
-            "code": sensor_code,
-            "value": valor,
-            "unit": "N/A",
-            "date": fecha,
-            "synced": False
-        }
-
-        nuevo_dato_historial = {
-            "id": id_historial,
-            "tankId": mapa[sensor_code],
-            "name": sensor_code.split("/")[0],
-            "deviceId": mapa[sensor_code],
-            "code": sensor_code,
-            "value": valor,
-            "unit": "N/A",
-            "date": fecha
-        }
-
-        # Guardar en archivo online
-        datos_online.append(nuevo_dato_online)
-        with open(archivo_salida, "w", encoding="utf-8") as f:
-            json.dump(datos_online, f, indent=4, ensure_ascii=False)
-        
-        # Guardar en archivo historial
-        datos_historial.append(nuevo_dato_historial)
-        with open(archivo_historial, "w", encoding="utf-8") as f:
-            json.dump(datos_historial, f, indent=4, ensure_ascii=False)
-
-        print(f"✅ Guardado en online: {nuevo_dato_online}")
-        print(f"✅ Guardado en historial: {nuevo_dato_historial}")
-        print(f"📊 Total datos online: {len(datos_online)} | Historial: {len(datos_historial)}")
-        
-        # 🚨 VERIFICAR ALERTAS AUTOMÁTICAMENTE
-        mapa_alertas = cargar_mapa_alertas()
-        if verificar_alerta(sensor_code, valor, mapa_alertas):
-            # Determinar el tipo de alerta
-            rango = mapa_alertas[sensor_code]
-            mensaje = generar_mensaje_alerta(sensor_code, valor, rango)
-            
-            # Guardar la alerta
-            guardar_alerta(sensor_code, valor, mensaje)
-            print(f"🚨 ALERTA GENERADA: {sensor_code} = {valor} - {mensaje}")
 
-    else:
-        print(f"❌ Sensor desconocido: {sensor_code}")
+    persistir_lectura(sensor_code, valor, mapa, archivo_salida, archivo_historial, escritor, almacenamiento, sensor,
+                      llegada)
+
+    if alertas:
+        revisar_alertas([(sensor or sensor_code, valor)])
+
+
+def revisar_alertas(lecturas):
+    """Evalúa rangos y anomalías de una lista de (sensor, valor) y guarda las alertas que salen.
+
+    Se aplica a todas las lecturas crudas, antes del muestreo por
+    reading_interval: un pico dentro de la ventana genera su alerta aunque
+    no sea la lectura que se guarda.
+    """
+    # 🚨 VERIFICAR ALERTAS AUTOMÁTICAMENTE (reglas compiladas; solo los cambios de estado)
+    motor = obtener_motor_alertas()
+    supresor = obtener_supresor_alertas()
+    detector = obtener_detector_anomalias()
+    pendientes = []
+    # Todo el lote en una pasada por las tablas del motor (un solo lock)
+    for transicion in motor.evaluar_lote(lecturas, incluir_fuera=True):
+        if transicion.anterior == transicion.estado:
+            # Sigue fuera de rango: solo cuenta para el resumen del incidente
+            pendientes.extend(supresor.registrar(
+                transicion.code, transicion.estado, transicion.valor, transicion.mensaje, nueva=False))
+        elif not transicion.estado:
+            print(f"✅ ALERTA DESPEJADA: {transicion.code} = {transicion.valor} - {transicion.mensaje}")
+            pendientes.extend(supresor.vencer())
+        else:
+            # Alerta nueva: sale enseguida salvo que el incidente ya esté abierto en su ventana
+            pendientes.extend(supresor.registrar(
+                transicion.code, transicion.estado, transicion.valor, transicion.mensaje))
+
+    # 📈 Desvíos y cambios bruscos dentro del rango (zscore / cambio_max en alertasMapa.json)
+    for sensor, valor in lecturas:
+        for anomalia in detector.agregar(sensor, valor):
+            pendientes.extend(supresor.registrar(anomalia.code, anomalia.tipo, valor, anomalia.mensaje))
+    if pendientes:
+        guardar_alertas_pendientes(pendientes)
+
+
+def guardar_alertas_pendientes(pendientes):
+    """Guarda las alertas que devolvió el supresor (nuevas o resúmenes de ventanas cerradas)"""
+    for alerta in pendientes:
+        guardar_alerta(alerta["code"], alerta["value"], alerta["message"], resumen=alerta.get("resumen"))
+        print(f"🚨 ALERTA GENERADA: {alerta['code']} = {alerta['value']} - {alerta['message']}")
+
+
+def guardar_alertas_vencidas():
+    """Guarda los resúmenes de las ventanas de supresión que ya vencieron"""
+    pendientes = obtener_supresor_alertas().vencer()
+    if pendientes:
+        guardar_alertas_pendientes(pendientes)
+
+
+@atexit.register
+def guardar_alertas_agrupadas():
+    """Cierra las ventanas de supresión abiertas y guarda sus resúmenes"""
+    try:
+        guardar_alertas_pendientes(obtener_supresor_alertas().vaciar())
+        obtener_registro_alertas().vaciar()
+    except Exception as e:
+        print(f"⚠️ No se pudieron guardar las alertas agrupadas: {e}")
 
 
 
@@ -0,0 +1,149 @@
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Lecturas recientes que se guardan por sensor
+CAPACIDAD_POR_SENSOR = 1024
+
+
+class BufferCircular:
+    """Últimas N lecturas de un sensor en dos arreglos 'd' de tamaño fijo.
+
+    Cada lectura ocupa 16 bytes (tiempo epoch + valor) sin crear objetos por
+    lectura, y la memoria no crece después de llenarse.
+    """
+
+    __slots__ = ("capacidad", "tiempos", "valores", "_siguiente", "_cantidad")
+
+    def __init__(self, capacidad=CAPACIDAD_POR_SENSOR):
+        self.capacidad = capacidad
+        self.tiempos = array("d", bytes(8 * capacidad))
+        self.valores = array("d", bytes(8 * capacidad))
+        self._siguiente = 0
+        self._cantidad = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, tiempo, valor):
+        i = self._siguiente
+        self.tiempos[i] = tiempo
+        self.valores[i] = valor
+        self._siguiente = (i + 1) % self.capacidad
+        if self._cantidad < self.capacidad:
+            self._cantidad += 1
+
+    def _orden(self, n):
+        """Arreglos (tiempos, valores) de las últimas n lecturas en orden cronológico"""
+        n = min(n, self._cantidad)
+        if n == 0:
+            return array("d"), array("d")
+        inicio = (self._siguiente - n) % self.capacidad
+        fin = inicio + n
+        if fin <= self.capacidad:
+            return self.tiempos[inicio:fin], self.valores[inicio:fin]
+        resto = fin - self.capacidad
+        return (self.tiempos[inicio:] + self.tiempos[:resto],
+                self.valores[inicio:] + self.valores[:resto])
+
+    def ultimos(self, n=None):
+        """Últimas n lecturas (todas si n es None), costo O(n)"""
+        return self._orden(self._cantidad if n is None else n)
+
+    def desde(self, tiempo):
+        """Lecturas con tiempo >= 'tiempo': búsqueda binaria + O(ventana) para copiar"""
+        inicio = (self._siguiente - self._cantidad) % self.capacidad
+        bajo, alto = 0, self._cantidad
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self.tiempos[(inicio + medio) % self.capacidad] < tiempo:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return self._orden(self._cantidad - bajo)
+
+    def ultimo(self):
+        """(tiempo, valor) de la lectura más reciente, o None"""
+        if not self._cantidad:
+            return None
+        i = (self._siguiente - 1) % self.capacidad
+        return self.tiempos[i], self.valores[i]
+
+
+def percentiles_ms(latencias):
+    """p50/p99/máximo/promedio en ms de una secuencia de latencias en segundos (o None si está vacía)"""
+    if not latencias:
+        return None
+    ordenadas = sorted(latencias)
+    n = len(ordenadas)
+    return {
+        "p50": ordenadas[n // 2] * 1000,
+        "p99": ordenadas[min(n - 1, int(n * 0.99))] * 1000,
+        "max": ordenadas[-1] * 1000,
+        "promedio": sum(ordenadas) / n * 1000,
+    }
+
+
+class CacheReciente:
+    """Un BufferCircular por código de sensor, alimentado desde la ingesta."""
+
+    def __init__(self, capacidad=CAPACIDAD_POR_SENSOR):
+        self.capacidad = capacidad
+        self.buffers = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, code, tiempo, valor):
+        with self._lock:
+            buffer = self.buffers.get(code)
+            if buffer is None:
+                buffer = self.buffers[code] = BufferCircular(self.capacidad)
+            buffer.agregar(tiempo, valor)
+
+    def ultimos(self, code, n=None):
+        """(tiempos, valores) de las últimas n lecturas del sensor"""
+        with self._lock:
+            buffer = self.buffers.get(code)
+            return buffer.ultimos(n) if buffer else (array("d"), array("d"))
+
+    def ventana(self, code, desde):
+        """(tiempos, valores) del sensor desde un tiempo epoch"""
+        with self._lock:
+            buffer = self.buffers.get(code)
+            return buffer.desde(desde) if buffer else (array("d"), array("d"))
+
+    def ultimo(self, code):
+        with self._lock:
+            buffer = self.buffers.get(code)
+            return buffer.ultimo() if buffer else None
+
+    def ultimos_numpy(self, code, n=None):
+        """Igual que ultimos() pero como arreglos NumPy float64 (sin copiar elemento a elemento)"""
+        if np is None:
+            raise RuntimeError("NumPy no está instalado")
+        tiempos, valores = self.ultimos(code, n)
+        return np.frombuffer(tiempos, dtype=np.float64), np.frombuffer(valores, dtype=np.float64)
+
+    def codigos(self):
+        return list(self.buffers)
+
+    def memoria_bytes(self):
+        """Memoria ocupada por los datos de todos los buffers"""
+        return sum(16 * b.capacidad for b in self.buffers.values())
+
+
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def obtener_cache_reciente():
+    """Cache compartida de lecturas recientes del proceso"""
+    global _cache
+    if _cache is None:
+        with _lock_cache:
+            if _cache is None:
+                _cache = CacheReciente()
+    return _cache
@@ -0,0 +1,252 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from .lector_serial import LectorSerial
+from .lector_multipuerto import ESPERA_RECONEXION, ESPERA_RECONEXION_MAX
+
+# Segundos que se espera la respuesta del Arduino a un comando (después se resuelve con None)
+TIMEOUT_RESPUESTA = 2.0
+# Espera única después de abrir el puerto, por si la placa igual se reinicia al conectar
+ESPERA_INICIAL = 2.0
+# Respuestas recientes que se guardan para diagnóstico
+RESPUESTAS_GUARDADAS = 100
+# Velocidad del Arduino de actuadores (canal propio o PuertoCompartido con sensores)
+BAUDIOS_ACTUADORES = 115200
+
+
+def abrir_sin_reinicio(puerto, baudios=BAUDIOS_ACTUADORES, timeout=1.0):
+    """Abre el puerto sin activar DTR/RTS para que la placa no se reinicie al conectar"""
+    import serial
+
+    conexion = serial.Serial()
+    conexion.port = puerto
+    conexion.baudrate = baudios
+    conexion.timeout = timeout
+    conexion.dtr = False
+    conexion.rts = False
+    conexion.open()
+    return conexion
+
+
+class CanalActuador:
+    """Conexión serial persistente para enviar comandos a los actuadores.
+
+    El puerto se abre una sola vez (sin DTR, así el Arduino no se reinicia en
+    cada comando) y queda abierto; enviar() solo escribe la línea y vuelve en
+    milisegundos. Un hilo lee las respuestas del Arduino y resuelve en orden
+    el Future de cada comando pendiente (o lo resuelve con None si no hubo
+    respuesta a tiempo). Si el puerto se cae se reabre con espera creciente.
+    """
+
+    def __init__(self, puerto, baudios=BAUDIOS_ACTUADORES, timeout_respuesta=TIMEOUT_RESPUESTA,
+                 espera_inicial=ESPERA_INICIAL, serial_abierto=None):
+        self.puerto = puerto
+        self.baudios = baudios
+        self.timeout_respuesta = timeout_respuesta
+        self.espera_inicial = espera_inicial
+        self.serial = serial_abierto
+        self.lector = None
+        self.conectado = False
+        self.activo = False
+        self.hilo = None
+        self._lock = threading.Lock()
+        self._pendientes = deque()   # (Future, vence) en el orden en que se escribieron
+        self._espera = ESPERA_RECONEXION
+        self._proximo_intento = 0.0
+        self.respuestas = deque(maxlen=RESPUESTAS_GUARDADAS)
+        self.estadisticas = {"enviados": 0, "respuestas": 0, "sin_respuesta": 0, "reconexiones": 0,
+                             "errores": 0, "ultimo_error": None}
+
+    # ------------------------------------------------------------------
+    # Conexión
+    # ------------------------------------------------------------------
+    def abrir(self, esperar_conexion=True):
+        """Abre el puerto (si hace falta) e inicia el hilo de respuestas.
+
+        Con esperar_conexion=False un puerto que no abre no levanta excepción:
+        el hilo lo sigue reintentando.
+        """
+        with self._lock:
+            try:
+                self._conectar()
+            except Exception as e:
+                if esperar_conexion:
+                    raise
+                self._desconectar(e)
+        if not self.activo:
+            self.activo = True
+            self.hilo = threading.Thread(target=self._bucle, daemon=True)
+            self.hilo.start()
+        return self
+
+    def _conectar(self):
+        """Abre el puerto; se llama con el lock tomado"""
+        if self.conectado:
+            return
+        propio = self.serial is None
+        if propio:
+            self.serial = abrir_sin_reinicio(self.puerto, self.baudios)
+        self.lector = LectorSerial(self.puerto, self.baudios, serial_abierto=self.serial).abrir()
+        if propio and self.espera_inicial:
+            time.sleep(self.espera_inicial)
+            self.serial.reset_input_buffer()
+        if self.estadisticas["enviados"] or self.estadisticas["errores"]:
+            self.estadisticas["reconexiones"] += 1
+        self.conectado = True
+        self._espera = ESPERA_RECONEXION
+        print(f"🔌 Canal de actuadores abierto en {self.puerto}")
+
+    def _desconectar(self, error):
+        """Cierra el puerto caído y falla los comandos pendientes; se llama con el lock tomado"""
+        self.conectado = False
+        self.estadisticas["errores"] += 1
+        self.estadisticas["ultimo_error"] = str(error)
+        if self.lector is not None:
+            try:
+                self.lector.cerrar()
+            except Exception:
+                pass
+        self.lector = None
+        self.serial = None
+        while self._pendientes:
+            futuro, _ = self._pendientes.popleft()
+            futuro.set_exception(error)
+        self._proximo_intento = time.monotonic() + self._espera
+        print(f"❌ Canal de actuadores en {self.puerto} caído: {error} (reintento en {self._espera:.0f}s)")
+        self._espera = min(self._espera * 2, ESPERA_RECONEXION_MAX)
+
+    def cerrar(self):
+        self.activo = False
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=2)
+        with self._lock:
+            if self.lector is not None:
+                self.lector.cerrar()
+            self.lector = None
+            self.serial = None
+            self.conectado = False
+            while self._pendientes:
+                self._pendientes.popleft()[0].set_result(None)
+
+    def __enter__(self):
+        return self.abrir()
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # ------------------------------------------------------------------
+    # Comandos
+    # ------------------------------------------------------------------
+    def enviar(self, codigo):
+        """Escribe el comando y devuelve un Future con la respuesta del Arduino (o None).
+
+        Levanta la excepción del puerto si no se pudo escribir.
+        """
+        futuro = Future()
+        with self._lock:
+            if not self.conectado:
+                self._conectar()
+            try:
+                self.serial.write(f"{codigo}\n".encode())
+                self.serial.flush()
+            except Exception as e:
+                self._desconectar(e)
+                raise
+            self._pendientes.append((futuro, time.monotonic() + self.timeout_respuesta))
+            self.estadisticas["enviados"] += 1
+        return futuro
+
+    def enviar_y_esperar(self, codigo, timeout=None):
+        """Envía el comando y espera la respuesta del Arduino (None si no respondió)"""
+        futuro = self.enviar(codigo)
+        return futuro.result(timeout if timeout is not None else self.timeout_respuesta + 1)
+
+    # ------------------------------------------------------------------
+    # Hilo de respuestas
+    # ------------------------------------------------------------------
+    def _bucle(self):
+        while self.activo:
+            lector = self.lector
+            if lector is None:
+                if time.monotonic() >= self._proximo_intento:
+                    with self._lock:
+                        try:
+                            self._conectar()
+                        except Exception as e:
+                            self._desconectar(e)
+                else:
+                    time.sleep(0.1)
+                continue
+            try:
+                lineas = lector.leer_bloque(0.1)
+            except Exception as e:
+                with self._lock:
+                    if self.lector is lector:
+                        self._desconectar(e)
+                continue
+            if lineas:
+                self._recibir(lineas)
+            self._vencer_pendientes()
+
+    def _recibir(self, lineas):
+        """Líneas (bytes) que llegaron del puerto; acá todas son respuestas a comandos"""
+        for linea in lineas:
+            texto = linea.decode("utf-8", errors="ignore").strip()
+            if texto:
+                self._respuesta(texto)
+
+    def _respuesta(self, texto):
+        print(f"📨 Arduino: {texto}")
+        self.respuestas.append(texto)
+        with self._lock:
+            self.estadisticas["respuestas"] += 1
+            if self._pendientes:
+                self._pendientes.popleft()[0].set_result(texto)
+
+    def _vencer_pendientes(self):
+        ahora = time.monotonic()
+        with self._lock:
+            while self._pendientes and self._pendientes[0][1] <= ahora:
+                self._pendientes.popleft()[0].set_result(None)
+                self.estadisticas["sin_respuesta"] += 1
+
+    def estado(self):
+        with self._lock:
+            return dict(self.estadisticas, puerto=self.puerto, conectado=self.conectado,
+                        pendientes=len(self._pendientes))
+
+
+_canales = {}
+_lock_canales = threading.Lock()
+
+
+def registrar_canal(canal):
+    """Hace que obtener_canal_actuador(puerto) use este canal (ej. un PuertoCompartido).
+
+    Si ya había otro canal abierto en el puerto se cierra antes (sus comandos
+    pendientes terminan en None): el puerto no puede tener dos dueños.
+    """
+    with _lock_canales:
+        anterior = _canales.get(canal.puerto)
+        _canales[canal.puerto] = canal
+    if anterior is not None and anterior is not canal:
+        print(f"⚠️ {canal.puerto} ya tenía un canal abierto: se cierra para que lo use el nuevo")
+        anterior.cerrar()
+
+
+def retirar_canal(canal):
+    with _lock_canales:
+        if _canales.get(canal.puerto) is canal:
+            del _canales[canal.puerto]
+
+
+def obtener_canal_actuador(puerto, baudios=BAUDIOS_ACTUADORES):
+    """Canal persistente del puerto (se abre la primera vez y se reutiliza)"""
+    with _lock_canales:
+        canal = _canales.get(puerto)
+        if canal is None:
+            canal = _canales[puerto] = CanalActuador(puerto, baudios)
+        if not canal.activo:
+            canal.abrir()
+        return canal
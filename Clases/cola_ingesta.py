@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+from .buffer_reciente import BufferCircular, percentiles_ms
+
+# Qué hacer cuando la cola está llena:
+#   "descartar_antiguo" -> se descarta la lectura más vieja para hacer lugar
+#   "coalescer"         -> se reemplaza el valor pendiente del mismo sensor; si no hay, como descartar_antiguo
+#   "bloquear"          -> el lector espera a que haya lugar (presión hacia el puerto serial)
+POLITICAS_COLA = ("descartar_antiguo", "coalescer", "bloquear")
+
+# Latencias recientes que se guardan para los percentiles
+MUESTRAS_LATENCIA = 1024
+
+
+class ColaIngesta:
+    """Cola acotada entre el lector serial y los hilos que persisten.
+
+    El lector solo encola (sensor, valor) y vuelve a leer el puerto; uno o más
+    trabajadores sacan lecturas y llaman a 'procesar(sensor, valor, encolado)',
+    con 'encolado' el time.monotonic() de llegada (SensorScheduler lo pasa al
+    EscritorLotes, que mide la latencia hasta el commit). El sensor (código o
+    Sensor de ParserLecturas) es la clave para coalescer. Las estadísticas
+    muestran profundidad, descartes y la latencia desde que se encola hasta
+    que procesar termina.
+    """
+
+    def __init__(self, procesar, capacidad=10000, politica="descartar_antiguo", trabajadores=1):
+        if politica not in POLITICAS_COLA:
+            raise ValueError(f"Política de cola inválida: {politica} (usar {POLITICAS_COLA})")
+        self.procesar = procesar
+        self.capacidad = capacidad
+        self.politica = politica
+        self.cantidad_trabajadores = trabajadores
+
+        self._cola = deque()
+        # sensor -> lectura pendiente más reciente (solo política "coalescer")
+        self._pendiente_por_sensor = {}
+        self._cond = threading.Condition()
+        self._latencias = BufferCircular(MUESTRAS_LATENCIA)
+        self.running = False
+        self.hilos = []
+
+        self.estadisticas = {"encolados": 0, "procesados": 0, "descartados": 0, "coalescidos": 0,
+                             "bloqueos": 0, "errores": 0, "profundidad_max": 0}
+
+    def iniciar(self):
+        if self.running:
+            return
+        self.running = True
+        self.hilos = [threading.Thread(target=self._bucle, daemon=True) for _ in range(self.cantidad_trabajadores)]
+        for hilo in self.hilos:
+            hilo.start()
+        print(f"📥 Cola de ingesta iniciada (capacidad={self.capacidad}, política={self.politica}, "
+              f"trabajadores={self.cantidad_trabajadores})")
+
+    def detener(self, timeout=5):
+        """Procesa lo que queda en la cola y detiene los trabajadores"""
+        limite = time.monotonic() + timeout
+        with self._cond:
+            while self._cola and time.monotonic() < limite:
+                self._cond.wait(0.1)
+            self.running = False
+            self._cond.notify_all()
+        for hilo in self.hilos:
+            hilo.join(timeout=max(0.0, limite - time.monotonic()))
+
+    # ------------------------------------------------------------------
+    # Productor
+    # ------------------------------------------------------------------
+    def encolar(self, sensor, valor):
+        """Encola una lectura aplicando la política si la cola está llena"""
+        with self._cond:
+            if len(self._cola) >= self.capacidad:
+                if self.politica == "coalescer":
+                    pendiente = self._pendiente_por_sensor.get(sensor)
+                    if pendiente is not None:
+                        # Se conserva el lugar (y la hora de llegada) y se actualiza al valor más nuevo
+                        pendiente[1] = valor
+                        self.estadisticas["coalescidos"] += 1
+                        return
+                if self.politica == "bloquear":
+                    self.estadisticas["bloqueos"] += 1
+                    while len(self._cola) >= self.capacidad and self.running:
+                        self._cond.wait()
+                    if len(self._cola) >= self.capacidad:
+                        # Cola detenida y todavía llena: se rechaza en lugar de pasar la capacidad
+                        self.estadisticas["descartados"] += 1
+                        return
+                else:
+                    self._descartar_mas_antiguo()
+
+            lectura = [sensor, valor, time.monotonic()]
+            self._cola.append(lectura)
+            if self.politica == "coalescer":
+                self._pendiente_por_sensor[sensor] = lectura
+            self.estadisticas["encolados"] += 1
+            if len(self._cola) > self.estadisticas["profundidad_max"]:
+                self.estadisticas["profundidad_max"] = len(self._cola)
+            self._cond.notify_all()
+
+    def _descartar_mas_antiguo(self):
+        lectura = self._cola.popleft()
+        self._olvidar(lectura)
+        self.estadisticas["descartados"] += 1
+
+    def _olvidar(self, lectura):
+        if self._pendiente_por_sensor.get(lectura[0]) is lectura:
+            del self._pendiente_por_sensor[lectura[0]]
+
+    # ------------------------------------------------------------------
+    # Trabajadores
+    # ------------------------------------------------------------------
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while not self._cola and self.running:
+                    self._cond.wait()
+                if not self._cola:
+                    return
+                lectura = self._cola.popleft()
+                self._olvidar(lectura)
+                # Hay lugar: se despierta a un productor bloqueado
+                self._cond.notify_all()
+
+            sensor, valor, encolado = lectura
+            try:
+                self.procesar(sensor, valor, encolado)
+            except Exception as e:
+                print(f"❌ Error procesando {sensor}: {e}")
+                with self._cond:
+                    self.estadisticas["errores"] += 1
+                continue
+            latencia = time.monotonic() - encolado
+            with self._cond:
+                self.estadisticas["procesados"] += 1
+                self._latencias.agregar(encolado, latencia)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def metricas(self):
+        """Estadísticas, profundidad actual y latencia encolado→procesado (ms) de las últimas lecturas"""
+        with self._cond:
+            metricas = dict(self.estadisticas, profundidad=len(self._cola), capacidad=self.capacidad,
+                            politica=self.politica)
+            _, latencias = self._latencias.ultimos()
+        if latencias:
+            metricas["latencia_proceso_ms"] = percentiles_ms(latencias)
+        return metricas
@@ -0,0 +1,196 @@
+from datetime import datetime
+from .registro_config import obtener_mapa_tanques
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (50, 90, 99)
+
+
+def _requiere_numpy():
+    if np is None:
+        raise RuntimeError("NumPy no está instalado; requerido para las consultas agregadas")
+
+
+def columnas_vacias():
+    _requiere_numpy()
+    return {"codigos": [], "code": np.zeros(0, dtype=np.int32), "tankId": np.zeros(0, dtype=np.int64),
+            "value": np.zeros(0, dtype=np.float64), "ts": np.zeros(0, dtype=np.int64)}
+
+
+def columnas_desde_registros(registros):
+    """Registros del historial (dicts) -> columnas NumPy (ver columnas_desde_listas)"""
+    registros = [r for r in registros if r.get("value") is not None and r.get("date")]
+    return columnas_desde_listas(
+        [r.get("code") or "" for r in registros],
+        [r.get("tankId", r.get("id_tank")) for r in registros],
+        [r["value"] for r in registros],
+        [r["date"] for r in registros],
+    )
+
+
+def columnas_desde_listas(codes, tanques, valores, fechas):
+    """Listas paralelas -> columnas NumPy.
+
+    Devuelve un dict con:
+      - codigos: lista de códigos de sensor distintos
+      - code: índice en 'codigos' de cada lectura (int32)
+      - tankId: tanque de cada lectura según devices.json (int64, -1 si no tiene)
+      - value: valor (float64)
+      - ts: fecha local en microsegundos desde 1970-01-01T00:00 (int64, sin zona horaria)
+    """
+    _requiere_numpy()
+    if not codes:
+        return columnas_vacias()
+    codigos, indices = np.unique(np.array(codes), return_inverse=True)
+    # El tanque sale de devices.json por code: el guardado en cada lectura es el id del dispositivo
+    # y solo se usa para códigos que ya no están en devices.json
+    mapa = obtener_mapa_tanques()
+    por_codigo = np.array([mapa.get(c, -1) for c in codigos.tolist()], dtype=np.int64)[indices]
+    guardados = np.array([-1 if t is None else t for t in tanques], dtype=np.int64)
+    return {"codigos": codigos.tolist(), "code": indices.astype(np.int32),
+            "tankId": np.where(por_codigo >= 0, por_codigo, guardados),
+            "value": np.array(valores, dtype=np.float64), "ts": fechas_a_microsegundos(fechas)}
+
+
+def _tiene_zona(fecha):
+    return fecha.endswith("Z") or (len(fecha) > 19 and fecha[-6] in "+-")
+
+
+def _a_hora_local(fecha):
+    """Fecha ISO con zona horaria -> ISO en hora local sin zona (como las guarda la ingesta)"""
+    return datetime.fromisoformat(fecha.replace("Z", "+00:00")).astimezone().replace(tzinfo=None).isoformat()
+
+
+def fechas_a_microsegundos(fechas):
+    """Fechas ISO -> int64 microsegundos en hora local (parseo vectorizado de NumPy).
+
+    Las fechas con zona horaria se pasan antes a la hora local: NumPy las
+    convertiría a UTC y quedarían corridas respecto de las demás.
+    """
+    if any(_tiene_zona(f) for f in fechas):
+        fechas = [_a_hora_local(f) if _tiene_zona(f) else f for f in fechas]
+    return np.array(fechas, dtype="datetime64[us]").astype(np.int64)
+
+
+def epoch_a_hora_local(ts):
+    """Microsegundos epoch (UTC) -> microsegundos en hora local, con el desfase de cada instante.
+
+    El desfase se calcula una vez por hora UTC distinta, así un rango que
+    cruza un cambio de horario queda bien en los dos lados.
+    """
+    horas, inversa = np.unique(ts // 3_600_000_000, return_inverse=True)
+    desfases = np.array([datetime.fromtimestamp(int(h) * 3600).astimezone().utcoffset().total_seconds()
+                         for h in horas], dtype=np.float64)
+    return ts + (desfases * 1_000_000).astype(np.int64)[inversa]
+
+
+def _iso(microsegundos):
+    return str(np.datetime64(int(microsegundos), "us"))
+
+
+def agregar_por_grupo(claves, valores, tiempos, percentiles=PERCENTILES):
+    """count/min/max/mean/percentiles/last de 'valores' agrupados por 'claves' enteras.
+
+    Todo se resuelve con dos ordenamientos y reduceat; no hay bucles Python
+    sobre lecturas, solo sobre los grupos al armar el resultado.
+
+    Returns:
+        (grupos, dict de columnas por grupo)
+    """
+    _requiere_numpy()
+    if len(claves) == 0:
+        return np.zeros(0, dtype=claves.dtype), {}
+
+    # Orden por (clave, tiempo): da grupos contiguos y la última lectura de cada uno
+    orden = np.lexsort((tiempos, claves))
+    claves_ordenadas = claves[orden]
+    grupos, inicios, cuentas = np.unique(claves_ordenadas, return_index=True, return_counts=True)
+    valores_tiempo = valores[orden]
+    ultimos = inicios + cuentas - 1
+
+    resultado = {
+        "count": cuentas,
+        "min": np.minimum.reduceat(valores_tiempo, inicios),
+        "max": np.maximum.reduceat(valores_tiempo, inicios),
+        "mean": np.add.reduceat(valores_tiempo, inicios) / cuentas,
+        "last": valores_tiempo[ultimos],
+        "last_ts": tiempos[orden][ultimos],
+    }
+
+    if percentiles:
+        # Orden por (clave, valor): mismos inicios, valores ordenados dentro de cada grupo
+        valores_ordenados = valores[np.lexsort((valores, claves))]
+        for p in percentiles:
+            posicion = inicios + (p / 100.0) * (cuentas - 1)
+            bajo = np.floor(posicion).astype(np.int64)
+            alto = np.minimum(bajo + 1, ultimos)
+            fraccion = posicion - bajo
+            resultado[f"p{p:g}"] = (valores_ordenados[bajo]
+                                    + (valores_ordenados[alto] - valores_ordenados[bajo]) * fraccion)
+    return grupos, resultado
+
+
+def _a_diccionarios(nombres, resultado):
+    salida = {}
+    for i, nombre in enumerate(nombres):
+        fila = {}
+        for campo, columna in resultado.items():
+            if campo == "count":
+                fila[campo] = int(columna[i])
+            elif campo == "last_ts":
+                fila["last_date"] = _iso(columna[i])
+            else:
+                fila[campo] = float(columna[i])
+        salida[nombre] = fila
+    return salida
+
+
+def agregados_por_sensor(columnas, percentiles=PERCENTILES):
+    """Agregados por código de sensor"""
+    grupos, resultado = agregar_por_grupo(columnas["code"], columnas["value"], columnas["ts"], percentiles)
+    return _a_diccionarios([columnas["codigos"][g] for g in grupos], resultado)
+
+
+def agregados_por_tanque(columnas, percentiles=PERCENTILES):
+    """Agregados por tankId (las lecturas sin tanque quedan fuera)"""
+    con_tanque = columnas["tankId"] >= 0
+    grupos, resultado = agregar_por_grupo(columnas["tankId"][con_tanque], columnas["value"][con_tanque],
+                                          columnas["ts"][con_tanque], percentiles)
+    return _a_diccionarios([int(g) for g in grupos], resultado)
+
+
+class ConsultasHistorial:
+    """Agregados del historial local calculados en el dispositivo.
+
+    Las columnas salen del backend configurado (AlmacenamientoLocal.columnas_historial)
+    y se agregan con operaciones NumPy por lote, sin pasar por objetos dataSensores.
+    """
+
+    def __init__(self, almacenamiento=None):
+        if almacenamiento is None:
+            from .almacenamiento_local import obtener_almacenamiento
+            almacenamiento = obtener_almacenamiento()
+        self.almacenamiento = almacenamiento
+
+    def columnas(self, desde=None, hasta=None, code=None):
+        return self.almacenamiento.columnas_historial(code=code, desde=desde, hasta=hasta)
+
+    def por_sensor(self, desde=None, hasta=None, code=None, percentiles=PERCENTILES):
+        """{code: {count, min, max, mean, p50.., last, last_date}} en la ventana"""
+        return agregados_por_sensor(self.columnas(desde, hasta, code), percentiles)
+
+    def por_tanque(self, desde=None, hasta=None, percentiles=PERCENTILES):
+        """{tankId: {count, min, max, mean, p50.., last, last_date}} en la ventana"""
+        return agregados_por_tanque(self.columnas(desde, hasta), percentiles)
+
+    def resumen(self, desde=None, hasta=None, percentiles=PERCENTILES):
+        """Agregados por sensor y por tanque leyendo el historial una sola vez"""
+        columnas = self.columnas(desde, hasta)
+        return {
+            "lecturas": int(len(columnas["value"])),
+            "por_sensor": agregados_por_sensor(columnas, percentiles),
+            "por_tanque": agregados_por_tanque(columnas, percentiles),
+        }
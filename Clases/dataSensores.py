@@ -1,8 +1,10 @@
 class dataSensores:
-    def __init__(self, id, id_tank, sensor, value, unit, date, deviceId=None, code=None, synced=False):
+    def __init__(self, id, id_tank=None, sensor=None, value=None, unit=None, date=None, deviceId=None, code=None, synced=False,
+                 tankId=None, name=None):
         self.id = id
-        self.tankId = id_tank
-        self.name = sensor
+        # Manejar ambos nombres para compatibilidad (archivo online usa id_tank/sensor, historial tankId/name)
+        self.tankId = id_tank if id_tank is not None else tankId
+        self.name = sensor if sensor is not None else name
         self.deviceId = deviceId
         self.code = code
         self.value = value
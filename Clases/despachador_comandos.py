@@ -0,0 +1,148 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from .canal_actuador import BAUDIOS_ACTUADORES
+
+# Prioridades (menor = antes): los comandos manuales por MQTT pasan antes que los programados
+PRIORIDAD_MANUAL = 0
+PRIORIDAD_PROGRAMADA = 1
+
+# Un comando igual al último pedido se une a él si todavía no salió o salió hace menos de esto (segundos)
+VENTANA_COALESCER = 2.0
+
+
+class _Comando:
+    __slots__ = ("codigo", "prioridad", "futuro", "encolado", "despachado")
+
+    def __init__(self, codigo, prioridad):
+        self.codigo = codigo
+        self.prioridad = prioridad
+        self.futuro = Future()
+        self.encolado = time.monotonic()
+        self.despachado = None   # instante en que se escribió al puerto
+
+
+class DespachadorComandos:
+    """Cola única de comandos hacia los actuadores.
+
+    MQTT y las configuraciones programadas solo encolan y vuelven enseguida;
+    un hilo despacha los comandos por prioridad (a igual prioridad, por orden
+    de llegada) llamando a 'enviar(codigo)', que puede devolver un Future
+    con la respuesta del Arduino (CanalActuador.enviar). Un comando igual al
+    último encolado se une a ese (mismo Future) mientras no haya salido o
+    dentro de la ventana, así una ráfaga de "on" repetidos sale una vez.
+    """
+
+    def __init__(self, enviar, ventana_coalescer=VENTANA_COALESCER):
+        self.enviar = enviar
+        self.ventana_coalescer = ventana_coalescer
+        self._heap = []   # (prioridad, secuencia, _Comando)
+        self._secuencia = itertools.count()
+        self._ultimo = None
+        self._cond = threading.Condition()
+        self.running = False
+        self.hilo = None
+        self.estadisticas = {"encolados": 0, "despachados": 0, "coalescidos": 0, "errores": 0}
+
+    def iniciar(self):
+        if self.running:
+            return self
+        self.running = True
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+        return self
+
+    def detener(self, timeout=5):
+        """Despacha lo pendiente y detiene el hilo"""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Productores
+    # ------------------------------------------------------------------
+    def encolar(self, codigo, prioridad=PRIORIDAD_PROGRAMADA):
+        """Encola un comando y devuelve un Future con la respuesta del Arduino"""
+        with self._cond:
+            ultimo = self._ultimo
+            if ultimo is not None and ultimo.codigo == codigo and (
+                    ultimo.despachado is None
+                    or time.monotonic() - ultimo.despachado < self.ventana_coalescer):
+                self.estadisticas["coalescidos"] += 1
+                if ultimo.despachado is None and prioridad < ultimo.prioridad:
+                    # Sube de prioridad: la entrada vieja del heap se saltea al salir
+                    ultimo.prioridad = prioridad
+                    heapq.heappush(self._heap, (prioridad, next(self._secuencia), ultimo))
+                    self._cond.notify()
+                return ultimo.futuro
+
+            comando = _Comando(codigo, prioridad)
+            heapq.heappush(self._heap, (prioridad, next(self._secuencia), comando))
+            self._ultimo = comando
+            self.estadisticas["encolados"] += 1
+            self._cond.notify()
+            return comando.futuro
+
+    # ------------------------------------------------------------------
+    # Hilo despachador
+    # ------------------------------------------------------------------
+    def _siguiente(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    prioridad, _, comando = heapq.heappop(self._heap)
+                    if comando.despachado is None and prioridad == comando.prioridad:
+                        comando.despachado = time.monotonic()
+                        return comando
+                if not self.running:
+                    return None
+                self._cond.wait()
+
+    def _bucle(self):
+        while True:
+            comando = self._siguiente()
+            if comando is None:
+                return
+            try:
+                respuesta = self.enviar(comando.codigo)
+            except Exception as e:
+                print(f"❌ Error enviando comando '{comando.codigo}': {e}")
+                self.estadisticas["errores"] += 1
+                comando.futuro.set_exception(e)
+                continue
+            self.estadisticas["despachados"] += 1
+            if isinstance(respuesta, Future):
+                respuesta.add_done_callback(lambda r, futuro=comando.futuro: _copiar_resultado(r, futuro))
+            else:
+                comando.futuro.set_result(respuesta)
+
+    def estado(self):
+        with self._cond:
+            return dict(self.estadisticas, pendientes=len({id(c) for _, _, c in self._heap if c.despachado is None}))
+
+
+def _copiar_resultado(origen, destino):
+    if origen.exception() is not None:
+        destino.set_exception(origen.exception())
+    else:
+        destino.set_result(origen.result())
+
+
+_despachadores = {}
+_lock_despachadores = threading.Lock()
+
+
+def obtener_despachador(puerto, baudios=BAUDIOS_ACTUADORES):
+    """Despachador del puerto de actuadores; el canal serial se abre en el hilo despachador"""
+    from .canal_actuador import obtener_canal_actuador
+
+    with _lock_despachadores:
+        despachador = _despachadores.get(puerto)
+        if despachador is None:
+            despachador = _despachadores[puerto] = DespachadorComandos(
+                lambda codigo: obtener_canal_actuador(puerto, baudios).enviar(codigo))
+        return despachador.iniciar()
@@ -0,0 +1,218 @@
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from .motor_alertas import NOMBRES_SENSORES
+from .registro_config import obtener_mapa_alertas
+
+# Valores por defecto de las claves opcionales de alertasMapa.json
+ALPHA_EWMA = 0.1          # "alpha": peso de la lectura nueva en la media móvil exponencial
+MUESTRAS_MINIMAS = 30     # "muestras_min": lecturas antes de empezar a evaluar el z-score
+VENTANA_CAMBIO = 300.0    # "ventana_cambio": segundos sobre los que se mide la pendiente
+# La ventana de pendiente se guarda en esta cantidad de cubetas (memoria constante por sensor)
+CUBETAS_VENTANA = 10
+
+# Anomalía detectada: 'tipo' es "zscore" o "cambio"
+Anomalia = namedtuple("Anomalia", ("code", "tipo", "valor", "mensaje"))
+
+# Posiciones dentro de una cubeta: [clave, n, Σt, Σv, Σtv, Σt²] con t relativo al origen del sensor
+_CLAVE, _N, _ST, _SV, _STV, _STT = range(6)
+
+
+class _EstadoSensor:
+    __slots__ = ("n", "ewma", "varianza", "origen", "cubetas", "cerradas", "en_zscore", "en_cambio")
+
+    def __init__(self):
+        self.n = 0
+        self.ewma = None
+        self.varianza = 0.0
+        self.en_zscore = False
+        self.reiniciar_ventana()
+
+    def reiniciar_ventana(self):
+        self.origen = None
+        self.cubetas = deque()
+        self.cerradas = [0, 0.0, 0.0, 0.0, 0.0]   # sumas de las cubetas cerradas dentro de la ventana
+        self.en_cambio = False
+
+
+class DetectorAnomalias:
+    """Detector incremental de desvíos y cambios bruscos por sensor.
+
+    Complementa los rangos fijos de alertasMapa.json con dos reglas opcionales
+    por sensor, evaluadas en línea en la ingesta con O(1) por lectura:
+
+        "zscore":      desvío máximo entre la lectura y la media móvil (EWMA),
+                       en desviaciones estándar de la varianza móvil con el
+                       mismo peso exponencial (se adapta a los cambios lentos)
+        "cambio_max":  cambio máximo en "ventana_cambio" segundos, según la
+                       pendiente por mínimos cuadrados de la ventana deslizante
+
+    La ventana de la pendiente se guarda como sumas en unas pocas cubetas de
+    tiempo, así la memoria por sensor es constante sin importar la tasa de
+    lecturas. Solo se informa la entrada a cada anomalía, no cada lectura.
+    """
+
+    def __init__(self, mapa_alertas):
+        self.mapa_alertas = mapa_alertas
+        self.reglas = {}
+        self.estados = {}
+        self._lock = threading.Lock()
+        for code, regla in mapa_alertas.items():
+            if regla.get("zscore") is None and regla.get("cambio_max") is None:
+                continue
+            nombre = code.split("/")[0]
+            self.reglas[code] = {
+                "nombre": NOMBRES_SENSORES.get(nombre, nombre),
+                "zscore": regla.get("zscore"),
+                "cambio_max": regla.get("cambio_max"),
+                "ventana": float(regla.get("ventana_cambio") or VENTANA_CAMBIO),
+                "alpha": float(regla.get("alpha") or ALPHA_EWMA),
+                "muestras_min": int(regla.get("muestras_min") or MUESTRAS_MINIMAS),
+            }
+            self.estados[code] = _EstadoSensor()
+
+    def heredar_estados(self, anterior):
+        """Conserva las estadísticas de los sensores que siguen configurados tras recargar el mapa"""
+        for code in self.estados:
+            if code in anterior.estados:
+                estado = self.estados[code] = anterior.estados[code]
+                # Las cubetas están en el ancho de la ventana anterior: si cambió, se empieza de cero
+                if anterior.reglas[code]["ventana"] != self.reglas[code]["ventana"]:
+                    estado.reiniciar_ventana()
+
+    def agregar(self, sensor, valor, ahora=None):
+        """Actualiza las estadísticas del sensor y devuelve las anomalías que empiezan con esta lectura"""
+        code = getattr(sensor, "code", sensor)
+        regla = self.reglas.get(code)
+        if regla is None:
+            return []
+        ahora = time.monotonic() if ahora is None else ahora
+        anomalias = []
+        with self._lock:
+            estado = self.estados[code]
+            referencia = estado.ewma
+            z = self._actualizar_estadisticas(estado, regla, valor)
+            if regla["zscore"] is not None and z is not None:
+                fuera = abs(z) > regla["zscore"]
+                if fuera and not estado.en_zscore:
+                    anomalias.append(Anomalia(code, "zscore", valor,
+                                              f"{regla['nombre']} anómala: {valor} "
+                                              f"(z={z:.1f}, media móvil {referencia:.2f})"))
+                estado.en_zscore = fuera
+
+            cambio = self._actualizar_pendiente(estado, regla, ahora, valor)
+            if regla["cambio_max"] is not None and cambio is not None:
+                fuera = abs(cambio) > regla["cambio_max"]
+                if fuera and not estado.en_cambio:
+                    anomalias.append(Anomalia(code, "cambio", valor,
+                                              f"{regla['nombre']} cambia rápido: {cambio:+.2f} en "
+                                              f"{regla['ventana'] / 60:g} min (valor {valor}, "
+                                              f"máximo {regla['cambio_max']})"))
+                estado.en_cambio = fuera
+        return anomalias
+
+    # ------------------------------------------------------------------
+    # Estadísticas incrementales
+    # ------------------------------------------------------------------
+    def _actualizar_estadisticas(self, estado, regla, valor):
+        """EWMA + varianza exponencial; devuelve el z-score de la lectura respecto de lo visto antes (o None)"""
+        z = None
+        if estado.n >= regla["muestras_min"] and estado.varianza > 0:
+            z = (valor - estado.ewma) / math.sqrt(estado.varianza)
+
+        estado.n += 1
+        if estado.ewma is None:
+            estado.ewma = valor
+            return z
+        # Media y varianza móviles con el mismo alpha: las lecturas viejas pesan cada vez menos
+        alpha = regla["alpha"]
+        delta = valor - estado.ewma
+        incremento = alpha * delta
+        estado.ewma += incremento
+        estado.varianza = (1 - alpha) * (estado.varianza + delta * incremento)
+        return z
+
+    def _actualizar_pendiente(self, estado, regla, ahora, valor):
+        """Agrega la lectura a la ventana y devuelve el cambio estimado en la ventana (o None)"""
+        ventana = regla["ventana"]
+        ancho = ventana / CUBETAS_VENTANA
+        clave = int(ahora // ancho)
+        cubetas = estado.cubetas
+        if not cubetas or cubetas[-1][_CLAVE] != clave:
+            # Cubeta nueva: se descartan las que salieron de la ventana y se recalculan las sumas
+            while cubetas and cubetas[0][_CLAVE] <= clave - CUBETAS_VENTANA:
+                cubetas.popleft()
+            self._mover_origen(estado, (cubetas[0][_CLAVE] if cubetas else clave) * ancho)
+            cerradas = [0, 0.0, 0.0, 0.0, 0.0]
+            for cubeta in cubetas:
+                for i in range(5):
+                    cerradas[i] += cubeta[i + 1]
+            estado.cerradas = cerradas
+            cubetas.append([clave, 0, 0.0, 0.0, 0.0, 0.0])
+
+        t = ahora - estado.origen
+        actual = cubetas[-1]
+        actual[_N] += 1
+        actual[_ST] += t
+        actual[_SV] += valor
+        actual[_STV] += t * valor
+        actual[_STT] += t * t
+
+        # Hace falta cubrir al menos media ventana para que la pendiente signifique algo
+        if (clave - cubetas[0][_CLAVE] + 1) * ancho < ventana / 2:
+            return None
+        cerradas = estado.cerradas
+        n = cerradas[0] + actual[_N]
+        st = cerradas[1] + actual[_ST]
+        sv = cerradas[2] + actual[_SV]
+        stv = cerradas[3] + actual[_STV]
+        stt = cerradas[4] + actual[_STT]
+        denominador = n * stt - st * st
+        if n < 3 or denominador <= 0:
+            return None
+        return (n * stv - st * sv) / denominador * ventana
+
+    @staticmethod
+    def _mover_origen(estado, origen):
+        """Pasa las sumas de las cubetas a un origen de tiempo nuevo (evita perder precisión)"""
+        if estado.origen is None:
+            estado.origen = origen
+            return
+        d = origen - estado.origen
+        if d:
+            for cubeta in estado.cubetas:
+                n, st, sv = cubeta[_N], cubeta[_ST], cubeta[_SV]
+                cubeta[_STT] += -2 * d * st + n * d * d
+                cubeta[_STV] -= d * sv
+                cubeta[_ST] = st - n * d
+        estado.origen = origen
+
+    def estadisticas(self, code):
+        """Media y desviación móviles (EWMA) y anomalías activas del sensor"""
+        estado = self.estados.get(code)
+        if estado is None:
+            return None
+        desvio = math.sqrt(estado.varianza) if estado.n > 1 else None
+        return {"n": estado.n, "ewma": estado.ewma, "desvio": desvio,
+                "zscore": estado.en_zscore, "cambio": estado.en_cambio}
+
+
+_detector = None
+_lock_detector = threading.Lock()
+
+
+def obtener_detector_anomalias():
+    """Detector del mapa de alertas actual (se rearma solo si alertasMapa.json cambió)"""
+    global _detector
+    mapa = obtener_mapa_alertas()
+    detector = _detector
+    if detector is None or detector.mapa_alertas is not mapa:
+        with _lock_detector:
+            if _detector is None or _detector.mapa_alertas is not mapa:
+                nuevo = DetectorAnomalias(mapa)
+                if _detector is not None:
+                    nuevo.heredar_estados(_detector)
+                _detector = nuevo
+            detector = _detector
+    return detector
@@ -0,0 +1,187 @@
+import threading
+import time
+from .almacenamiento import agregar_en, sincronizar_en
+from .buffer_reciente import BufferCircular, percentiles_ms
+
+# Políticas de durabilidad (fsync):
+#   "lote"    -> fsync después de cada lote escrito
+#   "segundo" -> como máximo un fsync por segundo por archivo
+#   "nunca"   -> se deja al sistema operativo decidir cuándo bajar a disco
+POLITICAS_FSYNC = ("lote", "segundo", "nunca")
+
+# Latencias de registros recientes que se guardan para los percentiles
+MUESTRAS_LATENCIA = 1024
+
+
+class EscritorLotes:
+    """Etapa de escritura en segundo plano con commit agrupado.
+
+    Las lecturas se acumulan en memoria y se escriben en lote cuando se
+    juntan 'max_registros' o pasan 'max_espera_ms' desde el primer registro
+    pendiente, lo que ocurra primero. Cada lote hace una sola escritura por
+    archivo en lugar de una por lectura. Cada registro llega con su hora de
+    llegada (encolar(..., llegada), por defecto la de encolar) y metricas() da
+    la latencia de punta a punta de cada uno: desde esa llegada (en
+    SensorScheduler, la entrada a la ColaIngesta) hasta que su lote queda
+    escrito (con fsync en la política "lote").
+    """
+
+    def __init__(self, max_registros=100, max_espera_ms=200, politica_fsync="segundo"):
+        if politica_fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {politica_fsync} (usar {POLITICAS_FSYNC})")
+        self.max_registros = max_registros
+        self.max_espera = max_espera_ms / 1000.0
+        self.politica_fsync = politica_fsync
+
+        self._cond = threading.Condition()
+        self._pendientes = {}  # destino (ruta o historial segmentado) -> [registros]
+        self._cantidad = 0
+        self._inicio_lote = None
+        self._llegadas = []    # time.monotonic() de llegada de cada registro pendiente
+        self._archivos_sucios = set()
+        self._ultimo_fsync = time.monotonic()
+        self._escribiendo = False
+        self._latencias = BufferCircular(MUESTRAS_LATENCIA)
+        self.running = False
+        self.hilo = None
+
+        self.estadisticas = {"registros": 0, "lotes": 0, "fsyncs": 0, "errores": 0}
+
+    def iniciar(self):
+        """Arranca el hilo escritor."""
+        if self.running:
+            return
+        self.running = True
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+        print(f"✍️ Escritor por lotes iniciado (N={self.max_registros}, T={int(self.max_espera * 1000)}ms, fsync={self.politica_fsync})")
+
+    def encolar(self, archivo, registro, llegada=None):
+        """Agrega un registro al lote pendiente del archivo (no toca disco).
+
+        'llegada' es el time.monotonic() desde el que se mide su latencia.
+        """
+        with self._cond:
+            ahora = time.monotonic()
+            if self._cantidad == 0:
+                self._inicio_lote = ahora
+            self._pendientes.setdefault(archivo, []).append(registro)
+            self._llegadas.append(llegada or ahora)
+            self._cantidad += 1
+            # Se despierta al hilo con el primer registro (para que arme el plazo T) o al llegar a N
+            if self._cantidad == 1 or self._cantidad >= self.max_registros:
+                self._cond.notify()
+
+    def vaciar(self, timeout=5):
+        """Bloquea hasta que todo lo encolado hasta ahora quede escrito."""
+        limite = time.monotonic() + timeout
+        with self._cond:
+            self._inicio_lote = 0.0  # fuerza el vencimiento del lote actual
+            self._cond.notify()
+            while self._cantidad or self._escribiendo:
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self.running:
+                    break
+                self._cond.wait(restante)
+        if not self.running:
+            self._escribir_pendientes()
+
+    def detener(self):
+        """Escribe lo pendiente, hace fsync final y detiene el hilo."""
+        if not self.running:
+            return
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=5)
+        self._escribir_pendientes()
+        if self.politica_fsync != "nunca":
+            self._fsync_sucios()
+        print(f"✍️ Escritor por lotes detenido: {self.estadisticas}")
+
+    def _lote_vencido(self):
+        if not self._cantidad:
+            return False
+        return (self._cantidad >= self.max_registros or
+                time.monotonic() - self._inicio_lote >= self.max_espera)
+
+    def _tomar_lote(self):
+        lote, llegadas = self._pendientes, self._llegadas
+        self._pendientes = {}
+        self._llegadas = []
+        self._cantidad = 0
+        self._inicio_lote = None
+        return lote, llegadas
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while self.running and not self._lote_vencido():
+                    if self._cantidad:
+                        espera = self.max_espera - (time.monotonic() - self._inicio_lote)
+                    elif self._archivos_sucios and self.politica_fsync == "segundo":
+                        espera = 1.0 - (time.monotonic() - self._ultimo_fsync)
+                    else:
+                        espera = None
+                    if espera is not None and espera <= 0:
+                        break
+                    self._cond.wait(espera)
+                if not self.running:
+                    return
+                lote, llegadas = self._tomar_lote()
+                self._escribiendo = True
+
+            try:
+                self._escribir(lote, llegadas)
+            finally:
+                with self._cond:
+                    self._escribiendo = False
+                    self._cond.notify_all()
+
+    def _escribir_pendientes(self):
+        with self._cond:
+            lote, llegadas = self._tomar_lote()
+        self._escribir(lote, llegadas)
+
+    def _escribir(self, lote, llegadas=()):
+        fsync_lote = self.politica_fsync == "lote"
+        for archivo, registros in lote.items():
+            try:
+                agregar_en(archivo, registros, sincronizar=fsync_lote)
+                self.estadisticas["registros"] += len(registros)
+                if fsync_lote:
+                    self.estadisticas["fsyncs"] += 1
+                elif self.politica_fsync == "segundo":
+                    self._archivos_sucios.add(archivo)
+            except Exception as e:
+                self.estadisticas["errores"] += 1
+                print(f"❌ Error escribiendo lote en {archivo}: {e}")
+        if lote:
+            self.estadisticas["lotes"] += 1
+            ahora = time.monotonic()
+            with self._cond:
+                for llegada in llegadas:
+                    self._latencias.agregar(ahora, ahora - llegada)
+
+        if self.politica_fsync == "segundo" and time.monotonic() - self._ultimo_fsync >= 1.0:
+            self._fsync_sucios()
+
+    def metricas(self):
+        """Estadísticas y latencia llegada→commit (ms) de los últimos registros"""
+        with self._cond:
+            metricas = dict(self.estadisticas)
+            _, latencias = self._latencias.ultimos()
+        if latencias:
+            metricas["latencia_total_ms"] = percentiles_ms(latencias)
+        return metricas
+
+    def _fsync_sucios(self):
+        for archivo in list(self._archivos_sucios):
+            try:
+                sincronizar_en(archivo)
+                self.estadisticas["fsyncs"] += 1
+            except Exception as e:
+                print(f"⚠️ Error en fsync de {archivo}: {e}")
+        self._archivos_sucios.clear()
+        self._ultimo_fsync = time.monotonic()
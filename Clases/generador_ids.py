@@ -0,0 +1,111 @@
+import atexit
+import os
+import re
+import threading
+
+# Cuántos IDs se reservan cada vez que se persiste la marca de agua
+BLOQUE_RESERVA = 100
+# Bytes que se leen del final del archivo para recuperar el último ID
+TAMANO_COLA = 4096
+
+_PATRON_ID = re.compile(r'"id"\s*:\s*(\d+)')
+
+
+class GeneradorIds:
+    """Asigna IDs crecientes para un archivo de registros sin recorrerlo.
+
+    El contador vive en memoria. En el archivo '<archivo>.id' se guarda una
+    marca de agua con IDs reservados por adelantado, así que solo se escribe
+    una vez cada BLOQUE_RESERVA IDs. Al reiniciar se toma el mayor valor entre
+    la marca y el último ID encontrado en la cola del archivo, de modo que
+    nunca se repiten IDs aunque el proceso se haya caído o el archivo se haya
+    vaciado tras sincronizar.
+    """
+
+    def __init__(self, archivo, bloque=BLOQUE_RESERVA, archivo_cola=None, ultimo_id=None):
+        self.archivo = archivo
+        # Para historiales segmentados, el archivo donde buscar el último ID es otro
+        # (puede ser una ruta o una función que la devuelve)
+        self.archivo_cola = archivo_cola
+        # Para backends que no son archivos (ej. SQLite), función que devuelve el último ID
+        self.ultimo_id = ultimo_id
+        self.archivo_marca = f"{archivo}.id"
+        self.bloque = bloque
+        self._lock = threading.Lock()
+        self._ultimo = max(self._leer_marca(), self._ultimo_id_en_cola())
+        self._reservado = self._ultimo
+
+    def _leer_marca(self):
+        try:
+            with open(self.archivo_marca, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            print(f"⚠️ Marca de IDs corrupta en {self.archivo_marca}, se recupera desde el archivo")
+            return 0
+
+    def _ultimo_id_en_cola(self):
+        """Busca el mayor ID en los últimos bytes del archivo (NDJSON o arreglo JSON)"""
+        if self.ultimo_id is not None:
+            return self.ultimo_id()
+        archivo = self.archivo_cola() if callable(self.archivo_cola) else (self.archivo_cola or self.archivo)
+        if not archivo:
+            return 0
+        try:
+            with open(archivo, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                tamano = f.tell()
+                f.seek(max(0, tamano - TAMANO_COLA))
+                cola = f.read().decode("utf-8", errors="ignore")
+        except FileNotFoundError:
+            return 0
+        ids = [int(m) for m in _PATRON_ID.findall(cola)]
+        return max(ids) if ids else 0
+
+    def _escribir_marca(self, valor):
+        temporal = f"{self.archivo_marca}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(str(valor))
+        os.replace(temporal, self.archivo_marca)
+
+    def siguiente(self):
+        """Devuelve el siguiente ID en tiempo constante"""
+        with self._lock:
+            self._ultimo += 1
+            if self._ultimo > self._reservado:
+                self._reservado = self._ultimo + self.bloque - 1
+                self._escribir_marca(self._reservado)
+            return self._ultimo
+
+    def guardar(self):
+        """Persiste el último ID asignado (cierre limpio, sin dejar huecos)"""
+        with self._lock:
+            self._reservado = self._ultimo
+            self._escribir_marca(self._ultimo)
+
+
+_generadores = {}
+_lock_generadores = threading.Lock()
+
+
+def obtener_generador(archivo, archivo_cola=None, ultimo_id=None):
+    """Devuelve el generador compartido para un archivo, creándolo si hace falta"""
+    generador = _generadores.get(archivo)
+    if generador is None:
+        with _lock_generadores:
+            generador = _generadores.get(archivo)
+            if generador is None:
+                generador = GeneradorIds(archivo, archivo_cola=archivo_cola, ultimo_id=ultimo_id)
+                _generadores[archivo] = generador
+    return generador
+
+
+@atexit.register
+def guardar_generadores():
+    """Guarda la marca exacta de todos los generadores al salir"""
+    for generador in list(_generadores.values()):
+        try:
+            generador.guardar()
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la marca de IDs de {generador.archivo}: {e}")
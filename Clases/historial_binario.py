@@ -0,0 +1,265 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RUTA_BINARIO = "Jsons_DATA/historial.bin"
+
+# Registro de tamaño fijo (24 bytes, little-endian):
+#   int64 tiempo en microsegundos epoch | int32 deviceId | uint16 índice de code | 2 bytes relleno | float64 valor
+FORMATO_REGISTRO = struct.Struct("<qiHxxd")
+TAMANO_REGISTRO = FORMATO_REGISTRO.size
+
+if np is not None:
+    DTYPE_REGISTRO = np.dtype([("ts", "<i8"), ("deviceId", "<i4"), ("code", "<u2"),
+                               ("_relleno", "V2"), ("value", "<f8")])
+
+
+def _a_microsegundos(fecha):
+    """Fecha ISO local -> microsegundos epoch"""
+    return int(datetime.fromisoformat(fecha.replace("Z", "+00:00")).timestamp() * 1_000_000)
+
+
+def _a_iso(microsegundos):
+    return datetime.fromtimestamp(microsegundos / 1_000_000).isoformat()
+
+
+class HistorialBinario:
+    """Historial compacto de registros binarios de tamaño fijo.
+
+    La lectura se hace con mmap + numpy.frombuffer, así que los rangos y las
+    agregaciones trabajan directamente sobre el archivo sin crear un objeto
+    Python por lectura. Los códigos de sensor se guardan una sola vez en
+    '<archivo>.codigos.json' y cada registro solo lleva su índice.
+    """
+
+    def __init__(self, ruta=RUTA_BINARIO):
+        self.ruta = ruta
+        self.ruta_codigos = f"{ruta}.codigos.json"
+        self.clave_ids = ruta
+        self._lock = threading.Lock()
+        self._codigos = self._cargar_codigos()
+        self._indice_codigos = {code: i for i, code in enumerate(self._codigos)}
+        self._revisado = False
+
+    # ------------------------------------------------------------------
+    # Tabla de códigos
+    # ------------------------------------------------------------------
+    def _cargar_codigos(self):
+        try:
+            with open(self.ruta_codigos, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _guardar_codigos(self):
+        temporal = f"{self.ruta_codigos}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self._codigos, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta_codigos)
+
+    def indice_codigo(self, code):
+        """Índice del código de sensor, registrándolo si es nuevo"""
+        indice = self._indice_codigos.get(code)
+        if indice is None:
+            indice = len(self._codigos)
+            self._codigos.append(code)
+            self._indice_codigos[code] = indice
+            self._guardar_codigos()
+        return indice
+
+    @property
+    def codigos(self):
+        return list(self._codigos)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def _descartar_registro_cortado(self):
+        """Recorta un registro a medio escribir al final del archivo (corte de energía)"""
+        if self._revisado:
+            return
+        if os.path.exists(self.ruta):
+            sobrante = os.path.getsize(self.ruta) % TAMANO_REGISTRO
+            if sobrante:
+                with open(self.ruta, "rb+") as f:
+                    f.truncate(os.path.getsize(self.ruta) - sobrante)
+                print(f"⚠️ Registro incompleto descartado al final de {self.ruta}")
+        self._revisado = True
+
+    def agregar(self, registros, sincronizar=False):
+        """Agrega registros (formato historial JSON) como registros binarios"""
+        if not registros:
+            return
+        with self._lock:
+            self._descartar_registro_cortado()
+            bloque = b"".join(
+                FORMATO_REGISTRO.pack(_a_microsegundos(r["date"]), int(r.get("deviceId") or 0),
+                                      self.indice_codigo(r["code"]), float(r["value"]))
+                for r in registros
+            )
+            with open(self.ruta, "ab") as f:
+                f.write(bloque)
+                if sincronizar:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def sincronizar(self):
+        if os.path.exists(self.ruta):
+            with open(self.ruta, "ab") as f:
+                os.fsync(f.fileno())
+
+    def cantidad(self):
+        try:
+            return os.path.getsize(self.ruta) // TAMANO_REGISTRO
+        except FileNotFoundError:
+            return 0
+
+    def ultimo_id(self):
+        # Los registros binarios no guardan id: se usa la posición como id
+        return self.cantidad()
+
+    # ------------------------------------------------------------------
+    # Lectura sin copias
+    # ------------------------------------------------------------------
+    def arreglo(self):
+        """Arreglo estructurado NumPy mapeado sobre el archivo (solo lectura, sin copiar)"""
+        if np is None:
+            raise RuntimeError("NumPy no está instalado; requerido para leer el historial binario")
+        cantidad = self.cantidad()
+        if cantidad == 0:
+            return np.zeros(0, dtype=DTYPE_REGISTRO)
+        with open(self.ruta, "rb") as f:
+            mapa = mmap.mmap(f.fileno(), cantidad * TAMANO_REGISTRO, access=mmap.ACCESS_READ)
+        # El arreglo mantiene vivo el mmap mientras se use
+        return np.frombuffer(mapa, dtype=DTYPE_REGISTRO, count=cantidad)
+
+    def rango(self, desde=None, hasta=None, code=None):
+        """Vista de los registros entre dos fechas ISO (búsqueda binaria sobre ts)"""
+        datos = self.arreglo()
+        ts = datos["ts"]
+        inicio = np.searchsorted(ts, _a_microsegundos(desde), side="left") if desde else 0
+        fin = np.searchsorted(ts, _a_microsegundos(hasta), side="right") if hasta else len(datos)
+        datos = datos[inicio:fin]
+        if code is not None:
+            indice = self._indice_codigos.get(code)
+            if indice is None:
+                return datos[:0]
+            datos = datos[datos["code"] == indice]
+        return datos
+
+    def agregados(self, desde=None, hasta=None):
+        """count/min/max/mean por código sobre el rango, sin objetos por lectura"""
+        datos = self.rango(desde, hasta)
+        resultado = {}
+        if len(datos) == 0:
+            return resultado
+        codigos = datos["code"]
+        valores = datos["value"]
+        orden = np.argsort(codigos, kind="stable")
+        codigos_ordenados = codigos[orden]
+        valores_ordenados = valores[orden]
+        unicos, inicios, cuentas = np.unique(codigos_ordenados, return_index=True, return_counts=True)
+        minimos = np.minimum.reduceat(valores_ordenados, inicios)
+        maximos = np.maximum.reduceat(valores_ordenados, inicios)
+        sumas = np.add.reduceat(valores_ordenados, inicios)
+        for i, indice in enumerate(unicos):
+            resultado[self._codigos[indice]] = {
+                "count": int(cuentas[i]),
+                "min": float(minimos[i]),
+                "max": float(maximos[i]),
+                "mean": float(sumas[i] / cuentas[i]),
+            }
+        return resultado
+
+    def leer(self, desde=None, hasta=None):
+        """Registros del rango como diccionarios (formato historial), para compatibilidad"""
+        datos = self.rango(desde, hasta)
+        return [
+            {"id": None, "deviceId": int(d), "code": self._codigos[c],
+             "name": self._codigos[c].split("/")[0], "value": float(v), "date": _a_iso(int(t))}
+            for t, d, c, v in zip(datos["ts"], datos["deviceId"], datos["code"], datos["value"])
+        ]
+
+    def eliminar_antiguos(self, dias_mantener=7):
+        """Descarta los registros anteriores al límite copiando solo los bytes restantes"""
+        limite = _a_microsegundos((datetime.now() - timedelta(days=dias_mantener)).isoformat())
+        with self._lock:
+            datos = self.arreglo()
+            corte = int(np.searchsorted(datos["ts"], limite, side="left"))
+            del datos
+            if corte == 0:
+                print("🧹 No hay datos antiguos para limpiar")
+                return 0
+            temporal = f"{self.ruta}.tmp"
+            with open(self.ruta, "rb") as origen, open(temporal, "wb") as destino:
+                origen.seek(corte * TAMANO_REGISTRO)
+                while True:
+                    bloque = origen.read(1 << 20)
+                    if not bloque:
+                        break
+                    destino.write(bloque)
+            os.replace(temporal, self.ruta)
+        print(f"🧹 Limpiados {corte} datos antiguos (>{dias_mantener} días)")
+        return corte
+
+
+def convertir_json_a_binario(origen, destino=RUTA_BINARIO):
+    """Convierte un historial JSON/NDJSON (archivo o directorio de segmentos) al formato binario.
+
+    Se escribe en un temporal que se renombra al terminar, y no se convierte
+    sobre un destino con registros (una segunda corrida los duplicaría).
+    """
+    from .almacenamiento import leer_registros
+    from .historial_segmentado import HistorialSegmentado
+
+    if os.path.exists(destino) and os.path.getsize(destino) >= TAMANO_REGISTRO:
+        raise FileExistsError(f"{destino} ya tiene registros; borrarlo o usar otro destino para convertir")
+
+    if os.path.isdir(origen):
+        registros = HistorialSegmentado(origen, archivo_heredado=None).leer()
+    else:
+        registros = leer_registros(origen)
+
+    registros = [r for r in registros if r.get("date") and r.get("code") and r.get("value") is not None]
+    registros.sort(key=lambda r: r["date"])
+
+    if not registros:
+        print(f"⚠️ {origen} no tiene registros para convertir")
+        return 0
+
+    temporal = f"{destino}.convirtiendo"
+    for ruta in (temporal, f"{temporal}.codigos.json"):
+        if os.path.exists(ruta):
+            os.remove(ruta)   # restos de una conversión cortada
+    historial = HistorialBinario(temporal)
+    tamano_lote = 10000
+    for i in range(0, len(registros), tamano_lote):
+        historial.agregar(registros[i:i + tamano_lote])
+    historial.sincronizar()
+    # Los códigos primero: si se corta antes del segundo rename, el destino sigue vacío
+    os.replace(historial.ruta_codigos, f"{destino}.codigos.json")
+    os.replace(temporal, destino)
+    print(f"✅ {len(registros)} registros convertidos de {origen} a {destino} "
+          f"({os.path.getsize(destino)} bytes)")
+    return len(registros)
+
+
+if __name__ == "__main__":
+    # Uso: python -m Clases.historial_binario <origen.json|directorio_segmentos> [destino.bin]
+    if len(sys.argv) < 2:
+        print("Uso: python -m Clases.historial_binario <origen> [destino]")
+        sys.exit(1)
+    try:
+        convertir_json_a_binario(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else RUTA_BINARIO)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
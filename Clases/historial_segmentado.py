@@ -0,0 +1,306 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from .almacenamiento import (leer_registros, escribir_registros, agregar_registros, sincronizar_archivo,
+                            agregar_lineas, serializar_linea, leer_registros_rango, MODO_ALMACENAMIENTO)
+from .indice_temporal import IndiceTemporal, EXTENSION_INDICE
+
+DIRECTORIO_HISTORIAL = "Jsons_DATA/historial"
+ARCHIVO_HEREDADO = "Jsons_DATA/data_sensores_local.json"
+EXTENSION = ".ndjson"
+
+# Largo del prefijo de la fecha ISO que identifica cada segmento
+_LARGO_CLAVE = {"hora": 13, "dia": 10}   # "2025-08-15T00" / "2025-08-15"
+_DURACION = {"hora": timedelta(hours=1), "dia": timedelta(days=1)}
+
+
+def _sin_duplicados(registros):
+    """Quita los registros repetidos por (id, date), conservando el primero"""
+    vistos = set()
+    unicos = []
+    for registro in registros:
+        llave = (registro.get("id"), registro.get("date"))
+        if llave not in vistos:
+            vistos.add(llave)
+            unicos.append(registro)
+    return unicos
+
+
+class HistorialSegmentado:
+    """Historial local particionado en archivos por hora o por día.
+
+    Cada lectura se agrega al segmento que corresponde a su fecha, así que la
+    retención solo borra segmentos completos ya vencidos y nunca reescribe el
+    resto del historial. La compactación une los segmentos horarios de días
+    cerrados en un solo archivo diario.
+
+    Cada segmento NDJSON lleva además un índice disperso por minuto
+    ('<segmento>.idx', ver IndiceTemporal) que se mantiene al agregar, así
+    las consultas de rango leen solo los bytes de los minutos pedidos.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_HISTORIAL, particion="hora", archivo_heredado=ARCHIVO_HEREDADO):
+        if particion not in _LARGO_CLAVE:
+            raise ValueError(f"Partición inválida: {particion} (usar 'hora' o 'dia')")
+        self.directorio = directorio
+        self.particion = particion
+        self.archivo_heredado = archivo_heredado
+        self._lock = threading.Lock()
+        self._migrado = False
+        self._segmentos_sucios = set()
+        self._indices = {}
+        # Los offsets solo tienen sentido con el formato NDJSON de solo agregar
+        self.usar_indice = MODO_ALMACENAMIENTO != "json"
+        self.hilo_mantenimiento = None
+        self.mantenimiento_activo = False
+
+    # ------------------------------------------------------------------
+    # Segmentos
+    # ------------------------------------------------------------------
+    def clave_segmento(self, fecha):
+        """Clave del segmento para una fecha ISO (ej. '2025-08-15T00')"""
+        return fecha[:_LARGO_CLAVE[self.particion]]
+
+    def ruta_segmento(self, clave):
+        return os.path.join(self.directorio, f"{clave}{EXTENSION}")
+
+    def segmentos(self):
+        """Lista ordenada de (clave, ruta) de los segmentos existentes"""
+        if not os.path.isdir(self.directorio):
+            return []
+        claves = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(EXTENSION):
+                continue
+            clave = nombre[:-len(EXTENSION)]
+            try:
+                self._rango_clave(clave)
+            except ValueError:
+                print(f"⚠️ Segmento con nombre inválido ignorado: {nombre}")
+                continue
+            claves.append(clave)
+        return [(clave, self.ruta_segmento(clave)) for clave in sorted(claves)]
+
+    @staticmethod
+    def _rango_clave(clave):
+        """Devuelve (inicio, fin) del periodo que cubre un segmento"""
+        if len(clave) == _LARGO_CLAVE["hora"]:
+            inicio = datetime.strptime(clave, "%Y-%m-%dT%H")
+            return inicio, inicio + _DURACION["hora"]
+        inicio = datetime.strptime(clave, "%Y-%m-%d")
+        return inicio, inicio + _DURACION["dia"]
+
+    def indice(self, ruta):
+        """Índice temporal del segmento (se carga al primer uso)"""
+        indice = self._indices.get(ruta)
+        if indice is None:
+            indice = self._indices[ruta] = IndiceTemporal(ruta)
+        return indice
+
+    def _eliminar_segmento(self, ruta):
+        """Borra un segmento junto con su índice"""
+        os.remove(ruta)
+        indice = self._indices.pop(ruta, None)
+        if indice is not None:
+            indice.eliminar()
+        else:
+            try:
+                os.remove(f"{ruta}{EXTENSION_INDICE}")
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Escritura / lectura
+    # ------------------------------------------------------------------
+    def agregar(self, registros, sincronizar=False):
+        """Agrega registros al segmento correspondiente a su fecha"""
+        if not registros:
+            return
+        self._migrar_heredado()
+        por_segmento = {}
+        for registro in registros:
+            clave = self.clave_segmento(registro.get("date") or datetime.now().isoformat())
+            por_segmento.setdefault(clave, []).append(registro)
+        with self._lock:
+            for clave, lote in por_segmento.items():
+                ruta = self.ruta_segmento(clave)
+                if self.usar_indice:
+                    lineas = [serializar_linea(r) for r in lote]
+                    inicio = agregar_lineas(ruta, lineas, sincronizar=sincronizar)
+                    self.indice(ruta).registrar([r.get("date", "") for r in lote], inicio,
+                                                [len(linea) for linea in lineas])
+                else:
+                    agregar_registros(ruta, lote, sincronizar=sincronizar)
+                if not sincronizar:
+                    self._segmentos_sucios.add(ruta)
+
+    def ultimo_segmento(self):
+        """Ruta del segmento más reciente (o None si el historial está vacío)"""
+        self._migrar_heredado()
+        segmentos = self.segmentos()
+        return segmentos[-1][1] if segmentos else None
+
+    def sincronizar(self):
+        """fsync de los segmentos escritos desde el último fsync"""
+        sucios, self._segmentos_sucios = self._segmentos_sucios, set()
+        for ruta in sucios:
+            sincronizar_archivo(ruta)
+
+    def leer(self, desde=None, hasta=None, code=None, tankId=None):
+        """Lee los registros entre dos fechas ISO, abriendo solo los segmentos del rango.
+
+        En los segmentos que el rango cubre solo en parte se usa el índice
+        temporal para leer únicamente los bytes de los minutos pedidos.
+        """
+        self._migrar_heredado()
+        registros = []
+        for clave, ruta in self.segmentos():
+            inicio, fin = self._rango_clave(clave)
+            if desde and fin.isoformat() <= desde:
+                continue
+            if hasta and inicio.isoformat() > hasta:
+                continue
+            completo = (not desde or inicio.isoformat() >= desde) and (not hasta or fin.isoformat() <= hasta)
+            if completo or not self.usar_indice:
+                leidos = leer_registros(ruta)
+            else:
+                leidos = []
+                for desde_byte, hasta_byte in self.indice(ruta).rangos(desde, hasta):
+                    leidos.extend(leer_registros_rango(ruta, desde_byte, hasta_byte))
+            for registro in leidos:
+                fecha = registro.get("date", "")
+                if (desde and fecha < desde) or (hasta and fecha > hasta):
+                    continue
+                if code is not None and registro.get("code") != code:
+                    continue
+                if tankId is not None and registro.get("tankId") != tankId:
+                    continue
+                registros.append(registro)
+        return registros
+
+    def _migrar_heredado(self):
+        """Reparte el archivo de historial único original en segmentos (una sola vez).
+
+        El archivo original queda como está; '<archivo>.migrado' marca que ya se
+        migró (en versiones anteriores era el mismo archivo renombrado).
+        """
+        if self._migrado:
+            return
+        with self._lock:
+            if self._migrado:
+                return
+            os.makedirs(self.directorio, exist_ok=True)
+            marca = f"{self.archivo_heredado}.migrado"
+            if self.archivo_heredado and os.path.exists(self.archivo_heredado) and not os.path.exists(marca):
+                registros = leer_registros(self.archivo_heredado)
+                por_segmento = {}
+                for registro in registros:
+                    por_segmento.setdefault(self.clave_segmento(registro.get("date", "")), []).append(registro)
+                # Se reescribe cada segmento sin duplicados (escritura atómica) antes de crear la
+                # marca: si el proceso se corta a mitad, el próximo arranque repite la migración
+                for clave, lote in por_segmento.items():
+                    ruta = self.ruta_segmento(clave)
+                    existentes = leer_registros(ruta) if os.path.exists(ruta) else []
+                    escribir_registros(ruta, _sin_duplicados(existentes + lote))
+                    sincronizar_archivo(ruta)
+                    if self.usar_indice:
+                        self.indice(ruta).reconstruir()
+                with open(marca, "w", encoding="utf-8") as f:
+                    f.write(f"{len(registros)} registros migrados a {self.directorio} el {datetime.now().isoformat()}\n")
+                print(f"🔁 Historial {self.archivo_heredado} migrado a {len(por_segmento)} segmentos en {self.directorio}")
+            self._migrado = True
+
+    # ------------------------------------------------------------------
+    # Retención y compactación
+    # ------------------------------------------------------------------
+    def eliminar_expirados(self, dias_mantener=7):
+        """Borra los segmentos cuyo periodo terminó antes del límite de retención.
+
+        Solo se mira el nombre de cada segmento, nunca su contenido. Se revisan
+        todos: el segmento diario de un día ordena antes que sus horarios, así
+        que el orden por nombre no es el orden por fin del periodo.
+        """
+        fecha_limite = datetime.now() - timedelta(days=dias_mantener)
+        eliminados = 0
+        for clave, ruta in self.segmentos():
+            _, fin = self._rango_clave(clave)
+            if fin > fecha_limite:
+                continue
+            with self._lock:
+                try:
+                    self._eliminar_segmento(ruta)
+                    eliminados += 1
+                except FileNotFoundError:
+                    pass
+        if eliminados:
+            print(f"🧹 Eliminados {eliminados} segmentos de historial (>{dias_mantener} días)")
+        else:
+            print("🧹 No hay segmentos de historial vencidos")
+        return eliminados
+
+    def compactar(self):
+        """Une los segmentos horarios de días ya cerrados en un segmento diario"""
+        if self.particion != "hora":
+            return 0
+        hoy = datetime.now().strftime("%Y-%m-%d")
+        por_dia = {}
+        for clave, ruta in self.segmentos():
+            if len(clave) == _LARGO_CLAVE["hora"] and clave[:10] < hoy:
+                por_dia.setdefault(clave[:10], []).append(ruta)
+
+        for dia, rutas_horas in por_dia.items():
+            ruta_dia = self.ruta_segmento(dia)
+            with self._lock:
+                registros = leer_registros(ruta_dia) if os.path.exists(ruta_dia) else []
+                for ruta in rutas_horas:
+                    registros.extend(leer_registros(ruta))
+                # Si una compactación anterior se cortó a medias puede haber duplicados
+                unicos = _sin_duplicados(registros)
+                unicos.sort(key=lambda r: r.get("date", ""))
+                escribir_registros(ruta_dia, unicos)
+                sincronizar_archivo(ruta_dia)
+                if self.usar_indice:
+                    self.indice(ruta_dia).reconstruir()
+                for ruta in rutas_horas:
+                    self._eliminar_segmento(ruta)
+            print(f"🗜️ Compactados {len(rutas_horas)} segmentos horarios en {ruta_dia}")
+        return len(por_dia)
+
+    def iniciar_mantenimiento(self, dias_mantener=7, intervalo=3600):
+        """Arranca un hilo que aplica retención y compactación periódicamente"""
+        if self.mantenimiento_activo:
+            return
+        self.mantenimiento_activo = True
+
+        def bucle():
+            while self.mantenimiento_activo:
+                try:
+                    self.eliminar_expirados(dias_mantener)
+                    self.compactar()
+                except Exception as e:
+                    print(f"⚠️ Error en mantenimiento del historial: {e}")
+                # Espera en pasos cortos para poder detenerse rápido
+                limite = time.monotonic() + intervalo
+                while self.mantenimiento_activo and time.monotonic() < limite:
+                    time.sleep(1)
+
+        self.hilo_mantenimiento = threading.Thread(target=bucle, daemon=True)
+        self.hilo_mantenimiento.start()
+
+    def detener_mantenimiento(self):
+        self.mantenimiento_activo = False
+
+
+_historial = None
+_lock_historial = threading.Lock()
+
+
+def obtener_historial():
+    """Instancia compartida del historial segmentado por defecto"""
+    global _historial
+    if _historial is None:
+        with _lock_historial:
+            if _historial is None:
+                _historial = HistorialSegmentado()
+    return _historial
@@ -3,6 +3,7 @@ import json
 import os
 from datetime import datetime
 from dotenv import load_dotenv
+from .almacenamiento import leer_registros, vaciar_registros
 
 load_dotenv()
 
@@ -102,8 +103,7 @@ def procesar_y_enviar_datos_pendientes(archivo_online="Jsons_DATA/data_sensores_
             print("📂 No hay archivo de datos pendientes")
             return
             
-        with open(archivo_online, 'r', encoding='utf-8') as f:
-            datos_pendientes = json.load(f)
+        datos_pendientes = leer_registros(archivo_online)
             
         if not datos_pendientes:
             print("📊 No hay datos pendientes para enviar")
@@ -135,8 +135,7 @@ def procesar_y_enviar_datos_pendientes(archivo_online="Jsons_DATA/data_sensores_
         
         # Si todos los datos se enviaron correctamente, limpiar el archivo
         if datos_fallidos == 0 and datos_enviados > 0:
-            with open(archivo_online, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+            vaciar_registros(archivo_online)
             print("🧹 Archivo de datos pendientes limpiado")
         
     except Exception as e:
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+EXTENSION_INDICE = ".idx"
+# Largo del prefijo ISO que define cada cubeta del índice: "2025-08-15T10:42"
+LARGO_CUBETA = 16
+
+
+def cubeta(fecha):
+    """Cubeta (minuto) de una fecha ISO"""
+    return fecha[:LARGO_CUBETA]
+
+
+class IndiceTemporal:
+    """Índice disperso minuto -> offset en bytes para un archivo NDJSON.
+
+    Se agrega una entrada cada vez que cambia el minuto de las lecturas que se
+    van escribiendo, así que cada entrada marca el inicio de una corrida de
+    registros del mismo minuto y termina donde empieza la siguiente. El índice
+    se guarda en '<archivo>.idx' (una línea "minuto offset" por entrada) y se
+    actualiza solo agregando al final.
+    """
+
+    def __init__(self, ruta_datos):
+        self.ruta_datos = ruta_datos
+        self.ruta_indice = f"{ruta_datos}{EXTENSION_INDICE}"
+        self.cubetas = []
+        self.offsets = []
+        self.ordenado = True
+        # Bytes del archivo de datos ya cubiertos por el índice
+        self.indexado_hasta = 0
+        self._cargado = False
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Carga y reparación
+    # ------------------------------------------------------------------
+    def _cargar(self):
+        if self._cargado:
+            return
+        try:
+            with open(self.ruta_indice, "r", encoding="utf-8") as f:
+                for linea in f:
+                    partes = linea.split()
+                    if len(partes) == 2:
+                        self._agregar_en_memoria(partes[0], int(partes[1]))
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            print(f"⚠️ Índice dañado {self.ruta_indice}, se reconstruye")
+            self.cubetas, self.offsets, self.ordenado = [], [], True
+            self._borrar_archivo_indice()
+        self._cargado = True
+        # Lo escrito después de la última entrada (p. ej. si el proceso se cayó
+        # entre la escritura de datos y la del índice) se indexa ahora
+        self._ponerse_al_dia()
+
+    def _agregar_en_memoria(self, minuto, offset):
+        if self.cubetas and minuto < self.cubetas[-1]:
+            self.ordenado = False
+        self.cubetas.append(minuto)
+        self.offsets.append(offset)
+
+    def _ponerse_al_dia(self):
+        if not os.path.exists(self.ruta_datos):
+            return
+        inicio = self.offsets[-1] if self.offsets else 0
+        nuevas = []
+        ultimo = self.cubetas[-1] if self.cubetas else None
+        with open(self.ruta_datos, "rb") as f:
+            f.seek(inicio)
+            offset = inicio
+            for linea in f:
+                try:
+                    minuto = cubeta(json.loads(linea).get("date", ""))
+                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                    minuto = None
+                if minuto and minuto != ultimo:
+                    nuevas.append((minuto, offset))
+                    ultimo = minuto
+                offset += len(linea)
+        self.indexado_hasta = offset
+        if nuevas:
+            self._persistir(nuevas)
+
+    def _persistir(self, entradas):
+        for minuto, offset in entradas:
+            self._agregar_en_memoria(minuto, offset)
+        with open(self.ruta_indice, "a", encoding="utf-8") as f:
+            f.write("".join(f"{minuto} {offset}\n" for minuto, offset in entradas))
+
+    def _borrar_archivo_indice(self):
+        try:
+            os.remove(self.ruta_indice)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Mantenimiento incremental
+    # ------------------------------------------------------------------
+    def registrar(self, fechas, offset_inicial, largos):
+        """Registra un lote recién agregado al archivo de datos.
+
+        Args:
+            fechas: Fechas ISO de los registros del lote, en orden de escritura
+            offset_inicial: Offset en bytes donde empezó el lote
+            largos: Largo en bytes de cada línea del lote
+        """
+        with self._lock:
+            self._cargar()
+            ultimo = self.cubetas[-1] if self.cubetas else None
+            offset = offset_inicial
+            nuevas = []
+            for fecha, largo in zip(fechas, largos):
+                # Al cargar el índice ya se pudo haber indexado este mismo lote
+                if offset >= self.indexado_hasta:
+                    minuto = cubeta(fecha or "")
+                    if minuto and minuto != ultimo:
+                        nuevas.append((minuto, offset))
+                        ultimo = minuto
+                offset += largo
+            self.indexado_hasta = max(self.indexado_hasta, offset)
+            if nuevas:
+                self._persistir(nuevas)
+
+    def reconstruir(self):
+        """Vuelve a indexar el archivo de datos completo (tras una compactación)"""
+        with self._lock:
+            self.cubetas, self.offsets, self.ordenado = [], [], True
+            self.indexado_hasta = 0
+            self._borrar_archivo_indice()
+            self._cargado = True
+            self._ponerse_al_dia()
+
+    def eliminar(self):
+        with self._lock:
+            self.cubetas, self.offsets = [], []
+            self.indexado_hasta = 0
+            self._cargado = False
+            self._borrar_archivo_indice()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def rangos(self, desde=None, hasta=None):
+        """Rangos de bytes (inicio, fin) que pueden contener registros entre dos fechas ISO.
+
+        fin=None significa hasta el final del archivo. Los rangos contiguos se unen.
+        """
+        with self._lock:
+            self._cargar()
+            if not self.cubetas:
+                return []
+            desde_min = cubeta(desde) if desde else None
+            hasta_min = cubeta(hasta) if hasta else None
+
+            if self.ordenado:
+                i = bisect_left(self.cubetas, desde_min) if desde_min else 0
+                j = bisect_right(self.cubetas, hasta_min) if hasta_min else len(self.cubetas)
+                if i >= j:
+                    return []
+                return [(self.offsets[i], self.offsets[j] if j < len(self.offsets) else None)]
+
+            # Hubo lecturas fuera de orden: se revisan las corridas una por una
+            resultado = []
+            for k, minuto in enumerate(self.cubetas):
+                if (desde_min and minuto < desde_min) or (hasta_min and minuto > hasta_min):
+                    continue
+                inicio = self.offsets[k]
+                fin = self.offsets[k + 1] if k + 1 < len(self.offsets) else None
+                if resultado and resultado[-1][1] == inicio:
+                    resultado[-1] = (resultado[-1][0], fin)
+                else:
+                    resultado.append((inicio, fin))
+            return resultado
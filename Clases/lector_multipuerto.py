@@ -0,0 +1,173 @@
+import selectors
+import threading
+import time
+from .lector_serial import LectorSerial
+
+# Espera antes de reintentar un puerto caído (se duplica hasta el máximo)
+ESPERA_RECONEXION = 1.0
+ESPERA_RECONEXION_MAX = 30.0
+
+
+def puertos_desde_dispositivos(dispositivos):
+    """Puertos seriales declarados en devices.json (campo del sensor o de su tanque), sin repetir"""
+    puertos = []
+    for dispositivo in dispositivos:
+        tanque = dispositivo.get("tank") or {}
+        puerto = (dispositivo.get("serial_port") or dispositivo.get("port")
+                  or tanque.get("serial_port") or tanque.get("port"))
+        if puerto and puerto not in puertos:
+            puertos.append(puerto)
+    return puertos
+
+
+class EstadoPuerto:
+    """Lector, estado de conexión y estadísticas de un puerto"""
+
+    def __init__(self, puerto):
+        self.puerto = puerto
+        self.lector = None
+        self.conectado = False
+        self.conexiones = 0
+        self.proximo_intento = 0.0
+        self.espera = ESPERA_RECONEXION
+        self.estadisticas = {"lineas": 0, "bytes": 0, "lotes": 0, "reconexiones": 0, "errores": 0,
+                             "ultimo_dato": None, "ultimo_error": None}
+
+
+class LectorMultipuerto:
+    """Lee muchos puertos seriales desde un solo hilo con selectors.
+
+    Cada puerto abierto se registra en el selector; cuando el sistema avisa
+    que tiene datos se leen todas las líneas disponibles y se entregan a
+    'procesar(puerto, lineas)' (texto, o bytes con decodificar=False). Un puerto que falla se cierra y se reintenta
+    con espera creciente sin afectar a los demás. Los puertos sin descriptor
+    seleccionable (Windows) se atienden con un hilo propio como respaldo.
+    """
+
+    def __init__(self, puertos, procesar, baudios=9600, timeout=1.0, decodificar=True):
+        self.puertos = {puerto: EstadoPuerto(puerto) for puerto in puertos}
+        self.procesar = procesar
+        self.baudios = baudios
+        self.timeout = timeout
+        self.decodificar = decodificar
+        self.activo = False
+        self._selector = None
+        self._hilo = None
+        self._hilos_respaldo = []
+
+    # ------------------------------------------------------------------
+    # Conexión por puerto
+    # ------------------------------------------------------------------
+    def _conectar(self, estado):
+        try:
+            estado.lector = LectorSerial(estado.puerto, self.baudios, timeout=self.timeout).abrir()
+        except Exception as e:
+            self._marcar_error(estado, e)
+            return
+        if estado.lector._selector is None:
+            # Sin descriptor seleccionable: lectura bloqueante en un hilo aparte
+            hilo = threading.Thread(target=self._bucle_respaldo, args=(estado,), daemon=True)
+            self._hilos_respaldo.append(hilo)
+            hilo.start()
+        else:
+            self._selector.register(estado.lector.fileno(), selectors.EVENT_READ, estado)
+        if estado.conexiones:
+            estado.estadisticas["reconexiones"] += 1
+        estado.conexiones += 1
+        estado.conectado = True
+        estado.espera = ESPERA_RECONEXION
+        print(f"📡 Escuchando en {estado.puerto}...")
+
+    def _desconectar(self, estado):
+        if estado.lector is not None:
+            try:
+                self._selector.unregister(estado.lector.fileno())
+            except (KeyError, ValueError, OSError, AttributeError):
+                pass
+            try:
+                estado.lector.cerrar()
+            except Exception:
+                pass
+        estado.lector = None
+        estado.conectado = False
+
+    def _marcar_error(self, estado, error):
+        print(f"❌ Error en {estado.puerto}: {error} (reintento en {estado.espera:.0f}s)")
+        estado.estadisticas["errores"] += 1
+        estado.estadisticas["ultimo_error"] = str(error)
+        self._desconectar(estado)
+        estado.proximo_intento = time.monotonic() + estado.espera
+        estado.espera = min(estado.espera * 2, ESPERA_RECONEXION_MAX)
+
+    def _entregar(self, estado, lineas):
+        if self.decodificar:
+            lineas = [t for t in (linea.decode("utf-8", errors="ignore").strip() for linea in lineas) if t]
+        else:
+            lineas = [linea for linea in lineas if linea]
+        if not lineas:
+            return
+        estado.estadisticas["lineas"] += len(lineas)
+        estado.estadisticas["lotes"] += 1
+        estado.estadisticas["ultimo_dato"] = time.time()
+        try:
+            self.procesar(estado.puerto, lineas)
+        except Exception as e:
+            print(f"❌ Error procesando datos de {estado.puerto}: {e}")
+
+    # ------------------------------------------------------------------
+    # Bucle de eventos
+    # ------------------------------------------------------------------
+    def ejecutar(self):
+        """Bucle principal (bloquea hasta detener())"""
+        self.activo = True
+        self._selector = selectors.DefaultSelector()
+        try:
+            while self.activo:
+                ahora = time.monotonic()
+                for estado in self.puertos.values():
+                    if not estado.conectado and ahora >= estado.proximo_intento:
+                        self._conectar(estado)
+
+                # Se despierta por datos o a tiempo para el próximo reintento
+                pendientes = [e.proximo_intento - ahora for e in self.puertos.values() if not e.conectado]
+                espera = min([self.timeout] + [max(0.0, p) for p in pendientes])
+                if not self._selector.get_map():
+                    time.sleep(espera)
+                    continue
+                for clave, _ in self._selector.select(espera):
+                    estado = clave.data
+                    try:
+                        bytes_antes = estado.lector.estadisticas["bytes"]
+                        lineas = estado.lector.leer_listo()
+                        estado.estadisticas["bytes"] += estado.lector.estadisticas["bytes"] - bytes_antes
+                        self._entregar(estado, lineas)
+                    except Exception as e:
+                        self._marcar_error(estado, e)
+        finally:
+            for estado in self.puertos.values():
+                self._desconectar(estado)
+            self._selector.close()
+
+    def _bucle_respaldo(self, estado):
+        while self.activo and estado.conectado:
+            try:
+                lector = estado.lector
+                bytes_antes = lector.estadisticas["bytes"]
+                lineas = lector.leer_bloque()
+                estado.estadisticas["bytes"] += lector.estadisticas["bytes"] - bytes_antes
+                self._entregar(estado, lineas)
+            except Exception as e:
+                self._marcar_error(estado, e)
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.ejecutar, daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=5):
+        self.activo = False
+        if self._hilo and self._hilo.is_alive():
+            self._hilo.join(timeout=timeout)
+
+    def estado(self):
+        """Estadísticas por puerto"""
+        return {puerto: dict(e.estadisticas, conectado=e.conectado) for puerto, e in self.puertos.items()}
@@ -0,0 +1,120 @@
+import selectors
+import time
+
+
+class LectorSerial:
+    """Lector de un puerto serial guiado por eventos.
+
+    En lugar de revisar in_waiting y dormir, espera bloqueado en el
+    descriptor del puerto (selectors/epoll en Linux) o en una lectura con
+    timeout (Windows), lee de una vez todo lo que el puerto tenga en el
+    buffer y entrega las líneas completas como un lote. Un fragmento de
+    línea queda guardado hasta que llegue el resto.
+    """
+
+    def __init__(self, puerto, baudios=9600, timeout=1.0, serial_abierto=None):
+        self.puerto = puerto
+        self.baudios = baudios
+        self.timeout = timeout
+        self.serial = serial_abierto
+        self._pendiente = bytearray()
+        self._selector = None
+        self.estadisticas = {"bytes": 0, "lineas": 0, "lecturas": 0}
+
+    def abrir(self):
+        import serial
+
+        if self.serial is None:
+            self.serial = serial.Serial(self.puerto, self.baudios, timeout=self.timeout)
+        try:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self.serial.fileno(), selectors.EVENT_READ)
+        except (AttributeError, OSError, ValueError):
+            # Windows: el puerto no tiene descriptor seleccionable, se usa read() con timeout
+            self._selector = None
+        return self
+
+    def cerrar(self):
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        if self.serial is not None:
+            self.serial.close()
+            self.serial = None
+
+    def __enter__(self):
+        return self.abrir()
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def fileno(self):
+        return self.serial.fileno()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def leer_disponible(self):
+        """Lee sin esperar lo que haya en el buffer del puerto y devuelve las líneas completas (bytes)"""
+        disponible = self.serial.in_waiting
+        if not disponible:
+            return []
+        return self._separar(self.serial.read(disponible))
+
+    def leer_listo(self):
+        """Lee cuando el selector ya avisó que hay datos; una desconexión levanta SerialException"""
+        return self._separar(self.serial.read(max(1, self.serial.in_waiting)))
+
+    def leer_bloque(self, timeout=None):
+        """Espera hasta 'timeout' segundos a que llegue algo y devuelve las líneas completas (bytes)"""
+        timeout = self.timeout if timeout is None else timeout
+        if self._selector is not None:
+            if not self._selector.select(timeout):
+                return []
+            return self.leer_listo()
+        else:
+            tiempo_original = self.serial.timeout
+            self.serial.timeout = timeout
+            try:
+                datos = self.serial.read(1)
+            finally:
+                self.serial.timeout = tiempo_original
+            if datos and self.serial.in_waiting:
+                datos += self.serial.read(self.serial.in_waiting)
+        return self._separar(datos)
+
+    def leer_lote(self, timeout=None):
+        """Igual que leer_bloque() pero con las líneas decodificadas y sin espacios (sin vacías)"""
+        lineas = []
+        for linea in self.leer_bloque(timeout):
+            texto = linea.decode("utf-8", errors="ignore").strip()
+            if texto:
+                lineas.append(texto)
+        return lineas
+
+    def lotes(self, duracion=None, decodificar=True):
+        """Generador de lotes de líneas; con 'duracion' termina pasados esos segundos.
+
+        Con decodificar=False los lotes son las líneas en bytes (para ParserLecturas).
+        """
+        limite = time.monotonic() + duracion if duracion is not None else None
+        while limite is None or time.monotonic() < limite:
+            espera = self.timeout if limite is None else max(0.0, min(self.timeout, limite - time.monotonic()))
+            lote = self.leer_lote(espera) if decodificar else [l for l in self.leer_bloque(espera) if l]
+            if lote:
+                yield lote
+
+    def _separar(self, datos):
+        if not datos:
+            return []
+        self.estadisticas["bytes"] += len(datos)
+        self.estadisticas["lecturas"] += 1
+        self._pendiente += datos
+        fin = self._pendiente.rfind(b"\n")
+        if fin < 0:
+            return []
+        completas = bytes(self._pendiente[:fin])
+        del self._pendiente[:fin + 1]
+        lineas = completas.split(b"\n")
+        self.estadisticas["lineas"] += len(lineas)
+        return lineas
@@ -1,4 +1,5 @@
 import json
+from .almacenamiento import leer_registros
 
 class Lista:
     def __init__(self, tipo_dato=None, datos=None):
@@ -42,7 +43,7 @@ class Lista:
             json.dump(self.diccionario(), f, indent=4, ensure_ascii=False)
 
     def cargar(self, archivo):
-        with open(archivo, "r", encoding="utf-8") as f:
-            datos = json.load(f)
+        # Acepta tanto arreglos JSON como archivos NDJSON (un registro por línea)
+        datos = leer_registros(archivo)
         self.elementos.clear()
         self.agregar_elementos(datos)
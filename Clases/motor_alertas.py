@@ -0,0 +1,170 @@
+import threading
+from collections import namedtuple
+from .registro_config import obtener_mapa_alertas
+
+# Nombres legibles para los mensajes de alerta
+NOMBRES_SENSORES = {
+    "tmp": "Temperatura",
+    "phh": "pH",
+    "niv": "Nivel de agua",
+    "tbz": "Turbidez",
+    "tds": "TDS"
+}
+
+# Estados de un sensor: por debajo del mínimo, dentro del rango, por encima del máximo
+BAJO, NORMAL, ALTO = -1, 0, 1
+
+# Cambio de estado de un sensor: 'estado' es BAJO/ALTO (se levanta la alerta) o NORMAL (se despeja)
+Transicion = namedtuple("Transicion", ("code", "valor", "anterior", "estado", "mensaje"))
+
+
+class MotorAlertas:
+    """Reglas de alertasMapa.json compiladas en tablas planas.
+
+    Cada sensor con regla recibe un índice fijo y sus umbrales quedan en
+    listas paralelas (mínimo, máximo, histéresis, muestras), con None
+    convertido a ±infinito, así evaluar una lectura es un acceso a un
+    diccionario y dos comparaciones. Además de min/max, cada regla acepta:
+
+        "histeresis": margen que el valor tiene que recuperar para volver a normal
+        "muestras":   lecturas seguidas en el nuevo estado para confirmar el cambio
+
+    Solo se informan los cambios de estado (normal → bajo/alto y vuelta), así
+    un sensor que queda fuera de rango o que oscila sobre el umbral genera una
+    sola alerta por incidente.
+    """
+
+    def __init__(self, mapa_alertas):
+        self.mapa_alertas = mapa_alertas
+        self.indices = {}
+        self.minimos = []
+        self.maximos = []
+        self.histeresis = []
+        self.muestras = []
+        self.nombres = []
+        self.estados = []
+        self.candidatos = []
+        self.contadores = []
+        self._lock = threading.Lock()
+        for code, regla in mapa_alertas.items():
+            minimo, maximo = regla.get("min"), regla.get("max")
+            if minimo is None and maximo is None:
+                continue
+            self.indices[code] = len(self.minimos)
+            self.minimos.append(float("-inf") if minimo is None else float(minimo))
+            self.maximos.append(float("inf") if maximo is None else float(maximo))
+            self.histeresis.append(float(regla.get("histeresis") or 0.0))
+            self.muestras.append(max(1, int(regla.get("muestras") or 1)))
+            nombre = code.split("/")[0]
+            self.nombres.append(NOMBRES_SENSORES.get(nombre, nombre))
+            self.estados.append(NORMAL)
+            self.candidatos.append(NORMAL)
+            self.contadores.append(0)
+
+    def heredar_estados(self, anterior):
+        """Conserva el estado de los sensores que siguen teniendo regla tras recargar el mapa"""
+        for code, i in self.indices.items():
+            j = anterior.indices.get(code)
+            if j is not None:
+                self.estados[i] = anterior.estados[j]
+
+    # ------------------------------------------------------------------
+    # Evaluación
+    # ------------------------------------------------------------------
+    def evaluar(self, sensor, valor):
+        """Evalúa una lectura ('sensor' es un código o un Sensor); devuelve una Transicion o None"""
+        i = self.indices.get(getattr(sensor, "code", sensor))
+        if i is None:
+            return None
+        with self._lock:
+            return self._evaluar(i, getattr(sensor, "code", sensor), valor)
+
+    def evaluar_lote(self, lecturas, incluir_fuera=False):
+        """Evalúa en orden una lista de (sensor, valor) y devuelve las transiciones que hubo.
+
+        Con incluir_fuera=True también devuelve una Transicion con anterior == estado
+        por cada lectura de un sensor que sigue bajo/alto (para los resúmenes del supresor).
+        """
+        indices = self.indices
+        estados = self.estados
+        transiciones = []
+        with self._lock:
+            for sensor, valor in lecturas:
+                code = getattr(sensor, "code", sensor)
+                i = indices.get(code)
+                if i is None:
+                    continue
+                transicion = self._evaluar(i, code, valor)
+                if transicion is not None:
+                    transiciones.append(transicion)
+                elif incluir_fuera and estados[i] != NORMAL:
+                    estado = estados[i]
+                    transiciones.append(Transicion(code, valor, estado, estado, self._mensaje(i, valor, estado)))
+        return transiciones
+
+    def _evaluar(self, i, code, valor):
+        minimo, maximo, estado = self.minimos[i], self.maximos[i], self.estados[i]
+        if valor < minimo:
+            clase = BAJO
+        elif valor > maximo:
+            clase = ALTO
+        else:
+            clase = NORMAL
+            # Histéresis: para salir de bajo/alto hay que volver a entrar más allá del margen
+            if estado == BAJO and valor < minimo + self.histeresis[i]:
+                clase = BAJO
+            elif estado == ALTO and valor > maximo - self.histeresis[i]:
+                clase = ALTO
+
+        if clase == estado:
+            self.contadores[i] = 0
+            return None
+        # Debounce: el nuevo estado tiene que repetirse 'muestras' lecturas seguidas
+        if clase == self.candidatos[i]:
+            self.contadores[i] += 1
+        else:
+            self.candidatos[i] = clase
+            self.contadores[i] = 1
+        if self.contadores[i] < self.muestras[i]:
+            return None
+
+        self.estados[i] = clase
+        self.contadores[i] = 0
+        return Transicion(code, valor, estado, clase, self._mensaje(i, valor, clase))
+
+    def _mensaje(self, i, valor, estado):
+        nombre = self.nombres[i]
+        if estado == BAJO:
+            return f"{nombre} muy baja: {valor} (mínimo: {self.minimos[i]})"
+        if estado == ALTO:
+            return f"{nombre} muy alta: {valor} (máximo: {self.maximos[i]})"
+        return f"{nombre} normalizada: {valor}"
+
+    def mensaje(self, code, valor, estado):
+        """Mensaje de alerta para un valor del sensor en el estado dado"""
+        return self._mensaje(self.indices[code], valor, estado)
+
+    def estado(self, code):
+        """Estado actual del sensor (BAJO, NORMAL o ALTO)"""
+        i = self.indices.get(code)
+        return NORMAL if i is None else self.estados[i]
+
+
+_motor = None
+_lock_motor = threading.Lock()
+
+
+def obtener_motor_alertas():
+    """Motor del mapa de alertas actual (se recompila solo si alertasMapa.json cambió)"""
+    global _motor
+    mapa = obtener_mapa_alertas()
+    motor = _motor
+    if motor is None or motor.mapa_alertas is not mapa:
+        with _lock_motor:
+            if _motor is None or _motor.mapa_alertas is not mapa:
+                nuevo = MotorAlertas(mapa)
+                if _motor is not None:
+                    nuevo.heredar_estados(_motor)
+                _motor = nuevo
+            motor = _motor
+    return motor
@@ -0,0 +1,155 @@
+import heapq
+import threading
+import time
+
+# Qué lectura se guarda de cada ventana de reading_interval:
+#   "ultimo"   -> la última lectura de la ventana (se entrega al vencer la ventana)
+#   "promedio" -> el promedio de la ventana (se entrega al vencer la ventana)
+#   "primero"  -> la primera lectura (se entrega al llegar; el resto de la ventana se descarta)
+MODOS_MUESTREO = ("ultimo", "promedio", "primero")
+
+
+def intervalos_desde_dispositivos(dispositivos):
+    """{code: reading_interval} con la misma regla que Device (el del sensor_type tiene prioridad)"""
+    from .device import Device
+    intervalos = {}
+    for dispositivo in dispositivos:
+        if dispositivo.get("code"):
+            intervalos[dispositivo["code"]] = Device(**dispositivo).reading_interval
+    return intervalos
+
+
+class _Ventana:
+    __slots__ = ("sensor", "vence", "suma", "cantidad", "ultimo")
+
+    def __init__(self, sensor, vence, valor):
+        self.sensor = sensor
+        self.vence = vence
+        self.suma = valor
+        self.cantidad = 1
+        self.ultimo = valor
+
+
+class Muestreador:
+    """Aplica el reading_interval de cada sensor antes de persistir.
+
+    Cada sensor con intervalo abre una ventana con su primera lectura y
+    guarda a lo sumo una lectura por ventana. Los vencimientos se ordenan en
+    un min-heap, así un solo hilo duerme exactamente hasta la próxima ventana
+    que vence sin recorrer todos los sensores. Los sensores sin intervalo
+    (None o 0) pasan directo.
+    """
+
+    def __init__(self, entregar, intervalos=None, modo="ultimo"):
+        if modo not in MODOS_MUESTREO:
+            raise ValueError(f"Modo de muestreo inválido: {modo} (usar {MODOS_MUESTREO})")
+        self.entregar = entregar
+        self.modo = modo
+        self.intervalos = {}
+        self._ventanas = {}   # code -> _Ventana abierta
+        self._vencimientos = []   # heap de (vence, code)
+        self._cond = threading.Condition()
+        self.running = False
+        self.hilo = None
+        self.estadisticas = {"recibidas": 0, "entregadas": 0, "descartadas": 0}
+        self.configurar(intervalos or {})
+
+    def configurar(self, intervalos):
+        """Actualiza los intervalos {code: segundos}; None o 0 desactiva el muestreo del sensor"""
+        with self._cond:
+            self.intervalos = {code: float(s) for code, s in intervalos.items() if s}
+            self._cond.notify()
+
+    # ------------------------------------------------------------------
+    # Ingesta
+    # ------------------------------------------------------------------
+    def agregar(self, sensor, valor, ahora=None):
+        """Recibe una lectura; 'sensor' es un código o un Sensor de ParserLecturas"""
+        code = getattr(sensor, "code", sensor)
+        intervalo = self.intervalos.get(code)
+        if not intervalo:
+            with self._cond:
+                self.estadisticas["recibidas"] += 1
+                self.estadisticas["entregadas"] += 1
+            self.entregar(sensor, valor)
+            return
+
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._cond:
+            self.estadisticas["recibidas"] += 1
+            ventana = self._ventanas.get(code)
+            if ventana is not None:
+                ventana.suma += valor
+                ventana.cantidad += 1
+                ventana.ultimo = valor
+                self.estadisticas["descartadas"] += 1
+                return
+            self._ventanas[code] = _Ventana(sensor, ahora + intervalo, valor)
+            heapq.heappush(self._vencimientos, (ahora + intervalo, code))
+            # Si esta ventana vence antes que las demás, el hilo tiene que despertar antes
+            if self._vencimientos[0][1] == code:
+                self._cond.notify()
+            if self.modo == "primero":
+                self.estadisticas["entregadas"] += 1
+        if self.modo == "primero":
+            self.entregar(sensor, valor)
+
+    def vencer(self, ahora=None):
+        """Cierra las ventanas vencidas y entrega su lectura; devuelve cuánto falta para la próxima"""
+        ahora = time.monotonic() if ahora is None else ahora
+        listas = []
+        with self._cond:
+            while self._vencimientos and self._vencimientos[0][0] <= ahora:
+                _, code = heapq.heappop(self._vencimientos)
+                ventana = self._ventanas.pop(code, None)
+                if ventana is not None:
+                    listas.append(ventana)
+            restante = self._vencimientos[0][0] - ahora if self._vencimientos else None
+            if self.modo != "primero":
+                self.estadisticas["entregadas"] += len(listas)
+
+        for ventana in listas:
+            # En modo "primero" la lectura ya se entregó al abrir la ventana
+            if self.modo == "ultimo":
+                self.entregar(ventana.sensor, ventana.ultimo)
+            elif self.modo == "promedio":
+                self.entregar(ventana.sensor, ventana.suma / ventana.cantidad)
+        return restante
+
+    def estado(self):
+        """Estadísticas, modo y ventanas abiertas"""
+        with self._cond:
+            return dict(self.estadisticas, modo=self.modo, ventanas=len(self._ventanas))
+
+    # ------------------------------------------------------------------
+    # Hilo de vencimientos
+    # ------------------------------------------------------------------
+    def iniciar(self):
+        if self.running:
+            return
+        self.running = True
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+
+    def _bucle(self):
+        while self.running:
+            self.vencer()
+            with self._cond:
+                if not self.running:
+                    break
+                # Duerme hasta la próxima ventana (o hasta que se abra una que venza antes)
+                if not self._vencimientos:
+                    self._cond.wait()
+                else:
+                    espera = self._vencimientos[0][0] - time.monotonic()
+                    if espera > 0:
+                        self._cond.wait(espera)
+
+    def detener(self):
+        """Entrega las ventanas abiertas y detiene el hilo"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=5)
+        self.vencer(float("inf"))
@@ -0,0 +1,142 @@
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from .registro_config import obtener_mapa_dispositivos
+
+# Sensor conocido, resuelto una sola vez por código: "tmp/1" -> ("tmp/1", 6, "tmp")
+Sensor = namedtuple("Sensor", ("code", "device_id", "nombre"))
+
+
+class ParserLecturas:
+    """Parser de líneas "sensor:valor" que trabaja directo sobre bytes.
+
+    Los códigos del mapa de dispositivos se registran una vez como claves
+    bytes con su Sensor ya resuelto (código interno, id y nombre), así cada
+    lectura se reduce a un partition, una búsqueda en diccionario y un
+    float() sobre los bytes, sin decode, strip, regex ni split por lectura.
+    """
+
+    def __init__(self, mapa):
+        self.mapa = mapa
+        self.sensores = {}
+        for code, device_id in mapa.items():
+            code = sys.intern(code)
+            self.sensores[code.encode("utf-8")] = Sensor(code, device_id, sys.intern(code.split("/")[0]))
+
+    def parsear_linea(self, linea):
+        """bytes -> (Sensor, valor), o None si la línea no es una lectura válida de un sensor conocido"""
+        code, separador, valor = linea.partition(b":")
+        if not separador:
+            return None
+        sensor = self.sensores.get(code) or self.sensores.get(code.strip())
+        if sensor is None:
+            return None
+        try:
+            return sensor, float(valor)
+        except ValueError:
+            return None
+
+    def parsear_bloque(self, datos):
+        """Parsea un bloque con muchas líneas (bytes o lista de bytes) en una pasada.
+
+        Returns:
+            (lecturas [(Sensor, valor)], líneas inválidas [bytes])
+        """
+        lineas = datos.split(b"\n") if isinstance(datos, (bytes, bytearray)) else datos
+        sensores = self.sensores
+        lecturas = []
+        invalidas = []
+        for linea in lineas:
+            code, separador, valor = linea.partition(b":")
+            # El "\r" final queda del lado del valor y float() lo ignora
+            sensor = (sensores.get(code) or sensores.get(code.strip())) if separador else None
+            if sensor is not None:
+                try:
+                    lecturas.append((sensor, float(valor)))
+                    continue
+                except ValueError:
+                    pass
+            if linea.strip():
+                invalidas.append(linea)
+        return lecturas, invalidas
+
+
+_parser = None
+_lock_parser = threading.Lock()
+
+
+def obtener_parser():
+    """Parser del mapa de dispositivos actual (se rearma solo si devices.json cambió)"""
+    global _parser
+    mapa = obtener_mapa_dispositivos()
+    parser = _parser
+    if parser is None or parser.mapa is not mapa:
+        with _lock_parser:
+            if _parser is None or _parser.mapa is not mapa:
+                _parser = ParserLecturas(mapa)
+            parser = _parser
+    return parser
+
+
+def motivo_invalida(linea, mapa):
+    """Mensaje para el log de una línea que el parser descartó"""
+    texto = linea.decode("utf-8", errors="ignore").strip()
+    if ":" not in texto:
+        return "❌ Formato inválido. Se esperaba 'sensor:valor'"
+    sensor_code = texto.split(":", 1)[0]
+    if sensor_code not in mapa:
+        return f"❌ Sensor desconocido: {sensor_code}"
+    return "❌ Valor no numérico."
+
+
+def _ruta_actual(lineas, mapa):
+    """Camino original: decode + strip + regex + float + split por cada línea"""
+    resultado = []
+    for linea in lineas:
+        texto = linea.decode(errors="ignore").strip()
+        match = re.match(r"([^:]+):(.+)", texto)
+        if not match:
+            continue
+        sensor_code, valor = match.group(1), match.group(2)
+        if sensor_code not in mapa:
+            continue
+        try:
+            valor = float(valor)
+        except ValueError:
+            continue
+        resultado.append((sensor_code, mapa[sensor_code], sensor_code.split("/")[0], valor))
+    return resultado
+
+
+def comparar(cantidad=200000):
+    """Micro-benchmark: camino original contra ParserLecturas sobre el mismo bloque"""
+    mapa = {"tmp/1": 1, "phh/1": 2, "niv/1": 3, "tbz/1": 4, "tds/1": 5}
+    codigos = list(mapa)
+    bloque = b"\r\n".join(f"{codigos[i % len(codigos)]}:{20 + (i % 100) / 10}".encode() for i in range(cantidad))
+    lineas = bloque.split(b"\n")
+    parser = ParserLecturas(mapa)
+
+    inicio = time.perf_counter()
+    original = _ruta_actual(lineas, mapa)
+    t_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    por_linea = [parser.parsear_linea(linea) for linea in lineas]
+    t_linea = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    lecturas, _ = parser.parsear_bloque(bloque)
+    t_bloque = time.perf_counter() - inicio
+
+    assert len(original) == len(lecturas) == len(por_linea) == cantidad
+    for nombre, segundos in (("decode+regex+split", t_original), ("parsear_linea", t_linea),
+                             ("parsear_bloque", t_bloque)):
+        print(f"⏱️ {nombre:<20} {segundos * 1000:8.1f} ms  {cantidad / segundos / 1000:8.0f} mil líneas/s  "
+              f"({t_original / segundos:.1f}x)")
+
+
+if __name__ == "__main__":
+    # Uso: python -m Clases.parser_lecturas [cantidad_de_lineas]
+    comparar(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,290 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+try:
+    import paho.mqtt.client as mqtt
+    MQTT_DISPONIBLE = True
+except ImportError:
+    MQTT_DISPONIBLE = False
+
+load_dotenv()
+
+# Sin MQTT_BROKER en el .env no se publican alertas
+MQTT_BROKER = os.getenv("MQTT_BROKER")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+# Un topic por tanque; {uuid} sale del UUID del .env
+TOPIC_ALERTAS = os.getenv("MQTT_TOPIC_ALERTAS", "alertas/{uuid}/{tankId}")
+
+# Alertas que esperan conexión como máximo (se descartan las más viejas)
+CAPACIDAD_OUTBOX = 1000
+# Alertas entregadas al cliente sin PUBACK como máximo
+MAX_EN_VUELO = 20
+
+# Códigos de publish() de paho: sin conexión el mensaje QoS>0 queda en la cola del cliente
+# y se envía al reconectar; con la cola llena no se acepta
+ERR_SIN_CONEXION = 4    # MQTT_ERR_NO_CONN
+ERR_COLA_LLENA = 15     # MQTT_ERR_QUEUE_SIZE
+
+
+def crear_cliente_mqtt(client_id):
+    """Cliente paho compatible con las versiones 1.x y 2.x"""
+    if hasattr(mqtt, "CallbackAPIVersion"):
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+    return mqtt.Client(client_id=client_id)
+
+
+class PublicadorAlertas:
+    """Publica cada alerta al instante en el topic MQTT de su tanque.
+
+    Usa una sola conexión persistente (paho con loop_start y reconexión
+    automática) y QoS 1. publicar() solo deja la alerta en un outbox en
+    memoria acotado y vuelve, así una caída del broker nunca frena la
+    ingesta: el hilo de envío entrega al cliente lo pendiente mientras hay
+    conexión, con un límite de mensajes sin PUBACK. 'fabrica_cliente'
+    permite usar un broker de prueba (ver ClienteMqttMemoria).
+    """
+
+    def __init__(self, broker=MQTT_BROKER, port=MQTT_PORT, topic=TOPIC_ALERTAS, uuid=None, qos=1,
+                 capacidad=CAPACIDAD_OUTBOX, max_en_vuelo=MAX_EN_VUELO, fabrica_cliente=None):
+        self.broker = broker
+        self.port = port
+        self.topic = topic
+        self.uuid = uuid if uuid is not None else (os.getenv("UUID") or "sin_uuid")
+        self.qos = qos
+        self.max_en_vuelo = max_en_vuelo
+        self.fabrica_cliente = fabrica_cliente or crear_cliente_mqtt
+        self.outbox = deque()
+        self.capacidad = capacidad
+        self._en_vuelo = {}          # mid -> (topic, payload)
+        self._acks_tempranos = set()  # PUBACK que llegó antes de registrar el mid
+        self._cond = threading.Condition()
+        self.conectado = False
+        self.running = False
+        self.cliente = None
+        self.hilo = None
+        self.estadisticas = {"encoladas": 0, "publicadas": 0, "confirmadas": 0, "descartadas": 0,
+                             "conexiones": 0, "desconexiones": 0, "errores": 0}
+
+    # ------------------------------------------------------------------
+    # Conexión
+    # ------------------------------------------------------------------
+    def iniciar(self):
+        if self.running:
+            return self
+        self.running = True
+        self.cliente = self.fabrica_cliente(f"alertas-{self.uuid}")
+        self.cliente.on_connect = self._al_conectar
+        self.cliente.on_disconnect = self._al_desconectar
+        self.cliente.on_publish = self._al_publicar
+        self.cliente.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.cliente.max_inflight_messages_set(self.max_en_vuelo)
+        self.cliente.max_queued_messages_set(self.max_en_vuelo)
+        # connect_async no bloquea: la conexión y las reconexiones las hace el hilo de paho
+        self.cliente.connect_async(self.broker, self.port, keepalive=60)
+        self.cliente.loop_start()
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+        print(f"📡 Publicador de alertas MQTT → {self.broker}:{self.port} ({self.topic})")
+        return self
+
+    def detener(self, timeout=2.0):
+        """Intenta vaciar el outbox (si hay conexión) y cierra el cliente"""
+        limite = time.monotonic() + timeout
+        with self._cond:
+            while (self.outbox or self._en_vuelo) and self.conectado and time.monotonic() < limite:
+                self._cond.wait(0.05)
+            self.running = False
+            self._cond.notify_all()
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=1)
+        if self.cliente is not None:
+            try:
+                self.cliente.disconnect()
+                self.cliente.loop_stop()
+            except Exception:
+                pass
+
+    def _al_conectar(self, cliente, userdata, flags, rc, *resto):
+        if rc == 0:
+            with self._cond:
+                self.conectado = True
+                self.estadisticas["conexiones"] += 1
+                self._cond.notify_all()
+            print(f"✅ Publicador de alertas conectado a MQTT {self.broker}:{self.port}")
+        else:
+            print(f"❌ Error de conexión MQTT (alertas): {rc}")
+
+    def _al_desconectar(self, cliente, userdata, *args):
+        with self._cond:
+            if self.conectado:
+                self.estadisticas["desconexiones"] += 1
+            self.conectado = False
+        # paho reenvía solo los mensajes en vuelo al reconectar; el resto espera en el outbox
+
+    def _al_publicar(self, cliente, userdata, mid, *resto):
+        with self._cond:
+            if self._en_vuelo.pop(mid, None) is None:
+                self._acks_tempranos.add(mid)
+            self.estadisticas["confirmadas"] += 1
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+    def publicar(self, alerta):
+        """Deja la alerta en el outbox y vuelve enseguida (sin tocar la red)"""
+        topic = self.topic.format(uuid=self.uuid, tankId=alerta.get("tankId"), code=alerta.get("code"))
+        payload = json.dumps({k: v for k, v in alerta.items() if k != "synced"}, ensure_ascii=False)
+        with self._cond:
+            if len(self.outbox) >= self.capacidad:
+                self.outbox.popleft()
+                self.estadisticas["descartadas"] += 1
+            self.outbox.append((topic, payload))
+            self.estadisticas["encoladas"] += 1
+            self._cond.notify_all()
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while self.running and not (self.conectado and self.outbox
+                                            and len(self._en_vuelo) < self.max_en_vuelo):
+                    self._cond.wait()
+                if not self.running:
+                    return
+                topic, payload = self.outbox.popleft()
+
+            try:
+                info = self.cliente.publish(topic, payload, qos=self.qos)
+            except Exception as e:
+                print(f"⚠️ Error publicando alerta por MQTT: {e}")
+                info = None
+            with self._cond:
+                if info is None or info.rc == ERR_COLA_LLENA:
+                    # El cliente no la aceptó: vuelve al frente del outbox y se reintenta en un rato
+                    self.outbox.appendleft((topic, payload))
+                    self.estadisticas["errores"] += 1
+                    self._cond.wait(0.1)
+                    continue
+                if info.rc == ERR_SIN_CONEXION:
+                    # paho la guardó y la envía al reconectar: cuenta como en vuelo
+                    self.conectado = False
+                self.estadisticas["publicadas"] += 1
+                if info.mid in self._acks_tempranos:
+                    self._acks_tempranos.discard(info.mid)
+                else:
+                    self._en_vuelo[info.mid] = (topic, payload)
+
+    def estado(self):
+        with self._cond:
+            return dict(self.estadisticas, conectado=self.conectado, outbox=len(self.outbox),
+                        en_vuelo=len(self._en_vuelo))
+
+
+class _InfoPublicacion:
+    def __init__(self, rc, mid):
+        self.rc = rc
+        self.mid = mid
+
+
+class ClienteMqttMemoria:
+    """Broker de prueba en proceso con la parte de la API de paho que usa PublicadorAlertas.
+
+    Guarda lo publicado en 'mensajes'; caer()/levantar() simulan una caída del
+    broker. Como paho, sin conexión publish() devuelve ERR_SIN_CONEXION pero
+    conserva el mensaje y lo envía al reconectar, y con 'max_encolados'
+    mensajes sin confirmar devuelve ERR_COLA_LLENA.
+    """
+
+    def __init__(self, client_id=None):
+        self.client_id = client_id
+        self.mensajes = []
+        self.disponible = True
+        self.max_encolados = 0
+        self._sin_enviar = []
+        self._mid = 0
+        self._lock = threading.Lock()
+        self.on_connect = self.on_disconnect = self.on_publish = None
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        pass
+
+    def max_inflight_messages_set(self, cantidad):
+        pass
+
+    def max_queued_messages_set(self, cantidad):
+        self.max_encolados = cantidad
+
+    def connect_async(self, host, port=1883, keepalive=60):
+        self.host, self.port = host, port
+
+    def loop_start(self):
+        if self.disponible:
+            self.on_connect(self, None, {}, 0)
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def publish(self, topic, payload, qos=0):
+        with self._lock:
+            if self.max_encolados and len(self._sin_enviar) >= self.max_encolados:
+                return _InfoPublicacion(ERR_COLA_LLENA, None)
+            self._mid += 1
+            mid = self._mid
+            if not self.disponible:
+                self._sin_enviar.append((mid, topic, payload, qos))
+                return _InfoPublicacion(ERR_SIN_CONEXION, mid)
+            self.mensajes.append((topic, payload, qos))
+            # El PUBACK se simula antes de que publish() vuelva (el caso más apretado)
+            self.on_publish(self, None, mid)
+        return _InfoPublicacion(0, mid)
+
+    def caer(self):
+        self.disponible = False
+        self.on_disconnect(self, None, 1)
+
+    def levantar(self):
+        self.disponible = True
+        self.on_connect(self, None, {}, 0)
+        with self._lock:
+            pendientes, self._sin_enviar = self._sin_enviar, []
+            for mid, topic, payload, qos in pendientes:
+                self.mensajes.append((topic, payload, qos))
+                self.on_publish(self, None, mid)
+
+
+_publicador = None
+_lock_publicador = threading.Lock()
+
+
+def obtener_publicador_alertas():
+    """Publicador compartido, o None si no hay MQTT_BROKER configurado o falta paho"""
+    global _publicador
+    if _publicador is None and MQTT_BROKER and MQTT_DISPONIBLE:
+        with _lock_publicador:
+            if _publicador is None:
+                _publicador = PublicadorAlertas().iniciar()
+    return _publicador
+
+
+def publicar_alerta(alerta):
+    """Publica la alerta si el fan-out MQTT está configurado (nunca bloquea ni levanta excepción)"""
+    try:
+        publicador = obtener_publicador_alertas()
+        if publicador is not None:
+            publicador.publicar(alerta)
+    except Exception as e:
+        print(f"⚠️ No se pudo publicar la alerta por MQTT: {e}")
+
+
+@atexit.register
+def detener_publicador_alertas():
+    if _publicador is not None:
+        _publicador.detener()
@@ -0,0 +1,56 @@
+import re
+import time
+from .canal_actuador import CanalActuador, BAUDIOS_ACTUADORES
+from .parser_lecturas import obtener_parser
+
+# Respuesta de los actuadores: una línea de texto ASCII imprimible (ej. "OK on", "food listo")
+FORMATO_RESPUESTA = re.compile(rb"[ -~]+")
+# Forma de una lectura "code:valor"; si el sensor no está en devices.json no es una respuesta
+_FORMATO_LECTURA = re.compile(rb"[^\s:]+\s*:\s*[-+]?\.?\d")
+
+
+class PuertoCompartido(CanalActuador):
+    """Dueño único de un puerto que lleva lecturas de sensores y comandos a la vez.
+
+    Abre el puerto una sola vez (como CanalActuador) y separa lo que llega:
+    las líneas "code:valor" de un sensor conocido van en un lote a
+    'procesar(puerto, lineas)' (SensorScheduler.procesar_lote, en bytes).
+    Solo las líneas con 'formato_respuesta' se toman como respuesta a los
+    comandos pendientes; las lecturas de sensores desconocidos y la basura
+    se cuentan y se descartan, así nunca confirman un comando. Las
+    escrituras de comandos pasan por el lock del canal, así lectura y
+    actuación conviven en un proceso sin reabrir el puerto.
+    """
+
+    def __init__(self, puerto, procesar, baudios=BAUDIOS_ACTUADORES, formato_respuesta=FORMATO_RESPUESTA, **kwargs):
+        super().__init__(puerto, baudios, **kwargs)
+        self.procesar = procesar
+        self.formato_respuesta = formato_respuesta
+        self.estadisticas.update({"lineas": 0, "lotes": 0, "ultimo_dato": None,
+                                  "desconocidas": 0, "descartadas": 0})
+
+    def _recibir(self, lineas):
+        sensores = obtener_parser().sensores
+        lecturas = []
+        for linea in lineas:
+            code, separador, _ = linea.partition(b":")
+            if separador and (code in sensores or code.strip() in sensores):
+                lecturas.append(linea)
+                continue
+            texto = linea.strip()
+            if not texto:
+                continue
+            if _FORMATO_LECTURA.match(texto):
+                self.estadisticas["desconocidas"] += 1
+            elif self.formato_respuesta.fullmatch(texto):
+                self._respuesta(texto.decode("ascii"))
+            else:
+                self.estadisticas["descartadas"] += 1
+        if lecturas:
+            self.estadisticas["lineas"] += len(lecturas)
+            self.estadisticas["lotes"] += 1
+            self.estadisticas["ultimo_dato"] = time.time()
+            try:
+                self.procesar(self.puerto, lecturas)
+            except Exception as e:
+                print(f"❌ Error procesando lote de {self.puerto}: {e}")
@@ -0,0 +1,164 @@
+import atexit
+import glob
+import os
+import threading
+import time
+from collections import deque
+from .almacenamiento import agregar_registros, leer_registros
+
+# Se escribe un lote cuando se juntan estas alertas o pasa este tiempo desde la primera pendiente
+MAX_LOTE_ALERTAS = 100
+MAX_ESPERA_ALERTAS = 0.5
+# Alertas recientes que quedan en memoria para consultas rápidas
+ALERTAS_RECIENTES = 500
+# Sufijo de los segmentos rotados que esperan la sincronización
+EXTENSION_SEGMENTO = ".enviando"
+
+
+class RegistroAlertas:
+    """Registro de alertas en memoria con escritura por lotes y rotación atómica.
+
+    anotar() solo agrega la alerta a una lista en memoria y vuelve (es lo
+    único que paga el camino de alertas); un hilo la escribe en el archivo
+    online en lotes de hasta 'max_lote' o cada 'max_espera' segundos. La
+    sincronización no trunca ese archivo: rotar() baja lo pendiente y lo
+    renombra (os.replace, atómico) a un segmento '.enviando', que se sube y
+    se borra con confirmar(). Si la subida falla el segmento queda y se
+    reintenta en el próximo ciclo, y las alertas nuevas van a un archivo
+    nuevo, así nada se pierde entre leer y vaciar.
+    """
+
+    def __init__(self, archivo, max_lote=MAX_LOTE_ALERTAS, max_espera=MAX_ESPERA_ALERTAS):
+        self.archivo = archivo
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self._pendientes = []
+        self._primera = None
+        self._cond = threading.Condition()
+        # Serializa escritura y rotación del archivo
+        self._lock_archivo = threading.Lock()
+        self.recientes = deque(maxlen=ALERTAS_RECIENTES)
+        self.running = False
+        self.hilo = None
+        self.estadisticas = {"anotadas": 0, "escritas": 0, "lotes": 0, "rotaciones": 0, "errores": 0}
+
+    def iniciar(self):
+        if self.running:
+            return self
+        self.running = True
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+        return self
+
+    def detener(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=5)
+        self.vaciar()
+
+    # ------------------------------------------------------------------
+    # Camino de alertas
+    # ------------------------------------------------------------------
+    def anotar(self, alerta):
+        """Agrega la alerta al registro en memoria (se escribe en el próximo lote)"""
+        with self._cond:
+            if not self._pendientes:
+                self._primera = time.monotonic()
+            self._pendientes.append(alerta)
+            self.recientes.append(alerta)
+            self.estadisticas["anotadas"] += 1
+            if len(self._pendientes) == 1 or len(self._pendientes) >= self.max_lote:
+                self._cond.notify()
+
+    def agregar(self, registros, sincronizar=False):
+        """Escribe registros directo al archivo (interfaz de destino de agregar_en)"""
+        with self._lock_archivo:
+            agregar_registros(self.archivo, registros, sincronizar=sincronizar)
+
+    def vaciar(self):
+        """Escribe ya todo lo pendiente en memoria"""
+        with self._cond:
+            lote, self._pendientes = self._pendientes, []
+        self._escribir(lote)
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while self.running and not (
+                        len(self._pendientes) >= self.max_lote
+                        or (self._pendientes and time.monotonic() - self._primera >= self.max_espera)):
+                    espera = None
+                    if self._pendientes:
+                        espera = self.max_espera - (time.monotonic() - self._primera)
+                    self._cond.wait(espera)
+                if not self.running:
+                    return
+                lote, self._pendientes = self._pendientes, []
+            self._escribir(lote)
+
+    def _escribir(self, lote):
+        if not lote:
+            return
+        try:
+            self.agregar(lote)
+            self.estadisticas["escritas"] += len(lote)
+            self.estadisticas["lotes"] += 1
+        except Exception as e:
+            self.estadisticas["errores"] += 1
+            print(f"❌ Error escribiendo {len(lote)} alertas en {self.archivo}: {e}")
+            # Se devuelven al principio para el próximo lote
+            with self._cond:
+                self._pendientes[:0] = lote
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+    def rotar(self):
+        """Cierra el archivo actual como segmento y devuelve los segmentos pendientes de subir"""
+        self.vaciar()
+        with self._lock_archivo:
+            if os.path.exists(self.archivo) and os.path.getsize(self.archivo) > 0:
+                segmento = f"{self.archivo}.{time.time_ns()}{EXTENSION_SEGMENTO}"
+                os.replace(self.archivo, segmento)
+                self.estadisticas["rotaciones"] += 1
+        return self.segmentos()
+
+    def segmentos(self):
+        """Segmentos rotados que todavía no se confirmaron, del más viejo al más nuevo"""
+        return sorted(glob.glob(f"{glob.escape(self.archivo)}.*{EXTENSION_SEGMENTO}"))
+
+    @staticmethod
+    def leer_segmento(segmento):
+        return leer_registros(segmento)
+
+    @staticmethod
+    def confirmar(segmento):
+        """Borra un segmento ya subido"""
+        os.remove(segmento)
+
+
+_registros = {}
+_lock_registros = threading.Lock()
+
+
+def obtener_registro_alertas(archivo="Jsons_DATA/data_sesnsoresalerta_online.json"):
+    """Registro de alertas del archivo (uno por proceso, con su hilo de escritura)"""
+    registro = _registros.get(archivo)
+    if registro is None:
+        with _lock_registros:
+            registro = _registros.get(archivo)
+            if registro is None:
+                registro = _registros[archivo] = RegistroAlertas(archivo).iniciar()
+    return registro
+
+
+@atexit.register
+def vaciar_registros_alertas():
+    """Escribe las alertas que quedaron en memoria al salir"""
+    for registro in list(_registros.values()):
+        try:
+            registro.vaciar()
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar las alertas pendientes: {e}")
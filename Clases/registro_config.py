@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+
+# Cada cuántos segundos se revisa como máximo si el archivo cambió en disco
+INTERVALO_REVISION = 1.0
+
+
+class ArchivoJsonCacheado:
+    """Carga un archivo JSON una sola vez y lo recarga solo si cambia en disco.
+
+    El cambio se detecta comparando mtime y tamaño, y el os.stat se hace como
+    mucho una vez cada 'intervalo_revision' segundos, así que en el camino
+    caliente obtener() es una comparación de tiempo y un acceso a atributo.
+    """
+
+    def __init__(self, path, transformar=None, por_defecto=None, intervalo_revision=INTERVALO_REVISION):
+        self.path = path
+        self.transformar = transformar
+        self.por_defecto = por_defecto
+        self.intervalo_revision = intervalo_revision
+        self._lock = threading.Lock()
+        self._firma = None
+        self._valor = por_defecto
+        self._proxima_revision = 0.0
+
+    def obtener(self):
+        """Devuelve el contenido cacheado, recargándolo si el archivo cambió"""
+        if time.monotonic() >= self._proxima_revision:
+            self._revisar()
+        return self._valor
+
+    def invalidar(self):
+        """Fuerza a revisar el archivo en la próxima llamada a obtener()"""
+        self._proxima_revision = 0.0
+        self._firma = None
+
+    def _revisar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self._proxima_revision:
+                return
+            self._proxima_revision = ahora + self.intervalo_revision
+
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                if self._firma is not False:
+                    print(f"⚠️ Archivo no encontrado: {self.path}")
+                    self._firma = False
+                    self._valor = self.por_defecto
+                return
+
+            firma = (st.st_mtime_ns, st.st_size)
+            if firma == self._firma:
+                return
+
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+                self._valor = self.transformar(datos) if self.transformar else datos
+                self._firma = firma
+                print(f"🔄 Configuración recargada: {self.path}")
+            except Exception as e:
+                # Archivo a medio escribir o inválido: se conserva el último valor bueno
+                print(f"❌ Error recargando {self.path}: {e}")
+
+
+_caches = {}
+_lock_caches = threading.Lock()
+
+
+def _obtener_cache(path, transformar=None, por_defecto=None):
+    # Un mismo archivo puede cachearse con distintas transformaciones (ej. devices.json)
+    clave = (path, transformar)
+    cache = _caches.get(clave)
+    if cache is None:
+        with _lock_caches:
+            cache = _caches.get(clave)
+            if cache is None:
+                cache = ArchivoJsonCacheado(path, transformar, por_defecto)
+                _caches[clave] = cache
+    return cache
+
+
+def _mapa_codigos(lista):
+    # El mapa tendrá como clave el 'code' (ej. "temp/1") y como valor el id del dispositivo
+    return {d["code"]: d["id"] for d in lista}
+
+
+def _mapa_tanques(lista):
+    # 'code' -> tanque al que pertenece el sensor (sin tanque se usa el id del dispositivo)
+    return {d["code"]: d.get("tankId", d.get("tank_id", d["id"])) for d in lista}
+
+
+def obtener_mapa_dispositivos(path="Jsons_DATA/devices.json"):
+    """Mapa { code: id_dispositivo } compartido y cacheado"""
+    return _obtener_cache(path, _mapa_codigos, {}).obtener()
+
+
+def obtener_mapa_tanques(path="Jsons_DATA/devices.json"):
+    """Mapa { code: tankId } compartido y cacheado"""
+    return _obtener_cache(path, _mapa_tanques, {}).obtener()
+
+
+def obtener_mapa_alertas(path="Jsons_DATA/alertasMapa.json"):
+    """Mapa de rangos de alerta compartido y cacheado"""
+    return _obtener_cache(path, None, {}).obtener()
+
+
+def invalidar_cache(path=None):
+    """Invalida un archivo cacheado (o todos si path es None)"""
+    for (ruta, _), cache in list(_caches.items()):
+        if path is None or ruta == path:
+            cache.invalidar()
@@ -0,0 +1,283 @@
+import atexit
+import os
+import threading
+from datetime import datetime, timedelta
+from .almacenamiento import leer_registros, escribir_registros, agregar_registros
+
+DIRECTORIO_ROLLUPS = "Jsons_DATA/rollups"
+EXTENSION = ".ndjson"
+
+# Largo del prefijo de la fecha ISO que define cada cubeta
+NIVELES = {"minuto": 16, "hora": 13}   # "2025-08-15T10:42" / "2025-08-15T10"
+# Días que se conserva cada nivel (las cubetas horarias sirven para tendencias largas)
+RETENCION_DIAS = {"minuto": 7, "hora": 365}
+# Segundos entre escrituras a disco de las cubetas modificadas
+INTERVALO_GUARDADO = 5.0
+# Líneas reemplazadas (cubetas reescritas más adelante) que acepta el archivo de un día abierto
+# antes de reescribirlo con una línea por cubeta
+UMBRAL_COMPACTACION = 1000
+
+# Posiciones dentro de la lista de cada cubeta
+_COUNT, _SUM, _MIN, _MAX, _LAST_DATE, _LAST = range(6)
+
+
+class Rollups:
+    """Resúmenes por sensor en cubetas de 1 minuto y 1 hora, actualizados en cada lectura.
+
+    Cada cubeta guarda count/sum/min/max y el último valor. Se persisten en
+    '<directorio>/<nivel>/<día>.ndjson': mientras el día está abierto se
+    agregan al final las cubetas que cambiaron (la última línea de cada
+    cubeta es la vigente) y al cerrarse el día se reescribe con una línea por
+    cubeta. Si un día abierto junta más de 'umbral_compactacion' líneas
+    reemplazadas también se reescribe, así el archivo (y su relectura al
+    reiniciar) queda acotado. Una lectura atrasada actualiza la cubeta de su
+    propia fecha, cargando ese día desde disco si ya no estaba en memoria.
+
+    El guardado periódico lo hace un hilo propio (iniciar_guardado), fuera
+    del hilo que ingesta las lecturas.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_ROLLUPS, intervalo_guardado=INTERVALO_GUARDADO,
+                 retencion_dias=None, umbral_compactacion=UMBRAL_COMPACTACION):
+        self.directorio = directorio
+        self.intervalo_guardado = intervalo_guardado
+        self.retencion_dias = dict(RETENCION_DIAS, **(retencion_dias or {}))
+        self.umbral_compactacion = umbral_compactacion
+        # (nivel, día) -> {(code, cubeta): [count, sum, min, max, last_date, last]}
+        self._dias = {}
+        # (nivel, día) -> claves modificadas desde el último guardado
+        self._sucios = {}
+        # (nivel, día) -> líneas del archivo del día (las que exceden las cubetas están reemplazadas)
+        self._lineas = {}
+        self._lock = threading.Lock()
+        self._dia_retencion = None
+        self._detenido = threading.Event()
+        self.hilo_guardado = None
+
+    # ------------------------------------------------------------------
+    # Archivos
+    # ------------------------------------------------------------------
+    def ruta(self, nivel, dia):
+        return os.path.join(self.directorio, nivel, f"{dia}{EXTENSION}")
+
+    def dias_guardados(self, nivel):
+        """Días con archivo de rollups para el nivel, ordenados"""
+        carpeta = os.path.join(self.directorio, nivel)
+        if not os.path.isdir(carpeta):
+            return []
+        return sorted(n[:-len(EXTENSION)] for n in os.listdir(carpeta) if n.endswith(EXTENSION))
+
+    def _leer_tabla(self, nivel, dia):
+        """Cubetas de un día leídas desde disco y cantidad de líneas del archivo.
+
+        La última línea de cada cubeta es la vigente.
+        """
+        tabla = {}
+        filas = []
+        ruta = self.ruta(nivel, dia)
+        if os.path.exists(ruta):
+            filas = leer_registros(ruta)
+            for fila in filas:
+                tabla[(fila["code"], fila["bucket"])] = [fila["count"], fila["sum"], fila["min"], fila["max"],
+                                                         fila["last_date"], fila["last"]]
+        return tabla, len(filas)
+
+    def _tabla(self, nivel, dia):
+        """Cubetas de un día que recibe lecturas (cargadas desde disco la primera vez).
+
+        Solo la ingesta las deja en memoria: esos días se compactan al cerrarse.
+        """
+        tabla = self._dias.get((nivel, dia))
+        if tabla is None:
+            tabla, self._lineas[(nivel, dia)] = self._leer_tabla(nivel, dia)
+            self._dias[(nivel, dia)] = tabla
+        return tabla
+
+    @staticmethod
+    def _fila(clave, cubeta):
+        return {"code": clave[0], "bucket": clave[1], "count": cubeta[_COUNT], "sum": cubeta[_SUM],
+                "min": cubeta[_MIN], "max": cubeta[_MAX], "last": cubeta[_LAST], "last_date": cubeta[_LAST_DATE]}
+
+    # ------------------------------------------------------------------
+    # Ingesta
+    # ------------------------------------------------------------------
+    def agregar(self, code, fecha, valor):
+        """Suma una lectura a sus cubetas de minuto y de hora"""
+        dia = fecha[:10]
+        with self._lock:
+            for nivel, largo in NIVELES.items():
+                clave = (code, fecha[:largo])
+                tabla = self._tabla(nivel, dia)
+                cubeta = tabla.get(clave)
+                if cubeta is None:
+                    tabla[clave] = [1, valor, valor, valor, fecha, valor]
+                else:
+                    cubeta[_COUNT] += 1
+                    cubeta[_SUM] += valor
+                    if valor < cubeta[_MIN]:
+                        cubeta[_MIN] = valor
+                    if valor > cubeta[_MAX]:
+                        cubeta[_MAX] = valor
+                    # Una lectura atrasada no pisa el último valor de la cubeta
+                    if fecha >= cubeta[_LAST_DATE]:
+                        cubeta[_LAST_DATE] = fecha
+                        cubeta[_LAST] = valor
+                self._sucios.setdefault((nivel, dia), set()).add(clave)
+
+    def guardar(self):
+        """Escribe las cubetas modificadas y libera de memoria los días cerrados"""
+        with self._lock:
+            sucios, self._sucios = self._sucios, {}
+            for (nivel, dia), claves in sucios.items():
+                tabla = self._dias[(nivel, dia)]
+                os.makedirs(os.path.join(self.directorio, nivel), exist_ok=True)
+                if self._lineas[(nivel, dia)] + len(claves) - len(tabla) > self.umbral_compactacion:
+                    self._compactar(nivel, dia, tabla)
+                else:
+                    agregar_registros(self.ruta(nivel, dia), [self._fila(c, tabla[c]) for c in claves])
+                    self._lineas[(nivel, dia)] += len(claves)
+
+            # Solo hoy y ayer quedan en memoria; el resto se compacta a una línea por cubeta
+            hoy = datetime.now().strftime("%Y-%m-%d")
+            ayer = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+            for (nivel, dia) in list(self._dias):
+                if dia < ayer:
+                    self._compactar(nivel, dia, self._dias.pop((nivel, dia)))
+                    self._lineas.pop((nivel, dia), None)
+
+        if self._dia_retencion != hoy:
+            self._dia_retencion = hoy
+            self.eliminar_expirados()
+
+    def _compactar(self, nivel, dia, tabla):
+        """Reescribe el archivo del día con una línea por cubeta"""
+        escribir_registros(self.ruta(nivel, dia), [self._fila(c, v) for c, v in sorted(tabla.items())])
+        self._lineas[(nivel, dia)] = len(tabla)
+
+    def iniciar_guardado(self):
+        """Arranca el hilo que guarda las cubetas cada 'intervalo_guardado' segundos"""
+        if self.hilo_guardado and self.hilo_guardado.is_alive():
+            return self
+        self._detenido.clear()
+
+        def bucle():
+            while not self._detenido.wait(self.intervalo_guardado):
+                try:
+                    self.guardar()
+                except Exception as e:
+                    print(f"⚠️ Error guardando rollups: {e}")
+
+        self.hilo_guardado = threading.Thread(target=bucle, daemon=True)
+        self.hilo_guardado.start()
+        return self
+
+    def detener_guardado(self):
+        """Detiene el hilo de guardado y escribe lo pendiente"""
+        self._detenido.set()
+        if self.hilo_guardado and self.hilo_guardado.is_alive():
+            self.hilo_guardado.join(timeout=5)
+        self.guardar()
+
+    def eliminar_expirados(self):
+        """Borra los días de rollups más viejos que la retención de su nivel"""
+        eliminados = 0
+        for nivel in NIVELES:
+            limite = (datetime.now() - timedelta(days=self.retencion_dias[nivel])).strftime("%Y-%m-%d")
+            for dia in self.dias_guardados(nivel):
+                if dia >= limite:
+                    break
+                with self._lock:
+                    self._dias.pop((nivel, dia), None)
+                    self._lineas.pop((nivel, dia), None)
+                    try:
+                        os.remove(self.ruta(nivel, dia))
+                        eliminados += 1
+                    except FileNotFoundError:
+                        pass
+        if eliminados:
+            print(f"🧹 Eliminados {eliminados} archivos de rollups vencidos")
+        return eliminados
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def consultar(self, nivel="hora", code=None, desde=None, hasta=None):
+        """Cubetas del nivel entre dos fechas ISO, ordenadas por cubeta y code.
+
+        Cada fila trae code, bucket, count, sum, min, max, mean, last y last_date.
+        """
+        if nivel not in NIVELES:
+            raise ValueError(f"Nivel inválido: {nivel} (usar 'minuto' o 'hora')")
+        largo = NIVELES[nivel]
+        desde_cubeta = desde[:largo] if desde else None
+        hasta_cubeta = hasta[:largo] if hasta else None
+
+        def agregar_filas(tabla):
+            for clave, cubeta in tabla.items():
+                if code is not None and clave[0] != code:
+                    continue
+                if (desde_cubeta and clave[1] < desde_cubeta) or (hasta_cubeta and clave[1] > hasta_cubeta):
+                    continue
+                fila = self._fila(clave, cubeta)
+                fila["mean"] = cubeta[_SUM] / cubeta[_COUNT]
+                filas.append(fila)
+
+        filas = []
+        en_disco = []
+        with self._lock:
+            dias = set(self.dias_guardados(nivel)) | {d for (n, d) in self._dias if n == nivel}
+            for dia in sorted(dias):
+                if (desde and dia < desde[:10]) or (hasta and dia > hasta[:10]):
+                    continue
+                tabla = self._dias.get((nivel, dia))
+                if tabla is not None:
+                    agregar_filas(tabla)
+                else:
+                    en_disco.append(dia)
+        # Los días que no están en memoria se leen sin cargarlos: una consulta no los marca para reescribir
+        for dia in en_disco:
+            agregar_filas(self._leer_tabla(nivel, dia)[0])
+        filas.sort(key=lambda f: (f["bucket"], f["code"]))
+        return filas
+
+    def resumen(self, code=None, desde=None, hasta=None, nivel="hora"):
+        """Combina las cubetas del rango en un total por sensor (count/min/max/mean/last)"""
+        totales = {}
+        for fila in self.consultar(nivel, code, desde, hasta):
+            total = totales.get(fila["code"])
+            if total is None:
+                totales[fila["code"]] = {k: fila[k] for k in ("count", "sum", "min", "max", "last", "last_date")}
+                continue
+            total["count"] += fila["count"]
+            total["sum"] += fila["sum"]
+            total["min"] = min(total["min"], fila["min"])
+            total["max"] = max(total["max"], fila["max"])
+            if fila["last_date"] >= total["last_date"]:
+                total["last"], total["last_date"] = fila["last"], fila["last_date"]
+        for total in totales.values():
+            total["mean"] = total["sum"] / total["count"]
+        return totales
+
+
+_rollups = None
+_lock_rollups = threading.Lock()
+
+
+def obtener_rollups():
+    """Rollups compartidos por la ingesta y las consultas"""
+    global _rollups
+    if _rollups is None:
+        with _lock_rollups:
+            if _rollups is None:
+                _rollups = Rollups().iniciar_guardado()
+    return _rollups
+
+
+@atexit.register
+def guardar_rollups():
+    """Escribe las cubetas pendientes al salir"""
+    if _rollups is not None:
+        try:
+            _rollups.guardar()
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar los rollups: {e}")
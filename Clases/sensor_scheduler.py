@@ -1,17 +1,50 @@
 import json
 import threading
-import time
-import re
 from datetime import datetime
-from .arduino import guardar_dato  # Tu función que guarda en Mongo/historial
+from .arduino import guardar_dato, revisar_alertas, guardar_alertas_vencidas, guardar_alertas_agrupadas  # Tu función que guarda en Mongo/historial
+from .registro_config import invalidar_cache
+from .escritor_lotes import EscritorLotes
+from .historial_segmentado import HistorialSegmentado
+from .almacenamiento_local import obtener_almacenamiento
+from .rollups import obtener_rollups
+from .lector_multipuerto import LectorMultipuerto, puertos_desde_dispositivos
+from .cola_ingesta import ColaIngesta
+from .parser_lecturas import obtener_parser, motivo_invalida
+from .muestreador import Muestreador, intervalos_desde_dispositivos
+from .puerto_compartido import PuertoCompartido
+from .canal_actuador import registrar_canal, retirar_canal, BAUDIOS_ACTUADORES
+from .supresor_alertas import INTERVALO_VENCIMIENTO
 
 class SensorScheduler:
-    def __init__(self, puerto_serial="COM6", devices_file="Jsons_DATA/devices.json"):
+    def __init__(self, puerto_serial="COM6", devices_file="Jsons_DATA/devices.json",
+                 max_lote=100, max_espera_ms=200, politica_fsync="segundo", dias_historial=7,
+                 capacidad_cola=10000, politica_cola="descartar_antiguo", trabajadores=1,
+                 modo_muestreo="ultimo", puertos_compartidos=(), baudios_compartidos=BAUDIOS_ACTUADORES):
+        # Un puerto ("COM6"), una lista de puertos, o None para tomarlos de devices.json
         self.puerto_serial = puerto_serial
+        # Puertos que también reciben comandos de actuadores: los abre un PuertoCompartido
+        # y obtener_despachador(puerto) en este proceso escribe por esa misma conexión
+        self.puertos_compartidos = [puertos_compartidos] if isinstance(puertos_compartidos, str) else list(puertos_compartidos)
+        # Velocidad de esos puertos: la del Arduino de actuadores, no la de los puertos solo de lectura
+        self.baudios_compartidos = baudios_compartidos
+        self.compartidos = {}
         self.devices_file = devices_file
         self.running = False
         self.devices = []
         self.hilo_lector = None
+        self.lector = None
+        # Cierra las ventanas de supresión vencidas aunque el sensor ya no genere alertas
+        self.hilo_alertas = None
+        self._detenido = threading.Event()
+        # Etapa de escritura por lotes entre el lector serial y los archivos
+        self.escritor = EscritorLotes(max_lote, max_espera_ms, politica_fsync)
+        # Cola acotada entre el lector y la persistencia: el lector nunca espera al disco
+        self.cola = ColaIngesta(self.guardar_lectura, capacidad_cola, politica_cola, trabajadores)
+        # Una lectura por sensor por reading_interval (sin intervalo, todas pasan); solo reduce lo
+        # que se guarda: las alertas se revisan antes, sobre todas las lecturas
+        self.muestreador = Muestreador(self.cola.encolar, modo=modo_muestreo)
+        self.dias_historial = dias_historial
+        self.almacenamiento = obtener_almacenamiento()
 
     def cargar_dispositivos(self):
         """Carga la configuración de sensores desde el archivo JSON."""
@@ -19,8 +52,12 @@ class SensorScheduler:
             with open(self.devices_file, 'r', encoding='utf-8') as f:
                 self.devices = json.load(f)
             print(f"📱 Dispositivos cargados: {len(self.devices)}")
+            intervalos = intervalos_desde_dispositivos(self.devices)
             for device in self.devices:
-                print(f"   🔄 {device.get('name', 'Desconocido')} ({device.get('code')}): cada {device.get('reading_interval', 300)}s")
+                intervalo = intervalos.get(device.get('code'))
+                frecuencia = f"cada {intervalo}s" if intervalo else "todas las lecturas"
+                print(f"   🔄 {device.get('name', 'Desconocido')} ({device.get('code')}): {frecuencia}")
+            self.muestreador.configurar(intervalos)
         except FileNotFoundError:
             print(f"❌ No se encontró {self.devices_file}")
             self.devices = []
@@ -28,36 +65,43 @@ class SensorScheduler:
             print(f"❌ Error cargando dispositivos: {e}")
             self.devices = []
 
-    def hilo_lectura_serial(self):
-        """Hilo único que lee TODAS las lecturas de Arduino y las guarda."""
-        import serial
+    def recargar_dispositivos(self):
+        """Vuelve a leer devices.json tras una actualización desde la API."""
+        invalidar_cache(self.devices_file)
+        self.cargar_dispositivos()
 
+    def puertos(self):
+        """Puertos a leer: los indicados al crear el scheduler o los declarados en devices.json"""
+        if isinstance(self.puerto_serial, str):
+            return [self.puerto_serial]
+        if self.puerto_serial:
+            return list(self.puerto_serial)
+        return puertos_desde_dispositivos(self.devices)
+
+    def guardar_lectura(self, sensor, valor, encolado=None):
+        """Persiste una lectura ya parseada (lo ejecutan los trabajadores de la cola).
+
+        'encolado' es la llegada a la cola: el escritor mide la latencia desde ahí hasta el commit.
+        """
+        guardar_dato(sensor.code, valor, escritor=self.escritor, almacenamiento=self.almacenamiento, sensor=sensor,
+                     alertas=False, llegada=encolado)
+
+    def procesar_lote(self, puerto, lineas):
+        """Parsea en una pasada las líneas (bytes) de un lote, revisa alertas y encola las lecturas."""
+        parser = obtener_parser()
+        lecturas, invalidas = parser.parsear_bloque(lineas)
+        for linea in invalidas:
+            print(f"📨 Recibido ({puerto}): {linea.decode('utf-8', errors='ignore').strip()}")
+            print(motivo_invalida(linea, parser.mapa))
+        # Alertas sobre cada lectura cruda (todo en memoria): un pico dentro de un
+        # reading_interval no queda oculto ni demorado por el muestreo
         try:
-            ser = serial.Serial(self.puerto_serial, 9600, timeout=1)
-            print(f"📡 Escuchando en {self.puerto_serial}...")
-
-            while self.running:
-                try:
-                    linea = ser.readline().decode(errors="ignore").strip()
-                    if not linea:
-                        continue
-
-                    print(f"📨 Recibido: {linea}")
-
-                    match = re.match(r"([^:]+):(.+)", linea)
-                    if match:
-                        sensor_code = match.group(1)  # ej: tmp/1 o nivel/1
-                        valor = match.group(2)
-
-                        # Guardar dato usando tu función existente
-                        guardar_dato(sensor_code, valor)
-
-                except Exception as e:
-                    print(f"❌ Error en lectura serial: {e}")
-                    time.sleep(1)
-
+            revisar_alertas(lecturas)
         except Exception as e:
-            print(f"❌ No se pudo abrir {self.puerto_serial}: {e}")
+            print(f"❌ Error revisando alertas ({puerto}): {e}")
+        for sensor, valor in lecturas:
+            print(f"📨 Recibido ({puerto}): {sensor.code}:{valor}")
+            self.muestreador.agregar(sensor, valor)
 
     def iniciar_programacion(self):
         """Inicia el hilo único de lectura."""
@@ -70,18 +114,66 @@ class SensorScheduler:
             print("⚠️ No hay dispositivos configurados")
             return
 
-        self.running = True
-        print("🚀 Iniciando lector único de sensores...")
+        puertos = self.puertos()
+        if not puertos:
+            print("⚠️ No hay puertos seriales configurados")
+            return
 
-        self.hilo_lector = threading.Thread(target=self.hilo_lectura_serial, daemon=True)
-        self.hilo_lector.start()
+        self.running = True
+        self._detenido.clear()
+        self.escritor.iniciar()
+        self.cola.iniciar()
+        self.muestreador.iniciar()
+        self.hilo_alertas = threading.Thread(target=self._vencer_alertas, daemon=True)
+        self.hilo_alertas.start()
+        # Retención y compactación del historial segmentado en segundo plano
+        if isinstance(self.almacenamiento.historial, HistorialSegmentado):
+            self.almacenamiento.historial.iniciar_mantenimiento(dias_mantener=self.dias_historial)
+        print(f"🚀 Iniciando lector único de sensores en {len(puertos)} puerto(s): {', '.join(puertos)}")
+
+        for puerto in puertos:
+            if puerto in self.puertos_compartidos:
+                canal = PuertoCompartido(puerto, self.procesar_lote, baudios=self.baudios_compartidos)
+                registrar_canal(canal)
+                self.compartidos[puerto] = canal.abrir(esperar_conexion=False)
+        solo_lectura = [puerto for puerto in puertos if puerto not in self.compartidos]
+
+        # Un solo hilo atiende todos los puertos con selectors, con reconexión por puerto
+        if solo_lectura:
+            self.lector = LectorMultipuerto(solo_lectura, self.procesar_lote, decodificar=False)
+            self.hilo_lector = threading.Thread(target=self.lector.ejecutar, daemon=True)
+            self.hilo_lector.start()
+
+    def _vencer_alertas(self):
+        """Guarda cada pocos segundos los resúmenes de incidentes cuya ventana ya cerró"""
+        while not self._detenido.wait(INTERVALO_VENCIMIENTO):
+            try:
+                guardar_alertas_vencidas()
+            except Exception as e:
+                print(f"⚠️ Error cerrando ventanas de alertas: {e}")
 
     def detener_programacion(self):
         """Detiene el hilo de lectura."""
         print("🛑 Deteniendo lector de sensores...")
         self.running = False
+        self._detenido.set()
+        if self.hilo_alertas and self.hilo_alertas.is_alive():
+            self.hilo_alertas.join(timeout=5)
+        if self.lector:
+            self.lector.activo = False
         if self.hilo_lector and self.hilo_lector.is_alive():
             self.hilo_lector.join(timeout=5)
+        for canal in self.compartidos.values():
+            canal.cerrar()
+            retirar_canal(canal)
+        self.compartidos = {}
+        self.muestreador.detener()
+        self.cola.detener()
+        guardar_alertas_agrupadas()
+        self.escritor.detener()
+        obtener_rollups().guardar()
+        if isinstance(self.almacenamiento.historial, HistorialSegmentado):
+            self.almacenamiento.historial.detener_mantenimiento()
         print("✅ Lector de sensores detenido")
 
     def obtener_estado(self):
@@ -89,12 +181,18 @@ class SensorScheduler:
         return {
             "running": self.running,
             "total_devices": len(self.devices),
-            "active_threads": 1 if self.hilo_lector and self.hilo_lector.is_alive() else 0,
+            "active_threads": (1 if self.hilo_lector and self.hilo_lector.is_alive() else 0)
+                              + sum(1 for canal in self.compartidos.values() if canal.activo),
+            "writer": self.escritor.metricas(),
+            "ports": dict(self.lector.estado() if self.lector else {},
+                          **{puerto: canal.estado() for puerto, canal in self.compartidos.items()}),
+            "queue": self.cola.metricas(),
+            "sampler": self.muestreador.estado(),
             "sensors": [
                 {
                     "code": d.get('code'),
                     "name": d.get('name'),
-                    "interval": d.get('reading_interval', 300),
+                    "interval": self.muestreador.intervalos.get(d.get('code')),
                     "active": True
                 }
                 for d in self.devices
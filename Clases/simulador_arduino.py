@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+# Valores base por tipo de sensor cuando alertasMapa.json no define un rango completo
+VALORES_BASE = {"tmp": 22.0, "phh": 7.0, "niv": 1000.0, "tbz": 600.0, "tds": 300.0}
+
+# Las líneas que se deben escribir se juntan en ticks de este largo (segundos)
+TICK = 0.01
+
+
+class SensorSimulado:
+    """Valor de un sensor que deriva con ruido alrededor de su centro y a veces se dispara"""
+
+    def __init__(self, code, rango=None, ruido=0.02):
+        self.code = code
+        rango = rango or {}
+        minimo, maximo = rango.get("min"), rango.get("max")
+        if minimo is not None and maximo is not None:
+            self.centro = (minimo + maximo) / 2
+            self.amplitud = (maximo - minimo) / 2
+        else:
+            self.centro = VALORES_BASE.get(code.split("/")[0], 100.0)
+            self.amplitud = self.centro * 0.2
+        self.minimo, self.maximo = minimo, maximo
+        self.ruido = ruido
+        self.valor = self.centro
+
+    def siguiente(self):
+        # Camino aleatorio que vuelve lentamente al centro
+        self.valor += random.gauss(0, self.ruido * self.amplitud) + (self.centro - self.valor) * 0.05
+        return self.valor
+
+    def pico(self):
+        """Valor fuera del rango de alerta (o muy lejos del centro si no hay rango)"""
+        if self.maximo is not None and (self.minimo is None or random.random() < 0.5):
+            return self.maximo + abs(self.amplitud) * random.uniform(0.2, 1.0) + 1
+        if self.minimo is not None:
+            return self.minimo - abs(self.amplitud) * random.uniform(0.2, 1.0) - 1
+        return self.centro + self.amplitud * random.choice((-5, 5))
+
+
+class SimuladorArduino:
+    """Arduino simulado sobre un pseudo-terminal (solo Linux/macOS).
+
+    Crea un par pty y escribe en el lado maestro líneas "code:valor" de todos
+    los sensores de devices.json; el lado esclavo ('puerto', ej. /dev/pts/3)
+    se abre como cualquier puerto serial desde leer_serial_y_guardar o
+    SensorScheduler. Permite ajustar la tasa, el ruido, los picos fuera de
+    rango (para disparar alertasMapa.json) y las líneas mal formadas.
+    """
+
+    def __init__(self, devices_file="Jsons_DATA/devices.json", alertas_file="Jsons_DATA/alertasMapa.json",
+                 tasa=10.0, ruido=0.02, prob_pico=0.01, prob_malformada=0.005, codigos=None, semilla=None):
+        """
+        Args:
+            tasa: Lecturas por segundo de cada sensor
+            ruido: Desviación del ruido relativa a la mitad del rango del sensor
+            prob_pico: Probabilidad de que una lectura salga fuera de rango
+            prob_malformada: Probabilidad de emitir una línea inválida
+            codigos: Lista de códigos a simular (por defecto todos los de devices.json)
+        """
+        if semilla is not None:
+            random.seed(semilla)
+        if codigos is None:
+            with open(devices_file, "r", encoding="utf-8") as f:
+                codigos = [d["code"] for d in json.load(f) if d.get("code")]
+        try:
+            with open(alertas_file, "r", encoding="utf-8") as f:
+                rangos = json.load(f)
+        except FileNotFoundError:
+            rangos = {}
+        self.sensores = [SensorSimulado(code, rangos.get(code), ruido) for code in codigos]
+        self.tasa = tasa
+        self.prob_pico = prob_pico
+        self.prob_malformada = prob_malformada
+        self.maestro = None
+        self.esclavo = None
+        self.puerto = None
+        self.running = False
+        self.hilo = None
+        self.estadisticas = {"lineas": 0, "picos": 0, "malformadas": 0, "bytes": 0}
+
+    def abrir(self):
+        """Crea el pty y devuelve el nombre del puerto para los lectores"""
+        import pty
+        import tty
+
+        self.maestro, self.esclavo = pty.openpty()
+        # Modo crudo: sin eco ni traducción de fin de línea, como un puerto serial real
+        tty.setraw(self.esclavo)
+        self.puerto = os.ttyname(self.esclavo)
+        return self.puerto
+
+    def _linea(self, sensor):
+        if random.random() < self.prob_malformada:
+            self.estadisticas["malformadas"] += 1
+            return random.choice((
+                f"{sensor.code}:",                      # sin valor
+                f"{sensor.code}:abc",                   # valor no numérico
+                f"{sensor.code}{sensor.valor:.2f}",     # sin separador
+                "zzz/9:1.0",                            # sensor desconocido
+                "\x00\xff#",                            # ruido en la línea
+            ))
+        if random.random() < self.prob_pico:
+            self.estadisticas["picos"] += 1
+            return f"{sensor.code}:{sensor.pico():.2f}"
+        return f"{sensor.code}:{sensor.siguiente():.2f}"
+
+    def _bucle(self, duracion):
+        inicio = time.monotonic()
+        limite = inicio + duracion if duracion else None
+        emitidas = 0
+        while self.running and (limite is None or time.monotonic() < limite):
+            # Se escribe de una vez todo lo que correspondía hasta ahora, a la tasa pedida
+            debidas = int((time.monotonic() - inicio) * self.tasa)
+            lineas = []
+            while emitidas < debidas:
+                lineas.extend(self._linea(sensor) for sensor in self.sensores)
+                emitidas += 1
+            if lineas:
+                bloque = ("\r\n".join(lineas) + "\r\n").encode("utf-8", errors="ignore")
+                try:
+                    os.write(self.maestro, bloque)
+                except OSError:
+                    break
+                self.estadisticas["lineas"] += len(lineas)
+                self.estadisticas["bytes"] += len(bloque)
+            time.sleep(TICK)
+        self.running = False
+
+    def iniciar(self, duracion=None):
+        """Empieza a emitir en segundo plano (para siempre o durante 'duracion' segundos)"""
+        if self.maestro is None:
+            self.abrir()
+        self.running = True
+        self.hilo = threading.Thread(target=self._bucle, args=(duracion,), daemon=True)
+        self.hilo.start()
+        print(f"🤖 Arduino simulado en {self.puerto}: {len(self.sensores)} sensores x {self.tasa:g} lecturas/s")
+        return self.puerto
+
+    def detener(self):
+        self.running = False
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=2)
+
+    def cerrar(self):
+        self.detener()
+        for fd in (self.maestro, self.esclavo):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.maestro = self.esclavo = None
+
+
+def prueba_de_carga(tasa=100.0, duracion=10.0, puertos=1, **kwargs):
+    """Corre SensorScheduler contra 'puertos' Arduinos simulados y mide la ingesta sostenida"""
+    from .sensor_scheduler import SensorScheduler
+
+    simuladores = [SimuladorArduino(tasa=tasa, **kwargs) for _ in range(puertos)]
+    nombres = [s.abrir() for s in simuladores]
+    scheduler = SensorScheduler(puerto_serial=nombres)
+    scheduler.iniciar_programacion()
+    time.sleep(0.5)
+
+    inicio = time.monotonic()
+    for simulador in simuladores:
+        simulador.iniciar(duracion)
+    for simulador in simuladores:
+        simulador.hilo.join()
+    # Margen para que el lector tome lo último del pty; detener vacía la cola y el escritor
+    time.sleep(0.5)
+    scheduler.detener_programacion()
+    transcurrido = time.monotonic() - inicio
+    estado = scheduler.obtener_estado()
+    for simulador in simuladores:
+        simulador.cerrar()
+
+    emitidas = sum(s.estadisticas["lineas"] for s in simuladores)
+    cola = estado["queue"]
+    print("=" * 70)
+    print(f"📊 Prueba de carga: {puertos} puerto(s), {emitidas} líneas emitidas en {duracion:g}s")
+    print(f"   Procesadas: {cola['procesados']} ({cola['procesados'] / transcurrido:.0f} lecturas/s sostenidas)")
+    print(f"   Descartadas por la cola: {cola['descartados']} | profundidad máx: {cola['profundidad_max']}")
+    if "latencia_proceso_ms" in cola:
+        latencia = cola["latencia_proceso_ms"]
+        print(f"   Latencia cola→escritor: p50 {latencia['p50']:.1f} ms | p99 {latencia['p99']:.1f} ms | "
+              f"máx {latencia['max']:.1f} ms")
+    escritor = estado["writer"]
+    if "latencia_total_ms" in escritor:
+        latencia = escritor["latencia_total_ms"]
+        print(f"   Latencia cola→archivo (por lectura, de punta a punta): p50 {latencia['p50']:.1f} ms | "
+              f"p99 {latencia['p99']:.1f} ms | máx {latencia['max']:.1f} ms")
+    print(f"   Escritor: {dict((k, v) for k, v in escritor.items() if k != 'latencia_total_ms')}")
+    print("=" * 70)
+    return estado
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python -m Clases.simulador_arduino                      -> emite para siempre e imprime el puerto
+    #   python -m Clases.simulador_arduino --carga --duracion 10 --tasa 200 --puertos 4
+    parser = argparse.ArgumentParser(description="Arduino simulado sobre un pseudo-terminal")
+    parser.add_argument("--tasa", type=float, default=10.0, help="lecturas por segundo de cada sensor")
+    parser.add_argument("--ruido", type=float, default=0.02)
+    parser.add_argument("--picos", type=float, default=0.01, help="probabilidad de lectura fuera de rango")
+    parser.add_argument("--malformadas", type=float, default=0.005, help="probabilidad de línea inválida")
+    parser.add_argument("--duracion", type=float, default=None, help="segundos (por defecto sin límite)")
+    parser.add_argument("--carga", action="store_true", help="medir la ingesta con SensorScheduler")
+    parser.add_argument("--puertos", type=int, default=1, help="cantidad de Arduinos simulados (con --carga)")
+    argumentos = parser.parse_args()
+
+    opciones = {"ruido": argumentos.ruido, "prob_pico": argumentos.picos,
+                "prob_malformada": argumentos.malformadas}
+    if argumentos.carga:
+        prueba_de_carga(argumentos.tasa, argumentos.duracion or 10.0, argumentos.puertos, **opciones)
+    else:
+        simulador = SimuladorArduino(tasa=argumentos.tasa, **opciones)
+        print(f"🔌 Conectar el lector a: {simulador.abrir()}")
+        simulador.iniciar(argumentos.duracion)
+        try:
+            simulador.hilo.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulador.cerrar()
+            print(f"🛑 Simulador detenido: {simulador.estadisticas}")
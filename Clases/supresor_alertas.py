@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Duración de la ventana de agrupación de cada incidente (segundos)
+VENTANA_SUPRESION = 300.0
+# Incidentes abiertos como máximo; si se pasa, se cierra el más viejo antes de tiempo
+MAX_INCIDENTES = 1000
+# Cada cuántos segundos SensorScheduler cierra las ventanas vencidas aunque no lleguen alertas
+INTERVALO_VENCIMIENTO = 5.0
+
+
+class _Incidente:
+    __slots__ = ("code", "estado", "vence", "primera", "ultima", "cantidad", "reportadas",
+                 "minimo", "maximo", "ultimo_valor", "mensaje")
+
+    def __init__(self, code, estado, vence, fecha, valor, mensaje):
+        self.code = code
+        self.estado = estado
+        self.vence = vence
+        self.primera = fecha
+        self.ultima = fecha
+        self.cantidad = 1
+        self.reportadas = 0
+        self.minimo = valor
+        self.maximo = valor
+        self.ultimo_valor = valor
+        self.mensaje = mensaje
+
+
+class SupresorAlertas:
+    """Agrupa las alertas repetidas de un sensor en ventanas de supresión.
+
+    La primera alerta de un incidente (sensor + bajo/alto) sale enseguida;
+    las que se repiten dentro de la ventana (lecturas que siguen fuera de
+    rango o un sensor que oscila) solo actualizan en memoria la cantidad,
+    las fechas y el mínimo/máximo. Al cerrar la ventana se emite un único
+    registro resumen, así la escritura de alertas crece con los incidentes
+    y no con las lecturas. Los incidentes abiertos están acotados.
+    """
+
+    def __init__(self, ventana=VENTANA_SUPRESION, max_incidentes=MAX_INCIDENTES):
+        self.ventana = ventana
+        self.max_incidentes = max_incidentes
+        # (code, estado) -> _Incidente, en orden de apertura (= orden de vencimiento)
+        self._incidentes = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {"recibidas": 0, "emitidas": 0, "suprimidas": 0, "resumenes": 0}
+
+    def registrar(self, code, estado, valor, mensaje, nueva=True, ahora=None):
+        """Registra una alerta (nueva=True) o una lectura que sigue fuera de rango (nueva=False).
+
+        Returns:
+            Lista de alertas a guardar: dicts con code, value, message y, en los
+            resúmenes, "resumen" con first_date/last_date/count/min_value/max_value
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        fecha = datetime.now().isoformat()
+        with self._lock:
+            self.estadisticas["recibidas"] += 1
+            salida = self._vencer(ahora)
+            clave = (code, estado)
+            incidente = self._incidentes.get(clave)
+            if incidente is not None:
+                incidente.cantidad += 1
+                incidente.ultima = fecha
+                incidente.ultimo_valor = valor
+                if valor < incidente.minimo:
+                    incidente.minimo = valor
+                if valor > incidente.maximo:
+                    incidente.maximo = valor
+                self.estadisticas["suprimidas"] += 1
+                return salida
+
+            if len(self._incidentes) >= self.max_incidentes:
+                _, viejo = self._incidentes.popitem(last=False)
+                self._cerrar(viejo, salida)
+            incidente = self._incidentes[clave] = _Incidente(code, estado, ahora + self.ventana, fecha, valor, mensaje)
+            if nueva:
+                incidente.reportadas = 1
+                self.estadisticas["emitidas"] += 1
+                salida.append({"code": code, "value": valor, "message": mensaje})
+            return salida
+
+    def vencer(self, ahora=None):
+        """Cierra las ventanas vencidas y devuelve sus resúmenes"""
+        with self._lock:
+            return self._vencer(time.monotonic() if ahora is None else ahora)
+
+    def vaciar(self):
+        """Cierra todas las ventanas (al detener el sistema) y devuelve sus resúmenes"""
+        return self.vencer(float("inf"))
+
+    def _vencer(self, ahora):
+        salida = []
+        while self._incidentes:
+            incidente = next(iter(self._incidentes.values()))
+            if incidente.vence > ahora:
+                break
+            self._incidentes.popitem(last=False)
+            self._cerrar(incidente, salida)
+        return salida
+
+    def _cerrar(self, incidente, salida):
+        if incidente.cantidad <= incidente.reportadas:
+            return
+        self.estadisticas["resumenes"] += 1
+        salida.append({
+            "code": incidente.code,
+            "value": incidente.ultimo_valor,
+            "message": f"{incidente.mensaje} ({incidente.cantidad} alertas agrupadas)",
+            "resumen": {
+                "first_date": incidente.primera,
+                "last_date": incidente.ultima,
+                "count": incidente.cantidad,
+                "min_value": incidente.minimo,
+                "max_value": incidente.maximo,
+            },
+        })
+
+    def abiertos(self):
+        with self._lock:
+            return len(self._incidentes)
+
+
+_supresor = None
+_lock_supresor = threading.Lock()
+
+
+def obtener_supresor_alertas():
+    """Supresor compartido por todo el camino de alertas"""
+    global _supresor
+    if _supresor is None:
+        with _lock_supresor:
+            if _supresor is None:
+                _supresor = SupresorAlertas()
+    return _supresor
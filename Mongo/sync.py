@@ -10,13 +10,35 @@ from .mongo import MongoDb
 from Clases.lista import Lista
 from Clases.dataSensores import dataSensores
 from Clases.alerta import Alerta
+from Clases.almacenamiento import leer_registros, escribir_registros
+from Clases.almacenamiento_local import AlmacenamientoJson, obtener_almacenamiento
+from Clases.consultas import ConsultasHistorial
+from Clases.registro_alertas import obtener_registro_alertas
 
 ARCHIVO_LOCAL = "Jsons_DATA/data_sensores_local.json"
 ARCHIVO_ALERTAS = "Jsons_DATA/data_sesnsoresalerta_online.json"
 
+def normalizar_dato(dato):
+    """Convierte un registro online (id_tank/sensor) al formato de dataSensores sin construir objetos"""
+    return {
+        "id": dato.get("id"),
+        "tankId": dato.get("id_tank", dato.get("tankId")),
+        "name": dato.get("sensor", dato.get("name")),
+        "deviceId": dato.get("deviceId"),
+        "code": dato.get("code"),
+        "value": dato.get("value"),
+        "unit": dato.get("unit"),
+        "date": dato.get("date"),
+        "synced": bool(dato.get("synced", False))
+    }
+
 class SyncManager:
-    def __init__(self, archivo_local=ARCHIVO_LOCAL):
-        self.archivo_local = archivo_local
+    def __init__(self, archivo_local=None, almacenamiento=None):
+        # Backend local (JSON o SQLite) con la cola online y el historial
+        self.almacenamiento = almacenamiento or obtener_almacenamiento()
+        # Sin archivo_local se usa el historial del backend; con una ruta, el archivo único original
+        self.archivo_local = archivo_local or ARCHIVO_LOCAL
+        self.historial = self.almacenamiento.historial if archivo_local is None else None
         self.lista_sensores = Lista(dataSensores)
         self.mongo = None
         self._inicializar_mongo()
@@ -31,6 +53,11 @@ class SyncManager:
     
     def cargar_datos_locales(self):
         try:
+            if self.historial is not None:
+                lista_datos = Lista(dataSensores, self.almacenamiento.leer_historial())
+                print(f"📊 Cargados {len(lista_datos.elementos)} datos locales")
+                return lista_datos
+
             if not os.path.exists(self.archivo_local):
                 print("📁 Archivo local no encontrado, creando lista vacía")
                 return Lista(dataSensores)
@@ -45,8 +72,14 @@ class SyncManager:
             print(f"❌ Error al cargar datos locales: {e}")
             return Lista(dataSensores)
     
-    def filtrar_datos_no_sincronizados(self, lista_datos):
+    def filtrar_datos_no_sincronizados(self, lista_datos=None):
         """Filtra datos que no han sido sincronizados"""
+        if lista_datos is None:
+            # Consulta directa al backend (índice por synced en SQLite), sin crear objetos
+            datos_no_sync = [normalizar_dato(d) for d in self.almacenamiento.no_sincronizados()]
+            print(f"🔍 Encontrados {len(datos_no_sync)} datos no sincronizados")
+            return datos_no_sync
+
         datos_no_sync = []
         for elemento in lista_datos.elementos:
             dato_dict = elemento.diccionario() if hasattr(elemento, 'diccionario') else elemento.__dict__
@@ -76,8 +109,10 @@ class SyncManager:
                 datos_modificados += 1
             datos_dict.append(dato_dict)
         
-        with open(self.archivo_local, "w", encoding="utf-8") as f:
-            json.dump(datos_dict, f, indent=4, ensure_ascii=False)
+        # El historial del backend es de solo agregar y no guarda 'synced'
+        # (la cola online lleva ese estado): solo se reescribe el archivo único original
+        if self.historial is None:
+            escribir_registros(self.archivo_local, datos_dict)
         
         print(f"✅ {datos_modificados} datos marcados como sincronizados")
         return datos_modificados
@@ -85,11 +120,18 @@ class SyncManager:
     def limpiar_datos_antiguos(self, dias_mantener=7):
         from datetime import datetime, timedelta
         
+        # Historial del backend: segmentos completos vencidos o DELETE indexado por fecha
+        if self.historial is not None:
+            try:
+                self.almacenamiento.eliminar_antiguos(dias_mantener)
+            except Exception as e:
+                print(f"⚠️ Error al limpiar datos antiguos: {e}")
+            return
+
         try:
             fecha_limite = datetime.now() - timedelta(days=dias_mantener)
             
-            with open(self.archivo_local, "r", encoding="utf-8") as f:
-                datos_actuales = json.load(f)
+            datos_actuales = leer_registros(self.archivo_local)
             
             datos_filtrados = []
             datos_eliminados = 0
@@ -108,8 +150,7 @@ class SyncManager:
                         datos_filtrados.append(dato)
             
             if datos_eliminados > 0:
-                with open(self.archivo_local, "w", encoding="utf-8") as f:
-                    json.dump(datos_filtrados, f, indent=4, ensure_ascii=False)
+                escribir_registros(self.archivo_local, datos_filtrados)
                 print(f"🧹 Limpiados {datos_eliminados} datos antiguos (>{dias_mantener} días)")
             else:
                 print("🧹 No hay datos antiguos para limpiar")
@@ -117,8 +158,13 @@ class SyncManager:
         except Exception as e:
             print(f"⚠️ Error al limpiar datos antiguos: {e}")
     
-    def obtener_estadisticas(self, lista_datos):
+    def obtener_estadisticas(self, lista_datos=None):
         try:
+            if lista_datos is None:
+                stats = self.almacenamiento.contar()
+                print(f"📊 Estadísticas: {stats['total']} total | {stats['sincronizados']} sync | {stats['no_sincronizados']} pendientes")
+                return stats
+
             total_datos = len(lista_datos.elementos)
             sincronizados = 0
             no_sincronizados = 0
@@ -141,65 +187,78 @@ class SyncManager:
             print(f"⚠️ Error al obtener estadísticas: {e}")
             return {"total": 0, "sincronizados": 0, "no_sincronizados": 0}
 
+    def obtener_agregados(self, desde=None, hasta=None):
+        """min/max/mean/percentiles/count/último valor por sensor y por tanque en la ventana"""
+        try:
+            resumen = ConsultasHistorial(self.almacenamiento).resumen(desde, hasta)
+            print(f"📈 Agregados: {resumen['lecturas']} lecturas | {len(resumen['por_sensor'])} sensores | "
+                  f"{len(resumen['por_tanque'])} tanques")
+            return resumen
+        except Exception as e:
+            print(f"⚠️ Error al calcular agregados: {e}")
+            return {"lecturas": 0, "por_sensor": {}, "por_tanque": {}}
+
 def cargar_datos_locales():
     sync_manager = SyncManager()
     return sync_manager.cargar_datos_locales()
 
 def sincronizar_alertas(archivo_alertas=ARCHIVO_ALERTAS):
-    """Sincroniza alertas con MongoDB en la colección 'alertas'"""
+    """Sincroniza alertas con MongoDB en la colección 'alertas'
+
+    El archivo de alertas no se trunca: se rota a un segmento con os.replace
+    (las alertas nuevas siguen en un archivo nuevo) y cada segmento se borra
+    solo después de subirlo. Un segmento que falla se reintenta en el próximo ciclo.
+    """
     print("🚨 Iniciando sincronización de alertas...")
     
+    registro = obtener_registro_alertas(archivo_alertas)
+    segmentos = registro.rotar()
+    if not segmentos:
+        print("📁 No hay alertas para sincronizar")
+        return
+    
     try:
         # Inicializar conexión MongoDB específica para alertas
         mongo = MongoDb()
         # Cambiar a la colección de alertas
         mongo.collection = mongo.db["alertas"]
-        
-        # Cargar alertas del archivo
-        if not os.path.exists(archivo_alertas):
-            print("📁 No hay archivo de alertas para sincronizar")
-            return
-        
-        with open(archivo_alertas, "r", encoding="utf-8") as f:
-            contenido = f.read().strip()
-            if not contenido:
-                print("📁 Archivo de alertas vacío")
-                return
-            alertas_data = json.loads(contenido)
-        
-        if not alertas_data:
-            print("📁 No hay alertas para sincronizar")
-            return
-        
-        # Filtrar alertas no sincronizadas
-        alertas_no_sync = [alerta for alerta in alertas_data if not alerta.get("synced", False)]
-        
-        if not alertas_no_sync:
-            print("⏳ No hay alertas nuevas para sincronizar")
-            return
-        
-        print(f"🚨 Subiendo {len(alertas_no_sync)} alertas a MongoDB...")
-        
-        # Preparar datos para MongoDB (remover campo 'synced')
-        alertas_mongo = [{k: v for k, v in alerta.items() if k != "synced"} for alerta in alertas_no_sync]
-        
-        # Insertar en MongoDB
-        mongo.insertar_documentos(alertas_mongo)
-        print(f"✅ {len(alertas_mongo)} alertas insertadas en MongoDB colección 'alertas'")
-        
-        # Limpiar archivo de alertas después de sincronizar exitosamente
-        with open(archivo_alertas, "w", encoding="utf-8") as f:
-            json.dump([], f, indent=4, ensure_ascii=False)
-        print(f"🗑️ Archivo de alertas limpiado - {len(alertas_mongo)} alertas procesadas")
-        
     except Exception as e:
         print(f"❌ Error sincronizando alertas: {e}")
-        print("⚠️ Alertas NO fueron eliminadas del archivo")
+        print(f"⚠️ {len(segmentos)} segmento(s) de alertas quedan para el próximo ciclo")
+        return
+    
+    for segmento in segmentos:
+        try:
+            alertas_data = registro.leer_segmento(segmento)
+            
+            # Filtrar alertas no sincronizadas
+            alertas_no_sync = [alerta for alerta in alertas_data if not alerta.get("synced", False)]
+            
+            if alertas_no_sync:
+                print(f"🚨 Subiendo {len(alertas_no_sync)} alertas a MongoDB...")
+                
+                # Preparar datos para MongoDB (remover campo 'synced')
+                alertas_mongo = [{k: v for k, v in alerta.items() if k != "synced"} for alerta in alertas_no_sync]
+                
+                # Insertar en MongoDB
+                mongo.insertar_documentos(alertas_mongo)
+                print(f"✅ {len(alertas_mongo)} alertas insertadas en MongoDB colección 'alertas'")
+            
+            # El segmento ya se subió: se borra
+            registro.confirmar(segmento)
+            print(f"🗑️ Segmento de alertas confirmado - {len(alertas_no_sync)} alertas procesadas")
+            
+        except Exception as e:
+            print(f"❌ Error sincronizando alertas: {e}")
+            print(f"⚠️ Alertas NO fueron eliminadas ({segmento} se reintenta en el próximo ciclo)")
+            return
 
-def sincronizar_a_mongo(archivo_online="Jsons_DATA/data_sensores_online.json"):
+def sincronizar_a_mongo(archivo_online=None):
     print("🚀 Iniciando servicio de sincronización con SyncManager...")
     
-    sync_manager = SyncManager()
+    # Con una ruta explícita se sincroniza ese archivo; si no, el backend configurado
+    almacenamiento = AlmacenamientoJson(archivo_online) if archivo_online else None
+    sync_manager = SyncManager(almacenamiento=almacenamiento)
     
     if not sync_manager.mongo:
         print("❌ No se pudo inicializar MongoDB. Terminando...")
@@ -218,15 +277,12 @@ def sincronizar_a_mongo(archivo_online="Jsons_DATA/data_sensores_online.json"):
             
             # 📊 LUEGO SINCRONIZAR DATOS DE SENSORES
             print("\n📊 === SINCRONIZACIÓN DE DATOS ===")
-            lista_datos = Lista(dataSensores)
-            lista_datos.cargar(archivo_online)
-            
-            stats = sync_manager.obtener_estadisticas(lista_datos)
+            stats = sync_manager.obtener_estadisticas()
             
             if stats["total"] == 0:
                 print("📁 No hay datos para sincronizar.")
             else:
-                datos_no_sync = sync_manager.filtrar_datos_no_sincronizados(lista_datos)
+                datos_no_sync = sync_manager.filtrar_datos_no_sincronizados()
                 
                 if datos_no_sync:
                     print(f"📤 Subiendo {len(datos_no_sync)} datos nuevos a MongoDB...")
@@ -237,10 +293,9 @@ def sincronizar_a_mongo(archivo_online="Jsons_DATA/data_sensores_online.json"):
                         sync_manager.mongo.insertar_documentos(datos_mongo)
                         print(f"✅ {len(datos_mongo)} datos insertados en MongoDB")
                         
-                        # Borrar COMPLETAMENTE el archivo online después de subir exitosamente
-                        with open(archivo_online, "w", encoding="utf-8") as f:
-                            json.dump([], f, indent=4, ensure_ascii=False)
-                        print(f"🗑️ Archivo online limpiado - {len(datos_mongo)} datos procesados")
+                        # Sacar de la cola solo lo que se subió (lo recibido mientras tanto se conserva)
+                        sync_manager.almacenamiento.marcar_sincronizados([d["id"] for d in datos_no_sync])
+                        print(f"🗑️ Cola online actualizada - {len(datos_mongo)} datos procesados")
                         
                     except Exception as e:
                         print(f"❌ Error al insertar en MongoDB: {e}")
@@ -256,9 +311,17 @@ def sincronizar_a_mongo(archivo_online="Jsons_DATA/data_sensores_online.json"):
         print("="*60)
         time.sleep(30)
 
-def limpiar_datos_antiguos(datos_locales, dias_mantener=7):
+def limpiar_datos_antiguos(datos_locales=None, dias_mantener=7):
     from datetime import datetime, timedelta
     
+    # Sin lista de datos se aplica la retención del backend configurado
+    if datos_locales is None:
+        try:
+            obtener_almacenamiento().eliminar_antiguos(dias_mantener)
+        except Exception as e:
+            print(f"⚠️ Error al limpiar datos antiguos: {e}")
+        return
+
     try:
         fecha_limite = datetime.now() - timedelta(days=dias_mantener)
         
@@ -279,8 +342,7 @@ def limpiar_datos_antiguos(datos_locales, dias_mantener=7):
                     datos_filtrados.append(dato)
         
         if datos_eliminados > 0:
-            with open(ARCHIVO_LOCAL, "w", encoding="utf-8") as f:
-                json.dump(datos_filtrados, f, indent=4, ensure_ascii=False)
+            escribir_registros(ARCHIVO_LOCAL, datos_filtrados)
             print(f"🧹 Limpiados {datos_eliminados} datos antiguos sincronizados.")
             
     except Exception as e:
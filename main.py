@@ -1,6 +1,7 @@
 from Clases.metodos import obtener_uuid, obtener_dispositivos, guardar_dispositivos_json
 from Clases.sensor_scheduler import SensorScheduler
 from Mongo.sync import sincronizar_a_mongo
+from masprubas import iniciar_actuadores
 
 import threading
 import time
@@ -8,20 +9,29 @@ import time
 # ===============================
 # 🔧 CONFIGURACIONES GLOBALES
 # ===============================
-puerto_serial = "COM7"  # Cambiar según tu puerto
+puerto_serial = "COM7"  # Cambiar según tu puerto (o lista de puertos, o None para tomarlos de devices.json)
+# Puerto de los actuadores (comandos por MQTT y horarios), o None para no atenderlos acá.
+# Este proceso queda como único dueño del puerto: se lee con un PuertoCompartido y
+# obtener_despachador(puerto) escribe los comandos por la misma conexión
+puerto_actuadores = "COM7"
+baudios_actuadores = 115200  # La misma velocidad que usa el sketch del Arduino de actuadores
+puertos_compartidos = [puerto_actuadores] if puerto_actuadores else []
 
 # ===============================
 # 🚀 FUNCIÓN PRINCIPAL
 # ===============================
 def main():
-    print("🚀 Iniciando Sistema de Sensores (sin configuraciones horarias/MQTT)")
+    print("🚀 Iniciando Sistema de Sensores")
     print("=" * 70)
     print("🔹 Sensores automáticos")
     print("🔹 Sincronización MongoDB")
+    if puerto_actuadores:
+        print(f"🔹 Actuadores por MQTT y horarios ({puerto_actuadores}, puerto compartido)")
     print("=" * 70)
 
     # Crear el scheduler de sensores
-    scheduler = SensorScheduler(puerto_serial=puerto_serial)
+    scheduler = SensorScheduler(puerto_serial=puerto_serial, puertos_compartidos=puertos_compartidos,
+                                baudios_compartidos=baudios_actuadores)
 
     try:
         # Cargar configuración inicial desde la API
@@ -39,6 +49,11 @@ def main():
         print("\n📊 Iniciando sistema de lectura automática de sensores...")
         scheduler.iniciar_programacion()
 
+        # Actuadores después del scheduler: el PuertoCompartido ya está registrado
+        # y los comandos salen por él en lugar de abrir el puerto otra vez
+        if puerto_actuadores:
+            iniciar_actuadores(puerto_actuadores)
+
         # Hilo de actualización diaria de dispositivos
         def obtener_dispositivos_diariamente():
             while True:
@@ -84,7 +99,8 @@ def main():
             print("\n📊 SENSORES CONFIGURADOS:")
             for sensor in estado['sensors']:
                 status = "✅ Activo" if sensor['active'] else "❌ Inactivo"
-                print(f"   • {sensor['name']} ({sensor['code']}): {sensor['interval']}s - {status}")
+                intervalo = f"{sensor['interval']:g}s" if sensor['interval'] else "todas las lecturas"
+                print(f"   • {sensor['name']} ({sensor['code']}): {intervalo} - {status}")
 
         print("="*70)
         print("⌨️  Presiona Ctrl+C para detener todo el sistema")
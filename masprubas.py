@@ -2,8 +2,8 @@ import json
 import time
 import threading
 from datetime import datetime
-import paho.mqtt.client as mqtt
-import serial
+from Clases.publicador_alertas import crear_cliente_mqtt
+from Clases.despachador_comandos import obtener_despachador, PRIORIDAD_MANUAL, PRIORIDAD_PROGRAMADA
 from Clases.metodos import (
     obtener_uuid,
     obtener_configuraciones,
@@ -14,6 +14,8 @@ from Clases.metodos import (
 # 🔧 CONFIGURACIONES GLOBALES
 # ===============================
 puerto_serial = "COM7"  # Cambiar según tu puerto
+# main.py llama a iniciar_actuadores() en su propio proceso, dueño del puerto (PuertoCompartido):
+# con main.py corriendo no se ejecuta este script aparte, porque abriría el mismo puerto otra vez
 config_file = "Jsons_DATA/user_configs.json"
 broker = '13.59.132.191'
 port = 1883
@@ -22,16 +24,17 @@ topic = 'conf/uuid/code'
 # ===============================
 # 📡 FUNCIÓN DE ENVÍO A ARDUINO
 # ===============================
-def enviar_comando_a_arduino(codigo, puerto=puerto_serial):
-    """Enviar comando al Arduino por serial."""
-    try:
-        with serial.Serial(puerto, 115200, timeout=3) as arduino:
-            time.sleep(5)  # Esperar inicialización
-            arduino.write(f"{codigo}\n".encode())
-            arduino.flush()
-            print(f"⚡ Comando '{codigo}' enviado al Arduino")
-    except Exception as e:
-        print(f"❌ Error enviando comando a Arduino: {e}")
+def enviar_comando_a_arduino(codigo, puerto=None, prioridad=PRIORIDAD_PROGRAMADA):
+    """Encolar comando para el Arduino; vuelve enseguida con un Future de la respuesta."""
+    futuro = obtener_despachador(puerto or puerto_serial).encolar(codigo, prioridad)
+    futuro.add_done_callback(lambda f: _informar_comando(codigo, f))
+    return futuro
+
+def _informar_comando(codigo, futuro):
+    if futuro.exception() is not None:
+        print(f"❌ Error enviando comando a Arduino: {futuro.exception()}")
+    else:
+        print(f"⚡ Comando '{codigo}' enviado al Arduino")
 
 # ===============================
 # ⏰ REVISIÓN DE CONFIGURACIONES HORARIAS
@@ -83,7 +86,7 @@ def revisar_configuraciones_periodicas():
 # ===============================
 def iniciar_mqtt():
     """Sistema MQTT para recibir comandos remotos."""
-    def on_connect(client, userdata, flags, rc):
+    def on_connect(client, userdata, flags, rc, *resto):
         if rc == 0:
             print(f'✅ Conectado a MQTT {broker}:{port}')
             client.subscribe(topic)
@@ -94,9 +97,10 @@ def iniciar_mqtt():
         payload = msg.payload.decode().strip()
         if payload:
             print(f"📥 Comando recibido por MQTT: {payload}")
-            enviar_comando_a_arduino(payload)
+            # Solo encola: el loop de paho no espera al puerto serial
+            enviar_comando_a_arduino(payload, prioridad=PRIORIDAD_MANUAL)
 
-    client = mqtt.Client(client_id='listener-python')
+    client = crear_cliente_mqtt('listener-python')
     client.on_connect = on_connect
     client.on_message = on_message
 
@@ -127,13 +131,15 @@ def obtener_configuraciones_periodicas():
 # ===============================
 # 🚀 MAIN
 # ===============================
-def main():
-    print("🚀 Sistema de configuración iniciado")
-    print("="*60)
+def iniciar_actuadores(puerto=None):
+    """Arranca los hilos de actuadores (horarios, API y MQTT) sobre el puerto indicado."""
+    global puerto_serial
+    if puerto:
+        puerto_serial = puerto
     print("🕒 Revisión horaria desde JSON cada 20s")
     print("📡 Escucha MQTT activa")
     print("🔄 Actualización desde API cada 20s")
-    print("="*60)
+    print(f"🔌 Comandos por {puerto_serial}")
 
     # Hilo: revisión horaria
     threading.Thread(target=revisar_configuraciones_periodicas, daemon=True).start()
@@ -142,6 +148,12 @@ def main():
     # Hilo: MQTT
     threading.Thread(target=iniciar_mqtt, daemon=True).start()
 
+def main():
+    print("🚀 Sistema de configuración iniciado")
+    print("="*60)
+    iniciar_actuadores()
+    print("="*60)
+
     # Mantener proceso vivo
     try:
         while True:
@@ -1,6 +1,7 @@
 # main.py
 from Clases.metodos import *
 from Clases.user_config import UserConfig
+from Clases.despachador_comandos import obtener_despachador, PRIORIDAD_MANUAL, PRIORIDAD_PROGRAMADA
 import json
 from datetime import datetime
 import serial
@@ -15,25 +16,21 @@ broker = '13.59.132.191'
 port = 1883
 topic = 'conf/uuid/code'
 
-# Función para enviar comando al Arduino
-def enviar_comando_a_arduino(codigo):
-    try:
-        with serial.Serial(puerto_serial, 115200, timeout=3) as arduino:
-            print(f"📡 Puerto {puerto_serial} conectado")
-            time.sleep(3)  # Esperar a que Arduino se inicialice
-            arduino.write(f"{codigo}\n".encode())
-            arduino.flush()
-            print(f"⚡ Comando '{codigo}' enviado al Arduino")
-
-            time.sleep(2)
-            while arduino.in_waiting > 0:
-                respuesta = arduino.readline().decode().strip()
-                if respuesta:
-                    print(f"📨 Arduino: {respuesta}")
-    except serial.SerialException as e:
-        print(f"❌ ERROR DE PUERTO SERIAL: {e}")
-    except Exception as e:
-        print(f"❌ ERROR GENERAL: {e}")
+# Función para enviar comando al Arduino: solo lo encola en el despachador (el puerto queda
+# abierto entre comandos y las respuestas del Arduino se imprimen desde el hilo del canal)
+def enviar_comando_a_arduino(codigo, prioridad=PRIORIDAD_PROGRAMADA):
+    futuro = obtener_despachador(puerto_serial).encolar(codigo, prioridad)
+    futuro.add_done_callback(lambda f: informar_comando(codigo, f))
+    return futuro
+
+def informar_comando(codigo, futuro):
+    error = futuro.exception()
+    if isinstance(error, serial.SerialException):
+        print(f"❌ ERROR DE PUERTO SERIAL: {error}")
+    elif error is not None:
+        print(f"❌ ERROR GENERAL: {error}")
+    else:
+        print(f"⚡ Comando '{codigo}' enviado al Arduino")
 
 # -----------------------------
 # ⏰ TAREA 1: POR HORA PROGRAMADA
@@ -87,7 +84,7 @@ def iniciar_mqtt():
         print(f'📥 Mensaje MQTT recibido en "{msg.topic}": {payload}')
         if payload:
             print(f"🚀 Ejecutando comando MQTT: {payload}")
-            enviar_comando_a_arduino(payload)
+            enviar_comando_a_arduino(payload, prioridad=PRIORIDAD_MANUAL)
 
     client = mqtt.Client(client_id='listener-python')
     client.on_connect = on_connect
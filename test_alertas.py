@@ -13,14 +13,17 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from Clases.arduino import guardar_dato
+from Clases.almacenamiento import leer_registros, vaciar_registros
+from Clases.registro_alertas import obtener_registro_alertas
 import json
 
 def leer_alertas_generadas():
     """Lee y muestra las alertas generadas"""
     archivo_alertas = "Jsons_DATA/data_sesnsoresalerta_online.json"
     try:
-        with open(archivo_alertas, "r", encoding="utf-8") as f:
-            alertas = json.load(f)
+        # Las alertas se escriben en lotes: se baja a disco lo que quedó en memoria
+        obtener_registro_alertas(archivo_alertas).vaciar()
+        alertas = leer_registros(archivo_alertas)
         
         if alertas:
             print(f"\n🚨 === ALERTAS GENERADAS ({len(alertas)}) ===")
@@ -62,8 +65,7 @@ def test_alertas():
     
     # Limpiar archivo de alertas previo
     try:
-        with open("Jsons_DATA/data_sesnsoresalerta_online.json", "w", encoding="utf-8") as f:
-            json.dump([], f, indent=4, ensure_ascii=False)
+        vaciar_registros("Jsons_DATA/data_sesnsoresalerta_online.json")
         print("🗑️ Archivo de alertas limpiado para la prueba")
     except:
         pass
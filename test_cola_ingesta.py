@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de la cola de ingesta entre el lector serial y la persistencia
+Verifica las políticas con la cola llena y la entrega a los trabajadores
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.cola_ingesta import ColaIngesta
+
+
+class Procesadas:
+    """Junta lo que entregan los trabajadores: (sensor, valor, encolado)"""
+
+    def __init__(self):
+        self.lecturas = []
+        self._lock = threading.Lock()
+
+    def __call__(self, sensor, valor, encolado):
+        with self._lock:
+            self.lecturas.append((sensor, valor, encolado))
+
+    def valores(self):
+        return [(sensor, valor) for sensor, valor, _ in self.lecturas]
+
+
+def test_descartar_antiguo():
+    """Con la cola llena se descarta la lectura más vieja"""
+    print("🧪 === POLÍTICA descartar_antiguo ===")
+    procesadas = Procesadas()
+    cola = ColaIngesta(procesadas, capacidad=3, politica="descartar_antiguo")
+    for valor in range(5):
+        cola.encolar("tmp/1", float(valor))
+    metricas = cola.metricas()
+    print(f"📊 {metricas}")
+    assert metricas["profundidad"] == 3
+    assert metricas["descartados"] == 2
+
+    cola.iniciar()
+    cola.detener()
+    assert procesadas.valores() == [("tmp/1", 2.0), ("tmp/1", 3.0), ("tmp/1", 4.0)]
+
+
+def test_coalescer():
+    """Con la cola llena se actualiza el valor pendiente del mismo sensor en su lugar"""
+    print("🧪 === POLÍTICA coalescer ===")
+    procesadas = Procesadas()
+    cola = ColaIngesta(procesadas, capacidad=2, politica="coalescer")
+    cola.encolar("tmp/1", 1.0)
+    cola.encolar("phh/1", 7.0)
+    cola.encolar("tmp/1", 2.0)
+    cola.encolar("tmp/1", 3.0)
+    # Sin pendiente del mismo sensor se descarta la más vieja
+    cola.encolar("niv/1", 1500.0)
+    metricas = cola.metricas()
+    print(f"📊 {metricas}")
+    assert metricas["coalescidos"] == 2
+    assert metricas["descartados"] == 1
+
+    cola.iniciar()
+    cola.detener()
+    assert procesadas.valores() == [("phh/1", 7.0), ("niv/1", 1500.0)]
+
+
+def test_bloquear_espera_y_rechaza_detenida():
+    """bloquear espera lugar mientras hay trabajadores; con la cola detenida y llena rechaza"""
+    print("🧪 === POLÍTICA bloquear ===")
+    liberar = threading.Event()
+    procesadas = Procesadas()
+
+    def procesar_lento(sensor, valor, encolado):
+        liberar.wait(2)
+        procesadas(sensor, valor, encolado)
+
+    cola = ColaIngesta(procesar_lento, capacidad=1, politica="bloquear")
+    cola.iniciar()
+    cola.encolar("tmp/1", 1.0)
+    time.sleep(0.05)   # el trabajador la toma y queda esperando
+    cola.encolar("tmp/1", 2.0)
+
+    productor = threading.Thread(target=cola.encolar, args=("tmp/1", 3.0))
+    productor.start()
+    time.sleep(0.1)
+    assert productor.is_alive()   # bloqueado hasta que haya lugar
+    liberar.set()
+    productor.join(2)
+    assert not productor.is_alive()
+    cola.detener()
+    assert procesadas.valores() == [("tmp/1", 1.0), ("tmp/1", 2.0), ("tmp/1", 3.0)]
+    assert cola.metricas()["bloqueos"] == 1
+
+    # Detenida y llena: no pasa la capacidad ni se queda esperando
+    cola.encolar("tmp/1", 4.0)
+    cola.encolar("tmp/1", 5.0)
+    metricas = cola.metricas()
+    assert metricas["profundidad"] == 1
+    assert metricas["descartados"] == 1
+
+
+def test_entrega_hora_de_llegada_y_latencia():
+    """Cada lectura llega a procesar con su hora de encolado; los errores se cuentan"""
+    print("🧪 === ENTREGA Y LATENCIA ===")
+    procesadas = Procesadas()
+
+    def procesar(sensor, valor, encolado):
+        if valor < 0:
+            raise ValueError("valor inválido")
+        procesadas(sensor, valor, encolado)
+
+    cola = ColaIngesta(procesar, capacidad=100, trabajadores=2)
+    antes = time.monotonic()
+    cola.iniciar()
+    for valor in (1.0, -1.0, 2.0):
+        cola.encolar("tmp/1", valor)
+    cola.detener()
+    metricas = cola.metricas()
+    print(f"📊 {metricas}")
+    assert sorted(procesadas.valores()) == [("tmp/1", 1.0), ("tmp/1", 2.0)]
+    assert all(antes <= encolado <= time.monotonic() for _, _, encolado in procesadas.lecturas)
+    assert metricas["procesados"] == 2 and metricas["errores"] == 1
+    assert metricas["latencia_proceso_ms"]["max"] >= 0
+
+
+def test_politica_invalida():
+    """Una política desconocida se rechaza al crear la cola"""
+    print("🧪 === POLÍTICA INVÁLIDA ===")
+    try:
+        ColaIngesta(print, politica="ignorar")
+    except ValueError:
+        return
+    assert False, "La política inválida tendría que rechazarse"
+
+
+if __name__ == "__main__":
+    test_descartar_antiguo()
+    test_coalescer()
+    test_bloquear_espera_y_rechaza_detenida()
+    test_entrega_hora_de_llegada_y_latencia()
+    test_politica_invalida()
+    print("✅ Pruebas de la cola de ingesta completadas")
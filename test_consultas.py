@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de las consultas agregadas del historial local
+Verifica que las lecturas se agrupen por el tanque de devices.json
+"""
+
+import sys
+import os
+import tempfile
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.consultas import columnas_desde_registros, agregados_por_tanque, agregados_por_sensor
+from Clases.almacenamiento_local import AlmacenamientoJson
+from Clases.historial_binario import HistorialBinario
+
+# Los cinco sensores de Jsons_DATA/devices.json: id de dispositivo 6-10, todos en el tanque 2
+SENSORES = {"phh/1": 6, "niv/1": 7, "tmp/1": 8, "tbz/1": 9, "tds/1": 10}
+
+
+def lecturas_de_prueba():
+    """Dos lecturas por sensor, guardadas como las deja persistir_lectura antes del arreglo (tankId = deviceId)"""
+    registros = []
+    for i, (code, device_id) in enumerate(SENSORES.items()):
+        for minuto in (0, 1):
+            registros.append({"id": len(registros) + 1, "tankId": device_id, "deviceId": device_id,
+                              "code": code, "value": float(i * 10 + minuto),
+                              "date": f"2025-08-15T10:0{minuto}:00"})
+    return registros
+
+
+def test_sensores_se_agrupan_en_su_tanque():
+    """Historial JSON: los cinco sensores quedan en un solo grupo, el tanque 2"""
+    print("🧪 === AGREGADOS POR TANQUE (JSON) ===")
+    columnas = columnas_desde_registros(lecturas_de_prueba())
+    por_tanque = agregados_por_tanque(columnas, percentiles=())
+    print(f"📊 Tanques: {sorted(por_tanque)}")
+    assert list(por_tanque) == [2]
+    assert por_tanque[2]["count"] == 10
+    assert sorted(agregados_por_sensor(columnas, percentiles=())) == sorted(SENSORES)
+
+
+def test_sensores_se_agrupan_en_su_tanque_binario():
+    """Historial binario: el tanque también sale de devices.json y no del deviceId guardado"""
+    print("🧪 === AGREGADOS POR TANQUE (BINARIO) ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        historial = HistorialBinario(os.path.join(directorio, "historial.bin"))
+        historial.agregar(lecturas_de_prueba())
+        almacenamiento = AlmacenamientoJson(os.path.join(directorio, "online.json"), historial=historial)
+        por_tanque = agregados_por_tanque(almacenamiento.columnas_historial(), percentiles=())
+    print(f"📊 Tanques: {sorted(por_tanque)}")
+    assert list(por_tanque) == [2]
+    assert por_tanque[2]["count"] == 10
+
+
+if __name__ == "__main__":
+    test_sensores_se_agrupan_en_su_tanque()
+    test_sensores_se_agrupan_en_su_tanque_binario()
+    print("✅ Pruebas de consultas completadas")
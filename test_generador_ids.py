@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del generador de IDs con marca de agua
+Verifica la recuperación desde la cola del archivo y que no se repitan IDs al reiniciar
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.generador_ids import GeneradorIds, TAMANO_COLA
+
+
+def escribir_ndjson(ruta, ids):
+    with open(ruta, "w", encoding="utf-8") as f:
+        for i in ids:
+            f.write(json.dumps({"id": i, "code": "tmp/1", "value": 22.5}) + "\n")
+
+
+def test_recupera_desde_la_cola_ndjson():
+    """Sin marca, el siguiente ID sale del mayor ID de los últimos bytes del NDJSON"""
+    print("🧪 === RECUPERACIÓN DESDE NDJSON ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "datos.ndjson")
+        # Suficientes registros para que el principio quede fuera de la cola leída
+        escribir_ndjson(ruta, range(1, 501))
+        assert os.path.getsize(ruta) > TAMANO_COLA
+        generador = GeneradorIds(ruta)
+        assert generador.siguiente() == 501
+
+
+def test_recupera_desde_la_cola_de_un_arreglo_json():
+    """El mismo patrón encuentra el último ID en un arreglo JSON con sangría"""
+    print("🧪 === RECUPERACIÓN DESDE ARREGLO JSON ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "datos.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump([{"id": i, "tankId": 2} for i in (3, 9, 7)], f, indent=4)
+        assert GeneradorIds(ruta).siguiente() == 10
+
+
+def test_la_marca_gana_y_no_se_repiten_ids():
+    """Tras vaciar el archivo la marca evita reutilizar IDs; tras un corte se salta el bloque reservado"""
+    print("🧪 === MARCA DE AGUA ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "datos.ndjson")
+        generador = GeneradorIds(ruta, bloque=10)
+        emitidos = [generador.siguiente() for _ in range(15)]
+        assert emitidos == list(range(1, 16))
+        with open(f"{ruta}.id", encoding="utf-8") as f:
+            print(f"📍 Marca reservada: {f.read()}")
+
+        # Corte sin guardar: el archivo quedó vacío (sincronizado) y se usa la marca reservada
+        escribir_ndjson(ruta, [])
+        reiniciado = GeneradorIds(ruta, bloque=10)
+        siguiente = reiniciado.siguiente()
+        assert siguiente > 15
+        assert siguiente == 21
+
+        # Cierre limpio: la marca es exacta y no quedan huecos
+        reiniciado.guardar()
+        assert GeneradorIds(ruta, bloque=10).siguiente() == 22
+
+
+def test_la_cola_gana_a_una_marca_vieja_o_corrupta():
+    """Si el archivo tiene IDs mayores que la marca (o la marca está corrupta) se usa la cola"""
+    print("🧪 === MARCA VIEJA O CORRUPTA ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "datos.ndjson")
+        escribir_ndjson(ruta, range(1, 41))
+        with open(f"{ruta}.id", "w", encoding="utf-8") as f:
+            f.write("25")
+        assert GeneradorIds(ruta).siguiente() == 41
+
+        with open(f"{ruta}.id", "w", encoding="utf-8") as f:
+            f.write("no es un número")
+        assert GeneradorIds(ruta).siguiente() == 41
+
+
+def test_archivo_cola_y_ultimo_id():
+    """El último ID puede buscarse en otro archivo (función o ruta) o pedirse al backend"""
+    print("🧪 === ARCHIVO DE COLA Y ÚLTIMO ID ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        marca = os.path.join(directorio, "historial")
+        segmento = os.path.join(directorio, "historial_2025-08-15T10.ndjson")
+        escribir_ndjson(segmento, [70, 71, 72])
+        assert GeneradorIds(marca, archivo_cola=lambda: segmento).siguiente() == 73
+        assert GeneradorIds(os.path.join(directorio, "otro"), archivo_cola=segmento).siguiente() == 73
+        # Un segmento que todavía no existe cuenta como vacío
+        vacio = os.path.join(directorio, "sin_datos")
+        assert GeneradorIds(vacio, archivo_cola=lambda: os.path.join(directorio, "nada.ndjson")).siguiente() == 1
+        assert GeneradorIds(os.path.join(directorio, "sqlite"), ultimo_id=lambda: 500).siguiente() == 501
+
+
+if __name__ == "__main__":
+    test_recupera_desde_la_cola_ndjson()
+    test_recupera_desde_la_cola_de_un_arreglo_json()
+    test_la_marca_gana_y_no_se_repiten_ids()
+    test_la_cola_gana_a_una_marca_vieja_o_corrupta()
+    test_archivo_cola_y_ultimo_id()
+    print("✅ Pruebas del generador de IDs completadas")
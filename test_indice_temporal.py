@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del índice temporal por minuto de los segmentos NDJSON
+Verifica que los rangos de bytes contengan exactamente las lecturas pedidas
+"""
+
+import sys
+import os
+import tempfile
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.indice_temporal import IndiceTemporal
+from Clases.almacenamiento import agregar_lineas, serializar_linea, leer_registros_rango
+from Clases.historial_segmentado import HistorialSegmentado
+
+
+def escribir(ruta, registros, indice=None):
+    """Agrega los registros como NDJSON y, si hay índice, los registra"""
+    lineas = [serializar_linea(r) for r in registros]
+    inicio = agregar_lineas(ruta, lineas)
+    if indice is not None:
+        indice.registrar([r["date"] for r in registros], inicio, [len(linea) for linea in lineas])
+
+
+def lecturas(minutos, por_minuto=3, hora="2025-08-15T10"):
+    return [{"id": f"{m}-{s}", "code": "tmp/1", "value": float(s), "date": f"{hora}:{m:02d}:{s * 10:02d}"}
+            for m in minutos for s in range(por_minuto)]
+
+
+def leer_con_indice(ruta, indice, desde, hasta):
+    registros = []
+    for inicio, fin in indice.rangos(desde, hasta):
+        registros.extend(leer_registros_rango(ruta, inicio, fin))
+    return [r for r in registros if desde <= r["date"] <= hasta]
+
+
+def esperados(registros, desde, hasta):
+    return [r for r in registros if desde <= r["date"] <= hasta]
+
+
+def test_rangos_ordenados():
+    """Con lecturas en orden, el rango es un solo bloque de bytes con los minutos pedidos"""
+    print("🧪 === RANGOS EN ORDEN ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "segmento.ndjson")
+        indice = IndiceTemporal(ruta)
+        registros = lecturas(range(0, 10))
+        escribir(ruta, registros[:12], indice)
+        escribir(ruta, registros[12:], indice)
+
+        desde, hasta = "2025-08-15T10:03:00", "2025-08-15T10:05:59"
+        rangos = indice.rangos(desde, hasta)
+        print(f"📍 Rangos: {rangos}")
+        assert len(rangos) == 1
+        assert leer_con_indice(ruta, indice, desde, hasta) == esperados(registros, desde, hasta)
+        # El bloque no incluye minutos de afuera del rango
+        assert {r["date"][:16] for r in leer_registros_rango(ruta, *rangos[0])} == {
+            "2025-08-15T10:03", "2025-08-15T10:04", "2025-08-15T10:05"}
+        # Hasta el último minuto: el rango llega al final del archivo
+        assert indice.rangos("2025-08-15T10:09:00", "2025-08-15T11:00:00")[0][1] is None
+        assert indice.rangos("2025-08-15T11:00:00", "2025-08-15T11:30:00") == []
+
+
+def test_rangos_con_lecturas_atrasadas():
+    """Una lectura atrasada agrega otra corrida del mismo minuto y también se encuentra"""
+    print("🧪 === LECTURAS FUERA DE ORDEN ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "segmento.ndjson")
+        indice = IndiceTemporal(ruta)
+        registros = lecturas(range(0, 6)) + lecturas([2], por_minuto=1) + lecturas(range(6, 8))
+        escribir(ruta, registros, indice)
+        assert not indice.ordenado
+
+        desde, hasta = "2025-08-15T10:02:00", "2025-08-15T10:02:59"
+        encontrados = leer_con_indice(ruta, indice, desde, hasta)
+        print(f"📍 Rangos: {indice.rangos(desde, hasta)}")
+        assert len(indice.rangos(desde, hasta)) == 2
+        assert sorted(r["id"] for r in encontrados) == sorted(r["id"] for r in esperados(registros, desde, hasta))
+
+
+def test_se_pone_al_dia_tras_un_corte():
+    """Datos escritos sin registrar (corte entre datos e índice) se indexan al cargar el índice"""
+    print("🧪 === RECUPERACIÓN DEL ÍNDICE ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "segmento.ndjson")
+        registros = lecturas(range(0, 8))
+        escribir(ruta, registros[:9], IndiceTemporal(ruta))
+        escribir(ruta, registros[9:])
+
+        indice = IndiceTemporal(ruta)
+        desde, hasta = "2025-08-15T10:04:00", "2025-08-15T10:06:59"
+        assert leer_con_indice(ruta, indice, desde, hasta) == esperados(registros, desde, hasta)
+
+        # reconstruir() da las mismas entradas que el índice incremental
+        cubetas = list(indice.cubetas)
+        indice.reconstruir()
+        assert indice.cubetas == cubetas
+
+
+def test_historial_segmentado_usa_el_indice():
+    """HistorialSegmentado.leer con un rango parcial devuelve lo mismo que filtrar todo"""
+    print("🧪 === LECTURA DE RANGO DEL HISTORIAL ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        historial = HistorialSegmentado(os.path.join(directorio, "historial"), archivo_heredado=None)
+        if not historial.usar_indice:
+            print("⏭️ Formato JSON: el historial no usa índice")
+            return
+        registros = lecturas(range(0, 60), por_minuto=2) + lecturas(range(0, 30), por_minuto=2, hora="2025-08-15T11")
+        historial.agregar(registros)
+        desde, hasta = "2025-08-15T10:45:00", "2025-08-15T11:10:30"
+        assert historial.leer(desde, hasta) == esperados(registros, desde, hasta)
+
+
+if __name__ == "__main__":
+    test_rangos_ordenados()
+    test_rangos_con_lecturas_atrasadas()
+    test_se_pone_al_dia_tras_un_corte()
+    test_historial_segmentado_usa_el_indice()
+    print("✅ Pruebas del índice temporal completadas")
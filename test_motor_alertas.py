@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del motor de reglas de alertas
+Verifica que solo se informen los cambios de estado, con histéresis y debounce
+"""
+
+import sys
+import os
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.motor_alertas import MotorAlertas, BAJO, NORMAL, ALTO
+
+
+def estados(transiciones):
+    return [(t.anterior, t.estado) for t in transiciones]
+
+
+def test_solo_cambios_de_estado():
+    """Un sensor que sigue fuera de rango genera una sola alerta por incidente"""
+    print("🧪 === CAMBIOS DE ESTADO ===")
+    motor = MotorAlertas({"tmp/1": {"min": 17.0, "max": 26.0}, "tds/1": {"min": None, "max": None}})
+    transiciones = motor.evaluar_lote([("tmp/1", 20.0), ("tmp/1", 30.0), ("tmp/1", 31.0), ("tmp/1", 22.0),
+                                       ("tmp/1", 10.0), ("tds/1", 5000.0)])
+    for t in transiciones:
+        print(f"🚨 {t.mensaje}")
+    assert estados(transiciones) == [(NORMAL, ALTO), (ALTO, NORMAL), (NORMAL, BAJO)]
+    # Sin límites no hay regla
+    assert motor.evaluar("tds/1", 5000.0) is None
+    assert motor.estado("tmp/1") == BAJO
+
+
+def test_histeresis():
+    """Para volver a normal el valor tiene que entrar en el rango más allá del margen"""
+    print("🧪 === HISTÉRESIS ===")
+    motor = MotorAlertas({"tmp/1": {"min": 17.0, "max": 26.0, "histeresis": 1.0}})
+    assert motor.evaluar("tmp/1", 26.5).estado == ALTO
+    # Oscila sobre el máximo sin salir del margen: no hay más alertas
+    for valor in (25.5, 26.2, 25.1, 26.4):
+        assert motor.evaluar("tmp/1", valor) is None
+    assert motor.estado("tmp/1") == ALTO
+    transicion = motor.evaluar("tmp/1", 24.9)
+    print(f"✅ {transicion.mensaje}")
+    assert (transicion.anterior, transicion.estado) == (ALTO, NORMAL)
+
+
+def test_debounce():
+    """El nuevo estado tiene que repetirse 'muestras' lecturas seguidas"""
+    print("🧪 === DEBOUNCE ===")
+    motor = MotorAlertas({"phh/1": {"min": 5.0, "max": 9.0, "muestras": 3}})
+    # Un pico aislado no alcanza
+    assert estados(motor.evaluar_lote([("phh/1", 12.0), ("phh/1", 12.0), ("phh/1", 7.0)])) == []
+    assert motor.estado("phh/1") == NORMAL
+    transiciones = motor.evaluar_lote([("phh/1", 12.0), ("phh/1", 11.0), ("phh/1", 10.0)])
+    assert estados(transiciones) == [(NORMAL, ALTO)]
+    assert transiciones[0].valor == 10.0
+    # Volver a normal también necesita tres lecturas seguidas
+    assert estados(motor.evaluar_lote([("phh/1", 7.0), ("phh/1", 7.0)])) == []
+    assert estados(motor.evaluar_lote([("phh/1", 7.0)])) == [(ALTO, NORMAL)]
+
+
+def test_incluir_fuera_y_heredar_estados():
+    """incluir_fuera informa las lecturas que siguen fuera; recargar el mapa conserva el estado"""
+    print("🧪 === LECTURAS FUERA Y RECARGA ===")
+    mapa = {"niv/1": {"min": 200.0, "max": 2000.0}}
+    motor = MotorAlertas(mapa)
+    transiciones = motor.evaluar_lote([("niv/1", 100.0), ("niv/1", 90.0), ("niv/1", 1500.0)], incluir_fuera=True)
+    assert estados(transiciones) == [(NORMAL, BAJO), (BAJO, BAJO), (BAJO, NORMAL)]
+    motor.evaluar("niv/1", 50.0)
+
+    nuevo = MotorAlertas(dict(mapa))
+    nuevo.heredar_estados(motor)
+    assert nuevo.estado("niv/1") == BAJO
+    assert nuevo.evaluar("niv/1", 40.0) is None
+
+
+if __name__ == "__main__":
+    test_solo_cambios_de_estado()
+    test_histeresis()
+    test_debounce()
+    test_incluir_fuera_y_heredar_estados()
+    print("✅ Pruebas del motor de alertas completadas")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del publicador de alertas por MQTT contra el broker en memoria
+Verifica el outbox QoS 1, los reintentos y el reenvío al reconectar
+"""
+
+import sys
+import os
+import json
+import time
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.publicador_alertas import PublicadorAlertas, ClienteMqttMemoria
+
+
+def esperar(condicion, timeout=3.0):
+    """Espera a que la condición se cumpla (el envío lo hace el hilo del publicador)"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return condicion()
+
+
+def crear_publicador(disponible=True, **kwargs):
+    """Publicador con su broker en memoria; el broker arranca caído si disponible=False"""
+    cliente = ClienteMqttMemoria()
+    cliente.disponible = disponible
+    publicador = PublicadorAlertas(broker="memoria", uuid="prueba", fabrica_cliente=lambda client_id: cliente,
+                                   **kwargs)
+    return publicador.iniciar(), cliente
+
+
+def alerta(numero, tanque=2):
+    return {"id": numero, "tankId": tanque, "code": "tmp/1", "value": 30.0 + numero,
+            "message": f"Temperatura muy alta ({numero})", "synced": False}
+
+
+def ids_publicados(cliente):
+    return [json.loads(payload)["id"] for _, payload, _ in cliente.mensajes]
+
+
+def test_publica_con_qos1_en_el_topic_del_tanque():
+    """Con conexión, cada alerta sale una vez con QoS 1 en alertas/<uuid>/<tankId> y sin 'synced'"""
+    print("🧪 === PUBLICACIÓN QoS 1 ===")
+    publicador, cliente = crear_publicador()
+    try:
+        publicador.publicar(alerta(1))
+        assert esperar(lambda: len(cliente.mensajes) == 1)
+        topic, payload, qos = cliente.mensajes[0]
+        print(f"📡 {topic} (qos={qos}): {payload}")
+        assert topic == "alertas/prueba/2"
+        assert qos == 1
+        assert "synced" not in json.loads(payload)
+        assert esperar(lambda: publicador.estado()["en_vuelo"] == 0)
+        assert publicador.estado()["confirmadas"] == 1
+    finally:
+        publicador.detener()
+
+
+def test_outbox_espera_la_conexion_y_descarta_las_mas_viejas():
+    """Sin broker las alertas esperan en el outbox acotado y salen en orden al conectar"""
+    print("🧪 === OUTBOX SIN CONEXIÓN ===")
+    publicador, cliente = crear_publicador(disponible=False, capacidad=3)
+    try:
+        for numero in range(1, 6):
+            publicador.publicar(alerta(numero))
+        estado = publicador.estado()
+        print(f"📦 Estado sin broker: {estado}")
+        assert estado["outbox"] == 3
+        assert estado["descartadas"] == 2
+        assert cliente.mensajes == []
+
+        cliente.levantar()
+        assert esperar(lambda: len(cliente.mensajes) == 3)
+        assert ids_publicados(cliente) == [3, 4, 5]
+        assert esperar(lambda: publicador.estado()["outbox"] == 0 and publicador.estado()["en_vuelo"] == 0)
+    finally:
+        publicador.detener()
+
+
+def test_sin_conexion_el_cliente_la_reenvia_sin_duplicar():
+    """NO_CONN: paho guarda el mensaje y lo reenvía al reconectar; el outbox no lo vuelve a publicar"""
+    print("🧪 === NO_CONN Y REENVÍO AL RECONECTAR ===")
+    publicador, cliente = crear_publicador()
+    try:
+        # El broker se cae sin que el cliente lo haya notado todavía
+        cliente.disponible = False
+        publicador.publicar(alerta(1))
+        assert esperar(lambda: publicador.estado()["en_vuelo"] == 1)
+        estado = publicador.estado()
+        print(f"📦 Estado tras NO_CONN: {estado}")
+        assert not estado["conectado"]
+        assert estado["outbox"] == 0
+        assert cliente.mensajes == []
+
+        # Mientras tanto llega otra alerta: espera en el outbox, no en el cliente
+        publicador.publicar(alerta(2))
+        time.sleep(0.2)
+        assert publicador.estado()["outbox"] == 1
+
+        cliente.levantar()
+        assert esperar(lambda: len(cliente.mensajes) == 2)
+        time.sleep(0.2)
+        # Cada alerta una sola vez (el orden entre la reenviada y la nueva no está garantizado)
+        assert sorted(ids_publicados(cliente)) == [1, 2]
+        assert publicador.estado()["en_vuelo"] == 0
+    finally:
+        publicador.detener()
+
+
+def test_cola_del_cliente_llena_vuelve_al_outbox():
+    """QUEUE_SIZE: el cliente no aceptó la alerta, así que vuelve al frente del outbox y se reintenta"""
+    print("🧪 === QUEUE_SIZE Y REINTENTO ===")
+    publicador, cliente = crear_publicador()
+    try:
+        cliente.max_queued_messages_set(1)
+        cliente.disponible = False
+        publicador.publicar(alerta(1))
+        assert esperar(lambda: publicador.estado()["en_vuelo"] == 1)
+
+        # paho ya reconectó pero todavía no vació su cola: la siguiente no entra
+        cliente.on_connect(cliente, None, {}, 0)
+        publicador.publicar(alerta(2))
+        assert esperar(lambda: publicador.estado()["errores"] >= 1)
+        estado = publicador.estado()
+        print(f"📦 Estado con la cola del cliente llena: {estado}")
+        assert estado["outbox"] == 1
+
+        cliente.levantar()
+        assert esperar(lambda: len(cliente.mensajes) == 2)
+        time.sleep(0.2)
+        assert sorted(ids_publicados(cliente)) == [1, 2]
+        assert esperar(lambda: publicador.estado()["en_vuelo"] == 0 and publicador.estado()["outbox"] == 0)
+    finally:
+        publicador.detener()
+
+
+if __name__ == "__main__":
+    test_publica_con_qos1_en_el_topic_del_tanque()
+    test_outbox_espera_la_conexion_y_descarta_las_mas_viejas()
+    test_sin_conexion_el_cliente_la_reenvia_sin_duplicar()
+    test_cola_del_cliente_llena_vuelve_al_outbox()
+    print("✅ Pruebas del publicador completadas")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del supresor de tormentas de alertas
+Verifica las ventanas de agrupación y los registros resumen
+"""
+
+import sys
+import os
+
+# Agregar el path para importar las clases
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from Clases.supresor_alertas import SupresorAlertas
+from Clases.motor_alertas import BAJO, ALTO
+
+
+def test_primera_sale_y_las_repetidas_se_agrupan():
+    """La primera alerta sale enseguida; las repetidas solo salen en el resumen al cerrar la ventana"""
+    print("🧪 === VENTANA DE SUPRESIÓN ===")
+    supresor = SupresorAlertas(ventana=60.0)
+    salida = supresor.registrar("tmp/1", ALTO, 30.0, "Temperatura muy alta: 30.0", ahora=0.0)
+    assert salida == [{"code": "tmp/1", "value": 30.0, "message": "Temperatura muy alta: 30.0"}]
+    for instante, valor in ((10.0, 33.0), (20.0, 28.0)):
+        assert supresor.registrar("tmp/1", ALTO, valor, "Temperatura muy alta", ahora=instante) == []
+    assert supresor.registrar("tmp/1", ALTO, 31.0, "", nueva=False, ahora=30.0) == []
+
+    assert supresor.vencer(ahora=59.0) == []
+    resumenes = supresor.vencer(ahora=60.0)
+    print(f"📦 Resumen: {resumenes}")
+    assert len(resumenes) == 1
+    resumen = resumenes[0]["resumen"]
+    assert resumen["count"] == 4
+    assert (resumen["min_value"], resumen["max_value"]) == (28.0, 33.0)
+    assert resumenes[0]["value"] == 31.0
+    assert supresor.abiertos() == 0
+    assert supresor.estadisticas["suprimidas"] == 3
+
+    # Con la ventana cerrada, la próxima alerta vuelve a salir enseguida
+    assert len(supresor.registrar("tmp/1", ALTO, 30.0, "Temperatura muy alta", ahora=61.0)) == 1
+
+
+def test_sin_repeticiones_no_hay_resumen():
+    """Un incidente con una sola alerta no genera registro resumen"""
+    print("🧪 === INCIDENTE SIN REPETICIONES ===")
+    supresor = SupresorAlertas(ventana=60.0)
+    supresor.registrar("phh/1", BAJO, 3.0, "pH muy bajo", ahora=0.0)
+    assert supresor.vencer(ahora=120.0) == []
+    assert supresor.estadisticas["resumenes"] == 0
+
+
+def test_incidentes_separados_por_sensor_y_estado():
+    """Bajo y alto del mismo sensor son incidentes distintos"""
+    print("🧪 === INCIDENTES POR SENSOR Y ESTADO ===")
+    supresor = SupresorAlertas(ventana=60.0)
+    assert len(supresor.registrar("niv/1", BAJO, 100.0, "Nivel muy bajo", ahora=0.0)) == 1
+    assert len(supresor.registrar("niv/1", ALTO, 3000.0, "Nivel muy alto", ahora=1.0)) == 1
+    assert len(supresor.registrar("tmp/1", ALTO, 30.0, "Temperatura muy alta", ahora=2.0)) == 1
+    assert supresor.abiertos() == 3
+
+
+def test_tope_de_incidentes_y_vaciar():
+    """Con el tope lleno se cierra antes el incidente más viejo; vaciar() cierra todos"""
+    print("🧪 === TOPE DE INCIDENTES ===")
+    supresor = SupresorAlertas(ventana=60.0, max_incidentes=2)
+    supresor.registrar("tmp/1", ALTO, 30.0, "Temperatura muy alta", ahora=0.0)
+    supresor.registrar("tmp/1", ALTO, 32.0, "Temperatura muy alta", ahora=1.0)
+    supresor.registrar("phh/1", ALTO, 12.0, "pH muy alto", ahora=2.0)
+    salida = supresor.registrar("niv/1", BAJO, 100.0, "Nivel muy bajo", ahora=3.0)
+    print(f"📦 Salida con el tope lleno: {salida}")
+    assert [a["code"] for a in salida] == ["tmp/1", "niv/1"]
+    assert salida[0]["resumen"]["count"] == 2
+    assert supresor.abiertos() == 2
+
+    supresor.registrar("phh/1", ALTO, 13.0, "pH muy alto", ahora=4.0)
+    resumenes = supresor.vaciar()
+    assert [a["code"] for a in resumenes] == ["phh/1"]
+    assert supresor.abiertos() == 0
+
+
+if __name__ == "__main__":
+    test_primera_sale_y_las_repetidas_se_agrupan()
+    test_sin_repeticiones_no_hay_resumen()
+    test_incidentes_separados_por_sensor_y_estado()
+    test_tope_de_incidentes_y_vaciar()
+    print("✅ Pruebas del supresor de alertas completadas")